@@ -1,7 +1,8 @@
 # ============================================
 # PACKAGE MANAGEMENT
 # ============================================
-from ortools.linear_solver import pywraplp
+from backends import create_solver
+from reporting import print_results
 
 # ============================================
 # DECLARE CONSTANTS
@@ -41,9 +42,7 @@ prob_weather = (1/3)
 # ============================================
 # CREATE SOLVER
 # ============================================
-solver = pywraplp.Solver.CreateSolver('SCIP')
-if not solver:
-    raise Exception("SCIP solver not available.")
+solver = create_solver('auto', integer=True)
 
 # ============================================
 # DECISION VARIABLES
@@ -114,16 +113,4 @@ status = solver.Solve()
 # ============================================
 # RESULTS
 # ============================================
-if status == pywraplp.Solver.OPTIMAL:
-    print('Overall Profit = $', -1 * solver.Objective().Value())
-    print()
-    for var in solver.variables():
-        print(f"{var.name()} = {var.solution_value()}")
-elif status == pywraplp.Solver.INFEASIBLE:
-    print("The problem is infeasible — no solution satisfies all constraints.")
-elif status == pywraplp.Solver.UNBOUNDED:
-    print("The problem is unbounded — the objective can increase indefinitely.")
-elif status == pywraplp.Solver.ABNORMAL:
-    print("Solver stopped due to an abnormal error.")
-else:
-    print("Solver ended with status code:", status)
\ No newline at end of file
+print_results(solver, status, sign=-1)
@@ -3,6 +3,8 @@
 # ============================================
 from ortools.linear_solver import pywraplp
 
+from backends import create_solver
+
 # ============================================
 # DECLARE CONSTANTS
 # ============================================
@@ -38,9 +40,7 @@ b_revenue = b_price - b_c1_req * c1_cost - b_c2_req * c2_cost
 # CREATE SOLVER
 # ============================================
 
-solver = pywraplp.Solver.CreateSolver("SCIP")
-if not solver:
-    raise Exception("SCIP solver not available.")
+solver = create_solver('SCIP')
 
 # ============================================
 # DECISION VARIABLES
@@ -3,6 +3,8 @@
 # ============================================
 from ortools.linear_solver import pywraplp
 
+from backends import create_solver
+
 # ============================================
 # DECLARE CONSTANTS
 # ============================================
@@ -54,9 +56,7 @@ b_revenue_3 = b_price_3 - b_c1_req * c1_cost - b_c2_req * c2_cost
 # CREATE SOLVER
 # ============================================
 
-solver = pywraplp.Solver.CreateSolver("SCIP")
-if not solver:
-    raise Exception("SCIP solver not available.")
+solver = create_solver('SCIP')
 
 # ============================================
 # DECISION VARIABLES
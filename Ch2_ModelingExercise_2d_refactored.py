@@ -1,5 +1,7 @@
 from ortools.linear_solver import pywraplp
 
+from backends import create_solver
+
 # ============================================
 # CONSTANTS
 # ============================================
@@ -23,9 +25,7 @@ scenarios = [
 # ============================================
 # CREATE SOLVER
 # ============================================
-solver = pywraplp.Solver.CreateSolver("SCIP")
-if not solver:
-    raise Exception("SCIP solver not available.")
+solver = create_solver('SCIP')
 
 # ============================================
 # DECISION VARIABLES
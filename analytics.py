@@ -0,0 +1,148 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import importlib
+import multiprocessing
+import os
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+import benders
+import component_model
+import farmer_model
+
+# ============================================
+# EVPI AND VSS
+# ============================================
+# All values are profits (higher is better):
+#   WS   wait-and-see: expected profit when each scenario is known in advance
+#   EV   profit of the expected-value (mean scenario) problem
+#   EEV  expected profit of the EV first-stage decision under the scenarios
+#   RP   optimal profit of the recourse (two-stage) problem
+#   EVPI = WS - RP,  VSS = RP - EEV
+# Every per-scenario problem (WS_s and EEV_s) is solved on one persistent
+# single-scenario model per process, updated in place with set_scenario()
+# and built with solver_id='auto-warm' so integer re-solves take a hint.
+StochasticMetrics = namedtuple(
+    'StochasticMetrics',
+    ['ws', 'ev', 'eev', 'rp', 'evpi', 'vss', 'ev_x', 'rp_x', 'ws_profits', 'eev_profits'],
+)
+
+_worker_model = None
+
+
+def _build_single(module, row, data):
+    return module.build_two_stage([(*row, 1.0)], data, solver_id='auto-warm')
+
+
+def _init_worker(module_name, row, data):
+    global _worker_model
+    _worker_model = _build_single(importlib.import_module(module_name), row, data)
+
+
+def _check(model, what):
+    if model.status != pywraplp.Solver.OPTIMAL:
+        raise Exception(f"{what} ended with status code: {model.status}")
+
+
+def _fixed_profit(model, x):
+    """Profit of the scenario on `model` with the first stage fixed at `x`."""
+    bounds = [(var.lb(), var.ub()) for var in model.x]
+    for var, value in zip(model.x, x):
+        var.SetBounds(value, value)
+    model.solve(warm=True)
+    _check(model, 'Fixed first-stage evaluation')
+    profit = model.profit()
+    for var, (lb, ub) in zip(model.x, bounds):
+        var.SetBounds(lb, ub)
+    return profit
+
+
+def _scenario_profits(task):
+    """Return (WS_s, EEV_s, RP_s): the scenario solved freely, then with x fixed at ev_x and at rp_x.
+
+    RP_s is None when rp_x is None (the recourse problem was solved whole).
+    """
+    model = _worker_model
+    row, ev_x, rp_x = task
+    model.set_scenario(0, row)
+    model.solve(warm=True)
+    _check(model, 'Wait-and-see problem')
+    ws = model.profit()
+    eev = _fixed_profit(model, ev_x)
+    return ws, eev, None if rp_x is None else _fixed_profit(model, rp_x)
+
+
+def recourse_problem(module, scenarios, data=None, method='extensive'):
+    """Solve the two-stage problem; return (profit, first-stage x).
+
+    method='lshaped' uses the L-shaped method, which is the tractable choice
+    for the integer farmer model at thousands of scenarios. Its recourse is
+    an LP, so for an integer model the profit is that of the relaxed
+    recourse; stochastic_metrics re-prices the plan with integer recourse.
+    """
+    if method == 'lshaped':
+        result = benders.solve_lshaped(module.two_stage_arrays(scenarios, data))
+        return result.profit, result.x
+    model = module.build_two_stage(scenarios, data, method='matrix', names=False)
+    model.solve()
+    _check(model, 'Recourse problem')
+    return model.profit(), model.result().first_stage.copy()
+
+
+def stochastic_metrics(module, scenarios=None, data=None, processes=1, rp_method='lshaped'):
+    """Compute WS, EV, EEV, RP, EVPI and VSS for `module` (farmer_model or component_model).
+
+    rp_method='lshaped' (the default) takes the L-shaped plan and reports
+    RP as its expected profit under each scenario's own recourse, evaluated
+    like EEV, so WS, EEV and RP share one recourse model. For an integer
+    model that is the profit of a feasible plan, a lower bound on the
+    optimal RP; rp_method='extensive' solves the whole recourse problem.
+    """
+    scenarios = module.SCENARIOS if scenarios is None else scenarios
+    values, probs = module.scenario_table(scenarios)
+
+    ev_model = _build_single(module, probs @ values, data)
+    ev_model.solve()
+    _check(ev_model, 'Expected-value problem')
+    ev, ev_x = ev_model.profit(), ev_model.result().first_stage.tolist()
+
+    rp, rp_x = recourse_problem(module, scenarios, data, rp_method)
+    fixed_x = rp_x.tolist() if rp_method == 'lshaped' else None
+    tasks = [(row, ev_x, fixed_x) for row in values.tolist()]
+    if processes == 1:
+        _init_worker(module.__name__, values[0], data)
+        profits = list(map(_scenario_profits, tasks))
+    else:
+        processes = processes or os.cpu_count() or 1
+        with multiprocessing.Pool(processes, initializer=_init_worker,
+                                  initargs=(module.__name__, values[0], data)) as pool:
+            profits = pool.map(_scenario_profits, tasks, chunksize=max(1, len(tasks) // (4 * processes)))
+    ws_profits, eev_profits, rp_profits = (np.array(column) for column in zip(*profits))
+
+    if fixed_x is not None:
+        rp = probs @ rp_profits
+    ws, eev = probs @ ws_profits, probs @ eev_profits
+    return StochasticMetrics(ws, ev, eev, rp, ws - rp, rp - eev, np.array(ev_x), rp_x, ws_profits, eev_profits)
+
+
+def print_metrics(name, metrics):
+    print(f"{name}")
+    print(f"  Wait-and-see (WS)           = $ {metrics.ws:.2f}")
+    print(f"  Expected value (EV)         = $ {metrics.ev:.2f}")
+    print(f"  Expected EV solution (EEV)  = $ {metrics.eev:.2f}")
+    print(f"  Recourse problem (RP)       = $ {metrics.rp:.2f}")
+    print(f"  EVPI = WS - RP              = $ {metrics.evpi:.2f}")
+    print(f"  VSS  = RP - EEV             = $ {metrics.vss:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='EVPI and VSS for the two-stage models')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--rp-method', choices=('lshaped', 'extensive'), default='lshaped')
+    args = parser.parse_args()
+    for module in (farmer_model, component_model):
+        print_metrics(module.__name__, stochastic_metrics(module, processes=args.processes, rp_method=args.rp_method))
@@ -0,0 +1,208 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import datetime
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import linear_solver_pb2, pywraplp
+from ortools.math_opt import model_pb2, sparse_containers_pb2
+from ortools.math_opt.python import mathopt
+from ortools.util.python.solve_interrupter import SolveInterrupter
+
+import farmer_model
+from results import SolveResult
+
+# ============================================
+# ANYTIME SOLVING
+# ============================================
+# pywraplp's Solve() exposes no incumbent callback to Python, so an anytime
+# solve hands the built model to SCIP through MathOpt, whose MIP_SOLUTION
+# callback sees every solution SCIP finds. The model is copied from the
+# pywraplp solver's proto (columns keep their order), solved once under a
+# wall-clock budget and a relative gap target, and each strictly better
+# solution is streamed as an Incumbent. The outcome is a SolveResult like
+# model.result(): OPTIMAL when SCIP proves optimality (or reaches the gap),
+# FEASIBLE with the best solution when a limit stops it first.
+#
+# MathOpt releases the GIL while SCIP runs, so AnytimeSolve can run the
+# solve on a thread and hand incumbents to a generator as they arrive.
+# With a callback or interrupter registered, OR-Tools' SCIP event handler
+# logs a harmless "SCIPcatchEvent does not support variable or row change
+# events" error on stderr; the solve is unaffected.
+Incumbent = namedtuple('Incumbent', ['seconds', 'objective', 'bound', 'gap', 'profit', 'first_stage'])
+
+TERMINATION_STATUS = {
+    mathopt.TerminationReason.OPTIMAL: pywraplp.Solver.OPTIMAL,
+    mathopt.TerminationReason.FEASIBLE: pywraplp.Solver.FEASIBLE,
+    mathopt.TerminationReason.INFEASIBLE: pywraplp.Solver.INFEASIBLE,
+    mathopt.TerminationReason.UNBOUNDED: pywraplp.Solver.UNBOUNDED,
+    mathopt.TerminationReason.INFEASIBLE_OR_UNBOUNDED: pywraplp.Solver.INFEASIBLE,
+    mathopt.TerminationReason.NO_SOLUTION_FOUND: pywraplp.Solver.NOT_SOLVED,
+}
+IMPROVEMENT = 1e-9  # relative objective change that counts as a better incumbent
+
+
+def mathopt_model(solver):
+    """Copy a pywraplp model into MathOpt.
+
+    Returns (mathopt.Model, its variables in column order, objective
+    coefficients as an array, objective offset).
+    """
+    source = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(source)
+    proto = model_pb2.ModelProto(name=source.name)
+    num_cols = len(source.variable)
+    proto.variables.ids.extend(range(num_cols))
+    proto.variables.lower_bounds.extend(var.lower_bound for var in source.variable)
+    proto.variables.upper_bounds.extend(var.upper_bound for var in source.variable)
+    proto.variables.integers.extend(var.is_integer for var in source.variable)
+    proto.objective.maximize = source.maximize
+    proto.objective.offset = source.objective_offset
+    costs = np.array([var.objective_coefficient for var in source.variable])
+    nonzero = np.flatnonzero(costs)
+    proto.objective.linear_coefficients.CopyFrom(sparse_containers_pb2.SparseDoubleVectorProto(
+        ids=nonzero.tolist(), values=costs[nonzero].tolist()))
+
+    rows, cols, coefficients = [], [], []
+    for i, row in enumerate(source.constraint):
+        order = np.argsort(row.var_index)
+        rows += [i] * len(order)
+        cols += np.asarray(row.var_index)[order].tolist()
+        coefficients += np.asarray(row.coefficient)[order].tolist()
+    proto.linear_constraints.ids.extend(range(len(source.constraint)))
+    proto.linear_constraints.lower_bounds.extend(row.lower_bound for row in source.constraint)
+    proto.linear_constraints.upper_bounds.extend(row.upper_bound for row in source.constraint)
+    proto.linear_constraint_matrix.CopyFrom(sparse_containers_pb2.SparseDoubleMatrixProto(
+        row_ids=rows, column_ids=cols, coefficients=coefficients))
+
+    model = mathopt.Model.from_model_proto(proto)
+    return model, [model.get_variable(j) for j in range(num_cols)], costs, source.objective_offset
+
+
+def solve_anytime(model, time_limit=None, gap=None, on_incumbent=None, hint=None, interrupter=None):
+    """Solve a farmer / component model with SCIP, streaming improved incumbents.
+
+    `on_incumbent(incumbent)` is called with each Incumbent, in order of
+    discovery; returning True stops the solve, which then reports the
+    incumbent as FEASIBLE. `time_limit` is in seconds; `gap` is the relative
+    MIP gap at which to stop. `hint` is an optional full solution (in
+    column order) to start from. Returns a SolveResult in the layout of
+    model.result(); it is also kept as model.anytime_result.
+    """
+    layout = model.layout
+    opt_model, variables, costs, offset = mathopt_model(model.solver)
+    sense = -1 if model.solver.Objective().maximization() else 1
+    best = [np.inf]
+    start = time.perf_counter()
+
+    def callback(data):
+        values = np.array([data.solution[var] for var in variables])
+        objective = float(costs @ values) + offset
+        if sense * objective >= best[0] - IMPROVEMENT * max(1.0, abs(best[0])):
+            return mathopt.CallbackResult()
+        best[0] = sense * objective
+        bound = data.mip_stats.dual_bound
+        relative_gap = abs(objective - bound) / max(abs(objective), 1e-9) if np.isfinite(bound) else np.inf
+        incumbent = Incumbent(time.perf_counter() - start, objective, bound, relative_gap,
+                              layout['sign'] * objective, values[:layout['num_first_stage']])
+        return mathopt.CallbackResult(terminate=bool(on_incumbent and on_incumbent(incumbent)))
+
+    params = mathopt.SolveParameters(
+        time_limit=None if time_limit is None else datetime.timedelta(seconds=time_limit),
+        relative_gap_tolerance=gap)
+    model_params = None
+    if hint is not None:
+        model_params = mathopt.ModelSolveParameters(
+            solution_hints=[mathopt.SolutionHint(variable_values=dict(zip(variables, hint)))])
+    result = mathopt.solve(opt_model, mathopt.SolverType.GSCIP, params=params, model_params=model_params,
+                           callback_reg=mathopt.CallbackRegistration(events={mathopt.Event.MIP_SOLUTION}),
+                           cb=callback, interrupter=interrupter)
+
+    reason = result.termination.reason
+    status = TERMINATION_STATUS.get(reason, pywraplp.Solver.ABNORMAL)
+    if status == pywraplp.Solver.NOT_SOLVED and result.has_primal_feasible_solution():
+        status = pywraplp.Solver.FEASIBLE  # stopped by on_incumbent or an interrupt
+    values = np.full(len(variables), np.nan)
+    objective = np.nan
+    if result.has_primal_feasible_solution():
+        solution = result.variable_values()
+        values = np.array([solution[var] for var in variables])
+        objective = result.objective_value()
+    model.anytime_result = SolveResult(
+        status, objective, values=values, duals=np.full(model.solver.NumConstraints(), np.nan),
+        reduced_costs=np.full(len(values), np.nan), **layout, wall_time=result.solve_time().total_seconds(),
+        nodes=result.solve_stats.node_count, bound=result.termination.objective_bounds.dual_bound)
+    return model.anytime_result
+
+
+class AnytimeSolve:
+    """Iterate over the incumbents of an anytime solve as SCIP finds them.
+
+        run = AnytimeSolve(model, time_limit=30, gap=1e-3)
+        for incumbent in run:
+            print(incumbent.seconds, incumbent.profit, incumbent.gap)
+        print_solve_result(run.result)
+
+    Leaving the loop early (break, or stop()) interrupts SCIP; `result`
+    then holds the best solution found so far as FEASIBLE.
+    """
+
+    def __init__(self, model, time_limit=None, gap=None, hint=None):
+        self.model = model
+        self.time_limit = time_limit
+        self.gap = gap
+        self.hint = hint
+        self.result = None
+        self._interrupter = SolveInterrupter()
+        self._queue = queue.Queue()
+        self._error = None
+
+    def stop(self):
+        self._interrupter.interrupt()
+
+    def __iter__(self):
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        try:
+            while (incumbent := self._queue.get()) is not None:
+                yield incumbent
+        finally:
+            self.stop()
+            thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        try:
+            self.result = solve_anytime(self.model, self.time_limit, self.gap, self._queue.put, self.hint,
+                                        self._interrupter)
+        except Exception as error:
+            self._error = error
+        finally:
+            self._queue.put(None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Anytime solve of the integer farmer model over sampled scenarios')
+    parser.add_argument('--scenarios', type=int, default=1000, help='sampled yield scenarios (0: the book three)')
+    parser.add_argument('--time-limit', type=float, default=30.0, help='seconds')
+    parser.add_argument('--gap', type=float, default=1e-4, help='relative MIP gap target')
+    args = parser.parse_args()
+
+    scenarios = farmer_model.sample_scenarios(args.scenarios) if args.scenarios else farmer_model.SCENARIOS
+    model = farmer_model.build_two_stage(scenarios, integer=True, method='matrix', names=False)
+    print(f"{'seconds':>9} {'profit':>14} {'bound':>14} {'gap':>9}  acres (wheat, corn, beets)")
+    run = AnytimeSolve(model, args.time_limit, args.gap)
+    for incumbent in run:
+        acres = ', '.join(f'{a:.0f}' for a in incumbent.first_stage)
+        print(f"{incumbent.seconds:9.2f} {incumbent.profit:14.2f} {model.layout['sign'] * incumbent.bound:14.2f} "
+              f"{100 * incumbent.gap:8.3f}%  {acres}", flush=True)
+    result = run.result
+    gap = result.gap
+    print(f"\nstatus {result.status_name} after {result.wall_time:.2f} s, {result.nodes} nodes: "
+          f"profit {result.profit:.2f}" + ('' if gap is None else f", gap {100 * gap:.3f}%"))
@@ -0,0 +1,91 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import math
+from collections import namedtuple
+
+from ortools.linear_solver import pywraplp
+
+# ============================================
+# SOLVER BACKENDS
+# ============================================
+# Every model builder takes a solver_id. 'auto' (the default) picks the
+# engine from the problem type: GLOP for continuous models (the LPs here
+# are small and sparse, where simplex beats PDLP's first-order method and
+# HiGHS' and CLP's start-up, see bench_backends.py) and CBC for integer
+# models (it proves the integer extensive forms much faster than SCIP:
+# 10 sampled farmer scenarios 5.5 s vs. 55 s, 30 scenarios 11.6 s vs. not
+# done in 120 s). 'auto-warm' is for a model re-solved many times in
+# place: GLOP again for an LP, but SCIP for a MIP, because pywraplp's CBC
+# interface ignores the incumbent hint that persistent.solve passes on a
+# warm re-solve. Any pywraplp id in BACKENDS can be passed explicitly.
+Backend = namedtuple('Backend', ['solver_id', 'integer', 'description'])
+
+BACKENDS = {
+    'GLOP': Backend('GLOP', False, 'Google primal/dual simplex LP'),
+    'PDLP': Backend('PDLP', False, 'first-order primal-dual LP (large LPs, lower accuracy)'),
+    'CLP': Backend('CLP', False, 'COIN-OR simplex LP'),
+    'HIGHS_LP': Backend('HIGHS_LP', False, 'HiGHS simplex / interior point LP'),
+    'SCIP': Backend('SCIP', True, 'SCIP branch-and-cut MIP'),
+    'CP_SAT': Backend('CP_SAT', True, 'CP-SAT (integer variables only)'),
+    'CBC': Backend('CBC', True, 'COIN-OR branch-and-cut MIP'),
+    'HIGHS': Backend('HIGHS', True, 'HiGHS MIP'),
+}
+
+AUTO = {False: 'GLOP', True: 'CBC'}
+AUTO_WARM = {False: 'GLOP', True: 'SCIP'}
+ALIASES = {'auto': AUTO, 'auto-warm': AUTO_WARM}
+
+
+def resolve_solver_id(solver_id='auto', integer=False):
+    """Map 'auto' / 'auto-warm' to the default engine for an LP (integer=False) or a MIP."""
+    if solver_id not in ALIASES:
+        return solver_id
+    return ALIASES[solver_id][bool(integer)]
+
+
+def create_solver(solver_id='auto', integer=False):
+    """Create a pywraplp solver for `solver_id`, resolving 'auto' / 'auto-warm' from `integer`."""
+    solver_id = resolve_solver_id(solver_id, integer)
+    if integer and solver_id in BACKENDS and not BACKENDS[solver_id].integer:
+        raise Exception(f"{solver_id} is an LP solver and cannot solve an integer model.")
+    solver = pywraplp.Solver.CreateSolver(solver_id)
+    if not solver:
+        raise Exception(f"{solver_id} solver not available.")
+    return solver
+
+
+def solver_bound(value, inf):
+    """A bound for pywraplp: +-inf mapped to the solver's own infinity `inf`, finite values unchanged."""
+    if value == math.inf:
+        return inf
+    if value == -math.inf:
+        return -inf
+    return value
+
+
+# ============================================
+# SOLVER PARAMETERS
+# ============================================
+def configure(solver, threads=None, time_limit=None):
+    """Set the thread count and time limit (seconds) on a pywraplp solver.
+
+    Both persist on the solver across solves; a relative MIP gap is passed
+    per solve instead (see solver_parameters). Single-threaded engines
+    (GLOP, CLP) reject any thread count, which only matters above one.
+    """
+    if threads is not None and not solver.SetNumThreads(threads) and threads != 1:
+        raise Exception(f"{solver.SolverVersion()} does not accept a thread count.")
+    if time_limit is not None:
+        solver.SetTimeLimit(int(time_limit * 1000))
+    return solver
+
+
+def solver_parameters(gap=None, incremental=False):
+    """MPSolverParameters with an optional relative MIP gap and incrementality."""
+    params = pywraplp.MPSolverParameters()
+    if gap is not None:
+        params.SetDoubleParam(params.RELATIVE_MIP_GAP, gap)
+    if incremental:
+        params.SetIntegerParam(params.INCREMENTALITY, params.INCREMENTALITY_ON)
+    return params
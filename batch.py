@@ -0,0 +1,253 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+# Only the standard library is imported up front: reading, validating and
+# listing case files never loads NumPy or OR-Tools (importing farmer_model
+# costs ~0.45 s, nearly all of it ortools). The model modules are imported
+# in the worker that solves the first case.
+import argparse
+import ast
+import csv
+import importlib
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+# ============================================
+# CASE FILE FORMAT
+# ============================================
+# A case file (.json, .toml, or .yaml / .yml when PyYAML is installed)
+# holds one case, or a `cases` list whose entries inherit every other
+# top-level key as a default:
+#
+#   model = "component"               # 'farmer' or 'component'
+#   [options]                         # build options: solver_id, integer, method
+#   solver_id = "auto"
+#   [[cases]]
+#   name = "Ch2 exercise 1"
+#   scenarios = [{a_price = 50, b_price = 60, prob = 1.0}]
+#   [[cases]]
+#   name = "tight capacity"
+#   data = {capacity_limit = 100}     # overrides of COMPONENT_DATA
+#
+# `data` overrides the model's constants (FARMER_DATA / COMPONENT_DATA),
+# `scenarios` replaces its scenario table with rows given either as lists
+# in column order or as tables keyed by column name; without it the
+# module's SCENARIOS are used. See book_cases.toml.
+ModelSpec = namedtuple('ModelSpec', ['module', 'data_constant', 'columns', 'options'])
+
+MODELS = {
+    'farmer': ModelSpec('farmer_model', 'FARMER_DATA', ('wheat', 'corn', 'beets', 'prob'),
+                        {'solver_id': str, 'integer': bool, 'method': ('loop', 'matrix')}),
+    'component': ModelSpec('component_model', 'COMPONENT_DATA', ('a_price', 'b_price', 'prob'),
+                           {'solver_id': str, 'method': ('expression', 'matrix')}),
+}
+CASE_KEYS = {'name', 'model', 'data', 'scenarios', 'options'}
+
+Case = namedtuple('Case', ['file', 'name', 'model', 'data', 'scenarios', 'options'])
+
+
+@lru_cache(maxsize=None)
+def parameter_names(model):
+    """Names of the constants a case may override, read from the model's source without importing it."""
+    spec = MODELS[model]
+    with open(importlib.util.find_spec(spec.module).origin) as source:
+        tree = ast.parse(source.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == spec.data_constant for t in node.targets):
+            return frozenset(ast.literal_eval(node.value))
+    raise Exception(f"{spec.module} defines no {spec.data_constant}.")
+
+
+def read_case_file(path):
+    """Parse a .json, .toml or .yaml case file into a dict."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path) as f:
+            return json.load(f)
+    if extension == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise Exception(f"{path}: reading YAML case files needs PyYAML (pip install pyyaml).")
+        with open(path) as f:
+            return yaml.safe_load(f)
+    raise Exception(f"{path}: unknown case file type {extension!r} (use .json, .toml or .yaml).")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def validate_case(case):
+    """Return a list of problems with `case` (empty when it is valid)."""
+    errors = [f"unknown key {key!r}" for key in sorted(set(case) - CASE_KEYS)]
+    model = case.get('model')
+    if model not in MODELS:
+        return errors + [f"model must be one of {sorted(MODELS)}, not {model!r}"]
+    spec = MODELS[model]
+
+    data = case.get('data', {})
+    if not isinstance(data, dict):
+        errors.append("data must be a table of parameter values")
+    else:
+        known = parameter_names(model)
+        for key, value in data.items():
+            if key not in known:
+                errors.append(f"unknown {model} parameter {key!r}")
+            elif not _is_number(value):
+                errors.append(f"parameter {key!r} must be a number, not {value!r}")
+
+    scenarios = case.get('scenarios')
+    if scenarios is not None:
+        if not isinstance(scenarios, list) or not scenarios:
+            errors.append("scenarios must be a non-empty list")
+        else:
+            probs = []
+            for i, row in enumerate(scenarios):
+                if isinstance(row, dict):
+                    if set(row) != set(spec.columns):
+                        errors.append(f"scenario {i + 1} must have exactly the keys {list(spec.columns)}")
+                        continue
+                    row = [row[column] for column in spec.columns]
+                if not isinstance(row, list) or len(row) != len(spec.columns) or not all(map(_is_number, row)):
+                    errors.append(f"scenario {i + 1} must be {len(spec.columns)} numbers {list(spec.columns)}")
+                    continue
+                probs.append(row[-1])
+            if len(probs) == len(scenarios) and (min(probs) < 0 or not math.isclose(math.fsum(probs), 1.0,
+                                                                                     abs_tol=1e-8)):
+                errors.append("scenario probabilities must be non-negative and sum to 1")
+
+    options = case.get('options', {})
+    if not isinstance(options, dict):
+        errors.append("options must be a table")
+    else:
+        for key, value in options.items():
+            expected = spec.options.get(key)
+            if expected is None:
+                errors.append(f"unknown {model} option {key!r}")
+            elif isinstance(expected, tuple) and value not in expected:
+                errors.append(f"option {key!r} must be one of {list(expected)}")
+            elif isinstance(expected, type) and not isinstance(value, expected):
+                errors.append(f"option {key!r} must be a {expected.__name__}")
+    return errors
+
+
+def load_cases(paths):
+    """Read and validate every case in `paths`; return (cases, errors)."""
+    cases, errors = [], []
+    for path in paths:
+        try:
+            content = read_case_file(path)
+        except Exception as error:
+            errors.append(f"{path}: {error}")
+            continue
+        if not isinstance(content, dict):
+            errors.append(f"{path}: a case file must hold a table")
+            continue
+        defaults = {key: value for key, value in content.items() if key != 'cases'}
+        entries = content.get('cases', [{}])
+        if not isinstance(entries, list):
+            errors.append(f"{path}: cases must be an array of tables")
+            continue
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                errors.append(f"{path}: cases[{i}] must be a table")
+                continue
+            case = {**defaults, **entry}
+            name = case.get('name', f'case {i + 1}')
+            problems = validate_case(case)
+            errors += [f"{path}: {name}: {problem}" for problem in problems]
+            if not problems:
+                cases.append(make_case(case, path, name))
+    return cases, errors
+
+
+def make_case(case, file=None, name=None):
+    """Turn a validated case table into a Case, with scenario rows in column order."""
+    scenarios = case.get('scenarios')
+    if scenarios is not None:
+        columns = MODELS[case['model']].columns
+        scenarios = [[row[c] for c in columns] if isinstance(row, dict) else row for row in scenarios]
+    return Case(file, case.get('name', name), case['model'], case.get('data', {}), scenarios,
+                case.get('options', {}))
+
+
+# ============================================
+# BATCH RUNNER
+# ============================================
+def solve_case(case):
+    """Build and solve one case; return a flat result row (status 'ERROR' on failure)."""
+    row = {'file': case.file, 'name': case.name, 'model': case.model}
+    try:
+        from instrumentation import instrumented_solve
+        module = importlib.import_module(MODELS[case.model].module)
+        model, result, record = instrumented_solve(module, case.scenarios, case.data, **case.options)
+    except Exception as error:
+        return {**row, 'status': 'ERROR', 'error': str(error)}
+    row.update({key: record[key] for key in ('scenarios', 'solver', 'status', 'profit', 'build_seconds',
+                                             'solve_seconds', 'iterations', 'nodes')})
+    names = [var.name() for var in model.solver.variables()[:result.num_first_stage]]
+    row.update(zip(names, result.first_stage.tolist()))
+    return row
+
+
+def run_batch(cases, processes=1):
+    """Solve `cases` on a pool of `processes` workers; rows come back in case order."""
+    if processes == 1 or len(cases) <= 1:
+        return [solve_case(case) for case in cases]
+    with multiprocessing.Pool(min(processes, len(cases))) as pool:
+        return pool.map(solve_case, cases, chunksize=max(1, len(cases) // (4 * processes)))
+
+
+def write_results(rows, path=None):
+    """Write every row at once: CSV for a .csv path, JSON lines otherwise (stdout without a path)."""
+    out = sys.stdout if path is None else open(path, 'w', newline='')
+    try:
+        if path is not None and path.lower().endswith('.csv'):
+            fields = list(dict.fromkeys(key for row in rows for key in row))
+            writer = csv.DictWriter(out, fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            out.write(''.join(json.dumps(row) + '\n' for row in rows))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve farmer / component case files as a batch')
+    parser.add_argument('files', nargs='+', help='.json, .toml or .yaml case files')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default=None, help='.csv or .jsonl results file (default: JSON lines on stdout)')
+    parser.add_argument('--validate', action='store_true', help='only check the files (does not load the solver)')
+    parser.add_argument('--dry-run', action='store_true', help='validate and list the cases without solving')
+    args = parser.parse_args()
+
+    cases, errors = load_cases(args.files)
+    for error in errors:
+        print(error, file=sys.stderr)
+    if errors:
+        sys.exit(1)
+    if args.validate:
+        print(f"{len(cases)} case(s) in {len(args.files)} file(s) are valid")
+    elif args.dry_run:
+        for case in cases:
+            scenarios = 'default scenarios' if case.scenarios is None else f'{len(case.scenarios)} scenario(s)'
+            print(f"{case.file}: {case.name}: {case.model}, {scenarios}, data {case.data}, options {case.options}")
+        print(f"{len(cases)} case(s) would run on {min(args.processes, len(cases))} worker(s)")
+    else:
+        rows = run_batch(cases, args.processes)
+        write_results(rows, args.output)
+        if any(row['status'] == 'ERROR' for row in rows):
+            sys.exit(1)
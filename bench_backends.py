@@ -0,0 +1,74 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import BACKENDS, configure, resolve_solver_id
+import component_model
+import farmer_model
+import farmer_multistage
+from matrix_form import load_matrix_form
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Every model in the repository on every suitable backend. Each model is
+# assembled once as a MatrixForm and loaded into each engine, so the time is
+# load + solve and the objective is directly comparable; "diff" is the
+# relative distance to the first backend that solved the model optimally.
+# The models with integer variables only go to the MIP engines; LPs go to
+# every engine.
+def models(sampled):
+    yield 'Ch1 deterministic (MIP)', farmer_model.extensive_form_arrays([(1.0, 1.0, 1.0, 1.0)], names=False)
+    yield 'Ch1 two-stage (MIP)', farmer_model.extensive_form_arrays(names=False)
+    yield f'farmer {sampled} scen. (MIP)', farmer_model.extensive_form_arrays(
+        farmer_model.sample_scenarios(sampled), names=False)
+    yield f'farmer {sampled} scen. (LP)', farmer_model.extensive_form_arrays(
+        farmer_model.sample_scenarios(sampled), integer=False, names=False)
+    yield 'Ch2 exercise 1 (LP)', component_model.extensive_form_arrays([(50, 60, 1.0)], names=False)
+    yield 'Ch2 exercise 2d (LP)', component_model.extensive_form_arrays(names=False)
+    yield f'component {10 * sampled} scen. (LP)', component_model.extensive_form_arrays(
+        component_model.sample_scenarios(10 * sampled), names=False)
+    yield 'farmer 5 seasons (LP)', farmer_multistage.deterministic_equivalent_arrays(farmer_multistage.farmer_tree(5))
+
+
+def run(sampled, time_limit, threads, backends):
+    print(f"{'model':>28} {'backend':>9} {'seconds':>9} {'status':>9} {'objective':>16} {'diff':>9}")
+    for name, form in models(sampled):
+        integer = bool(np.any(form.integer))
+        reference = None
+        auto = resolve_solver_id('auto', integer)
+        for solver_id in backends:
+            if integer and not BACKENDS[solver_id].integer:
+                continue
+            start = time.perf_counter()
+            try:
+                solver = load_matrix_form(form, solver_id)
+                configure(solver, threads=threads, time_limit=time_limit)
+            except Exception as error:
+                print(f"{name:>28} {solver_id:>9} {'-':>9} {'error':>9} {str(error)[:40]}")
+                continue
+            status = solver.Solve()
+            seconds = time.perf_counter() - start
+            objective = solver.Objective().Value() if status in (pywraplp.Solver.OPTIMAL,
+                                                                  pywraplp.Solver.FEASIBLE) else float('nan')
+            if reference is None and status == pywraplp.Solver.OPTIMAL:
+                reference = objective
+            diff = abs(objective - reference) / max(1.0, abs(reference)) if reference is not None else float('nan')
+            label = solver_id + ('*' if solver_id == auto else '')
+            print(f"{name:>28} {label:>9} {seconds:9.4f} {status:>9} {objective:16.4f} {diff:9.1e}")
+    print("* = engine chosen by solver_id='auto'; status 0 = optimal, 1 = feasible (time limit)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solver backend comparison on every model')
+    parser.add_argument('--sampled', type=int, default=100, help='scenario count of the sampled farmer models')
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS), default=list(BACKENDS))
+    args = parser.parse_args()
+    run(args.sampled, args.time_limit, args.threads, args.backends)
@@ -0,0 +1,68 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import benders
+import component_model
+import farmer_model
+from scenarios import replicate_scenarios
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Extensive form vs. single-cut and multi-cut L-shaped on the original
+# scenario data replicated up to the requested count (same optimum at every
+# size), or on sampled scenarios with --sampled. The farmer comparison uses
+# continuous recourse on both sides, the model the L-shaped method solves;
+# its master keeps integer acres, and --relax makes those continuous too.
+def extensive_form(module, scenarios, relax):
+    kwargs = {'integer': not relax} if module is farmer_model else {}
+    start = time.perf_counter()
+    if module is farmer_model and not relax:
+        # integer acres with continuous recourse: relax the scenario blocks only
+        form = farmer_model.extensive_form_arrays(scenarios, names=False)
+        integer = [True] * farmer_model.NUM_FIRST_STAGE + [False] * (len(form.c) - farmer_model.NUM_FIRST_STAGE)
+        model = farmer_model.load_matrix_form(form._replace(integer=integer), 'SCIP')
+        model.Solve()
+        return -model.Objective().Value(), time.perf_counter() - start
+    model = module.build_two_stage(scenarios, solver_id='GLOP', method='matrix', names=False, **kwargs)
+    model.solve()
+    return model.profit(), time.perf_counter() - start
+
+
+def decomposition(module, scenarios, relax, multi_cut, gap):
+    start = time.perf_counter()
+    form = module.two_stage_arrays(scenarios, integer=not relax) if module is farmer_model \
+        else module.two_stage_arrays(scenarios)
+    result = benders.solve_lshaped(form, multi_cut=multi_cut, gap=gap)
+    return result, time.perf_counter() - start
+
+
+def run(counts, sampled, relax, gap, seed):
+    print(f"{'model':>10} {'scenarios':>10} {'EF s':>9} {'EF profit':>13} "
+          f"{'1-cut s':>9} {'iters':>6} {'multi s':>9} {'iters':>6} {'max rel diff':>13}")
+    for name, module in (('component', component_model), ('farmer', farmer_model)):
+        for n in counts:
+            if sampled:
+                scenarios = module.sample_scenarios(n, seed=seed)
+            else:
+                scenarios = replicate_scenarios(module.SCENARIOS, n)
+            ef_profit, ef_time = extensive_form(module, scenarios, relax)
+            single, single_time = decomposition(module, scenarios, relax, False, gap)
+            multi, multi_time = decomposition(module, scenarios, relax, True, gap)
+            diff = max(abs(single.profit - ef_profit), abs(multi.profit - ef_profit)) / max(1.0, abs(ef_profit))
+            print(f"{name:>10} {n:>10} {ef_time:9.3f} {ef_profit:13.2f} "
+                  f"{single_time:9.3f} {single.iterations:>6} {multi_time:9.3f} {multi.iterations:>6} {diff:13.2e}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extensive form vs. L-shaped scaling benchmark')
+    parser.add_argument('--counts', type=int, nargs='+', default=[3, 100, 1000, 5000])
+    parser.add_argument('--sampled', action='store_true', help='use sampled instead of replicated scenarios')
+    parser.add_argument('--relax', action='store_true', help='continuous farmer acres')
+    parser.add_argument('--gap', type=float, default=1e-6)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.counts, args.sampled, args.relax, args.gap, args.seed)
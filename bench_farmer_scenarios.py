@@ -0,0 +1,78 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import math
+import time
+import tracemalloc
+
+from ortools.linear_solver import pywraplp
+
+import farmer_model
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Build and solve the extensive-form farmer model on sampled yield scenarios
+# and report how build time, solve time and build memory grow with the
+# scenario count. Integer solves are capped by --time-limit; the reported
+# gap is relative to the best bound CBC proved within that limit. With
+# --memory the build is repeated under tracemalloc to report the Python-side
+# peak allocation per scenario (tracemalloc slows the build, so it is not timed).
+STATUS_NAMES = {
+    pywraplp.Solver.OPTIMAL: 'OPTIMAL',
+    pywraplp.Solver.FEASIBLE: 'FEASIBLE',
+    pywraplp.Solver.INFEASIBLE: 'INFEASIBLE',
+    pywraplp.Solver.UNBOUNDED: 'UNBOUNDED',
+    pywraplp.Solver.ABNORMAL: 'ABNORMAL',
+    pywraplp.Solver.NOT_SOLVED: 'NOT_SOLVED',
+}
+
+
+def build_memory(scenarios, relax):
+    tracemalloc.start()
+    farmer_model.build_two_stage(scenarios, integer=not relax)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run(counts, time_limit, relax, seed, memory):
+    print(f"{'scenarios':>10} {'vars':>8} {'rows':>8} {'build s':>9} {'KB/scen':>8} "
+          f"{'solve s':>9} {'status':>10} {'profit':>14} {'gap %':>7}")
+    for n in counts:
+        scenarios = farmer_model.sample_scenarios(n, seed=seed)
+        kb_text = f"{build_memory(scenarios, relax) / 1024 / n:8.2f}" if memory else f"{'-':>8}"
+
+        start = time.perf_counter()
+        model = farmer_model.build_two_stage(scenarios, integer=not relax)
+        build_time = time.perf_counter() - start
+
+        model.solver.SetTimeLimit(int(time_limit * 1000))
+        start = time.perf_counter()
+        status = model.solve()
+        solve_time = time.perf_counter() - start
+
+        if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            objective = model.solver.Objective()
+            profit = model.profit()
+            gap = 100 * abs(objective.Value() - objective.BestBound()) / max(1.0, abs(objective.Value()))
+            profit_text = f"{profit:14.2f}"
+            gap_text = f"{gap:7.3f}" if math.isfinite(gap) and gap < 1e6 else f"{'-':>7}"
+        else:
+            profit_text, gap_text = f"{'-':>14}", f"{'-':>7}"
+
+        print(f"{n:>10} {model.solver.NumVariables():>8} {model.solver.NumConstraints():>8} "
+              f"{build_time:9.3f} {kb_text} {solve_time:9.3f} "
+              f"{STATUS_NAMES.get(status, status):>10} {profit_text} {gap_text}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Farmer extensive-form scaling benchmark')
+    parser.add_argument('--counts', type=int, nargs='+', default=[3, 10, 100, 1000, 10000])
+    parser.add_argument('--time-limit', type=float, default=10.0, help='solve time limit in seconds')
+    parser.add_argument('--relax', action='store_true', help='solve the LP relaxation (NumVar)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory', action='store_true', help='also report build memory per scenario')
+    args = parser.parse_args()
+    run(args.counts, args.time_limit, args.relax, args.seed, args.memory)
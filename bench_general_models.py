@@ -0,0 +1,94 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import component_general
+import farmer_general
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Build and solve time of the data-driven models as the instance grows.
+# Component model: products with a fixed number of components each, half
+# as many components as products, so the recipe's nonzeros grow linearly
+# while products x components grows quadratically. Farmer model: crops
+# drawn by farmer_general.sample_crops, solved as the LP relaxation.
+# "us/nz" is the matrix build time per nonzero of the extensive form,
+# which stays flat when the build is proportional to the nonzeros. Up to
+# --check-max products / crops the loop build is solved too and must reach
+# the same optimum.
+#
+# The solve, not the build, dominates as instances grow: the capacity
+# columns couple every scenario block, and simplex iterations grow faster
+# than the model (200 products under GLOP: 0.7 s at 10 scenarios, 8.5 s
+# at 30, 144 s at 100; PDLP 0.9 s, 1.8 s, 2.6 s; 1000 products at 10
+# scenarios: GLOP 506 s, PDLP 3.9 s). Pass --solver-id PDLP for the
+# larger runs.
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def compare(build, check):
+    """Build with both methods and solve the matrix build; return (model, matrix s, loop s, solve s)."""
+    model, matrix_seconds = timed(lambda: build('matrix'))
+    loop_model, loop_seconds = timed(lambda: build('loop'))
+    _, solve_seconds = timed(model.solve)
+    if check:
+        loop_model.solve()
+        if abs(model.profit() - loop_model.profit()) > 1e-6 * max(1.0, abs(model.profit())):
+            raise Exception(f"build paths disagree: {model.profit()} vs {loop_model.profit()}")
+    return model, matrix_seconds, loop_seconds, solve_seconds
+
+
+def run_components(counts, scenarios, per_product, solver_id, check_max, seed):
+    print(f"{'products':>9} {'comps':>6} {'recipe nz':>10} {'pairs':>9} {'model nz':>9} {'matrix s':>9} "
+          f"{'loop s':>8} {'solve s':>8} {'iters':>7} {'us/nz':>6} {'profit':>14}")
+    for num_products in counts:
+        num_components = max(2, num_products // 2)
+        plant = component_general.sample_production(num_products, num_components, per_product, seed)
+        table = component_general.sample_scenarios(scenarios, plant, seed=seed)
+        model, matrix_seconds, loop_seconds, solve_seconds = compare(
+            lambda method: component_general.build_two_stage(plant, table, solver_id, method),
+            num_products <= check_max)
+        nonzeros = component_general.extensive_form_arrays(plant, table, names=False).A.nnz
+        print(f"{num_products:9d} {num_components:6d} {plant.recipe.nnz:10d} {num_products * num_components:9d} "
+              f"{nonzeros:9d} {matrix_seconds:9.4f} {loop_seconds:8.4f} {solve_seconds:8.4f} "
+              f"{model.solver.iterations():7d} {1e6 * matrix_seconds / nonzeros:6.2f} {model.profit():14.2f}", flush=True)
+
+
+def run_crops(counts, scenarios, solver_id, check_max, seed):
+    print(f"{'crops':>9} {'model nz':>9} {'matrix s':>9} {'loop s':>8} {'solve s':>8} {'iters':>7} {'us/nz':>6} "
+          f"{'profit':>14}")
+    for num_crops in counts:
+        crops = farmer_general.sample_crops(num_crops, seed)
+        table = farmer_general.sample_scenarios(scenarios, num_crops, seed=seed)
+        model, matrix_seconds, loop_seconds, solve_seconds = compare(
+            lambda method: farmer_general.build_two_stage(crops, table, solver_id=solver_id, integer=False,
+                                                          method=method),
+            num_crops <= check_max)
+        nonzeros = farmer_general.extensive_form_arrays(crops, table, names=False).A.nnz
+        print(f"{num_crops:9d} {nonzeros:9d} {matrix_seconds:9.4f} {loop_seconds:8.4f} {solve_seconds:8.4f} "
+              f"{model.solver.iterations():7d} {1e6 * matrix_seconds / nonzeros:6.2f} {model.profit():14.2f}", flush=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build and solve time of the general crop / product models')
+    parser.add_argument('--products', type=int, nargs='+', default=[2, 10, 50, 200, 500])
+    parser.add_argument('--crops', type=int, nargs='+', default=[3, 10, 40, 100, 400])
+    parser.add_argument('--scenarios', type=int, default=10)
+    parser.add_argument('--solver-id', default='auto', help='LP engine (see backends.py)')
+    parser.add_argument('--check-max', type=int, default=200,
+                        help='largest product / crop count whose loop build is solved and compared')
+    parser.add_argument('--per-product', type=int, default=3, help='components in each product\'s recipe')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(f"Component model, {args.scenarios} price scenarios:")
+    run_components(args.products, args.scenarios, args.per_product, args.solver_id, args.check_max, args.seed)
+    print(f"\nFarmer model (LP relaxation), {args.scenarios} yield scenarios:")
+    run_crops(args.crops, args.scenarios, args.solver_id, args.check_max, args.seed)
@@ -0,0 +1,70 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import component_model
+import farmer_model
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Compare build time of the per-term construction paths against the bulk
+# sparse-matrix path for both two-stage models, and check that the two paths
+# reach the same optimum on the original scenario data and on sampled
+# instances up to --check-max scenarios (farmer checks use the LP relaxation
+# beyond the three-scenario case, where the MIP is slow to prove optimal).
+# The matrix path is timed with and without variable names, since setting
+# names is a per-column call that the bulk load cannot avoid.
+MODELS = {
+    'component': (component_model, 'expression'),
+    'farmer': (farmer_model, 'loop'),
+}
+
+
+def timed_build(module, scenarios, method, **kwargs):
+    start = time.perf_counter()
+    model = module.build_two_stage(scenarios, method=method, **kwargs)
+    return model, time.perf_counter() - start
+
+
+def check_optimum(module, scenarios, reference, **kwargs):
+    objectives = []
+    for method in (reference, 'matrix'):
+        model = module.build_two_stage(scenarios, method=method, **kwargs)
+        model.solve()
+        objectives.append(model.profit())
+    if abs(objectives[0] - objectives[1]) > 1e-6 * max(1.0, abs(objectives[0])):
+        raise AssertionError(f"{module.__name__}: optima differ {objectives}")
+    return objectives[0]
+
+
+def run(counts, check_max, seed):
+    print("Original scenario data:")
+    print(f"  component profit = {check_optimum(component_model, component_model.SCENARIOS, 'expression'):.2f}")
+    print(f"  farmer profit    = {check_optimum(farmer_model, farmer_model.SCENARIOS, 'loop'):.2f}")
+    print()
+
+    print(f"{'model':>10} {'scenarios':>10} {'per-term s':>11} {'matrix s':>10} "
+          f"{'unnamed s':>10} {'speedup':>8} {'optimum':>14}")
+    for name, (module, reference) in MODELS.items():
+        extra = {'integer': False} if module is farmer_model else {}
+        for n in counts:
+            scenarios = module.sample_scenarios(n, seed=seed)
+            _, reference_time = timed_build(module, scenarios, reference, **extra)
+            _, matrix_time = timed_build(module, scenarios, 'matrix', **extra)
+            _, unnamed_time = timed_build(module, scenarios, 'matrix', names=False, **extra)
+            optimum = f"{check_optimum(module, scenarios, reference, **extra):14.2f}" if n <= check_max else f"{'-':>14}"
+            print(f"{name:>10} {n:>10} {reference_time:11.4f} {matrix_time:10.4f} "
+                  f"{unnamed_time:10.4f} {reference_time / matrix_time:8.1f} {optimum}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Per-term vs. sparse-matrix build benchmark')
+    parser.add_argument('--counts', type=int, nargs='+', default=[3, 100, 1000, 10000, 50000])
+    parser.add_argument('--check-max', type=int, default=1000,
+                        help='largest scenario count whose optimum is compared across paths')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.counts, args.check_max, args.seed)
@@ -0,0 +1,122 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+import component_model
+import farmer_model
+import model_io
+from matrix_form import solver_matrix_form
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Getting a built extensive form back into a solver: rebuilt from the
+# scenario table (per-term construction and the bulk matrix path), reloaded
+# from a model directory (memory-mapped or read, with and without column
+# names, and as a bare solver without the model class's per-variable
+# handles), and read from MPS and LP. Every path is solved and its
+# objective checked against the per-term rebuild. The farmer model is its LP
+# relaxation, so the check is a quick GLOP solve. "MB" is the size on
+# disk; "speedup" is against the per-term rebuild.
+MODELS = {
+    'farmer': (farmer_model, 'loop', {'integer': False}),
+    'component': (component_model, 'expression', {}),
+}
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2 ** 20
+    return os.path.getsize(path) / 2 ** 20
+
+
+def objective(model_or_solver):
+    solver = model_io._solver(model_or_solver)
+    solver.Solve()
+    return solver.Objective().Value()
+
+
+def check_small_coefficients(directory):
+    """Write a model with tiny and negative coefficients as MPS and LP; both must read back exactly."""
+    solver = pywraplp.Solver.CreateSolver('GLOP')
+    x, y = solver.NumVar(0, 10, 'x'), solver.NumVar(-5, 10, 'y')
+    solver.Add(1e-05 * x + y <= 4)
+    solver.Add(x - 3e-08 * y >= 1)
+    solver.Minimize(2.5e-07 * x - y)
+    expected = solver_matrix_form(solver)
+    for extension in model_io.TEXT_FORMATS:
+        path = os.path.join(directory, f'small_coefficients{extension}')
+        model_io.export_text(solver, path)
+        form = solver_matrix_form(model_io.import_text(path))
+        for field in ('c', 'row_lb', 'row_ub', 'col_lb', 'col_ub'):
+            if not np.array_equal(getattr(form, field), getattr(expected, field)):
+                raise Exception(f"{path}: {field} reads back as {getattr(form, field)}, "
+                                f"expected {getattr(expected, field)}")
+        if (form.A != expected.A).nnz:
+            raise Exception(f"{path}: constraint matrix reads back as {form.A.toarray()}, "
+                            f"expected {expected.A.toarray()}")
+
+
+def run(scenarios, directory):
+    print(f"{'model':>10} {'scen':>6} {'path':>26} {'seconds':>9} {'MB':>8} {'speedup':>8} {'obj diff':>9}")
+    for name, (module, method, options) in MODELS.items():
+        table = module.sample_scenarios(scenarios)
+        model = module.build_two_stage(table, method=method, **options)
+        reference = objective(model)
+        binary = os.path.join(directory, f'{name}_{scenarios}')
+        mps, lp = binary + '.mps', binary + '.lp'
+        _, save_seconds = timed(lambda: model_io.save_model(model, binary))
+        _, mps_seconds = timed(lambda: model_io.export_text(model, mps))
+        _, lp_seconds = timed(lambda: model_io.export_text(model, lp))
+
+        paths = [
+            (f'rebuild ({method})', lambda: module.build_two_stage(table, method=method, **options), None),
+            ('rebuild (matrix)', lambda: module.build_two_stage(table, method='matrix', **options), None),
+            ('reload mmap', lambda: model_io.load_model(binary), binary),
+            ('reload mmap, no names', lambda: model_io.load_model(binary, names=False), binary),
+            ('reload read', lambda: model_io.load_model(binary, mmap=False), binary),
+            ('reload mmap, solver only', lambda: model_io.load_model(binary, names=False, wrap=False), binary),
+            ('import MPS', lambda: model_io.import_text(mps), mps),
+            ('import LP', lambda: model_io.import_text(lp), lp),
+        ]
+        rebuild_seconds = None
+        for label, load, path in paths:
+            loaded, seconds = timed(load)
+            rebuild_seconds = rebuild_seconds or seconds
+            diff = abs(objective(loaded) - reference) / max(1.0, abs(reference))
+            if diff > 1e-9:
+                raise Exception(f"{name}: {label} reaches {objective(loaded)}, expected {reference}")
+            size = f"{size_mb(path):8.1f}" if path else f"{'':>8}"
+            print(f"{name:>10} {scenarios:6d} {label:>26} {seconds:9.3f} {size} "
+                  f"{rebuild_seconds / seconds:7.1f}x {diff:9.1e}")
+        print(f"{name:>10} {scenarios:6d} {'(save binary / MPS / LP)':>26} {save_seconds:9.3f} / {mps_seconds:.3f} / "
+              f"{lp_seconds:.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reload of saved models against rebuilding them')
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[10000])
+    parser.add_argument('--directory', default=None, help='where to write the files (default: a temporary directory)')
+    args = parser.parse_args()
+    directory = args.directory or tempfile.mkdtemp(prefix='bench_model_io_')
+    try:
+        check_small_coefficients(directory)
+        for n in args.scenarios:
+            run(n, directory)
+    finally:
+        if args.directory is None:
+            shutil.rmtree(directory)
@@ -0,0 +1,84 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import numpy as np
+
+import component_model
+from sensitivity import parameter_setter, parametric
+
+# ============================================
+# BENCHMARK
+# ============================================
+# The optimal-value curve of the component model over one parameter,
+# traced by parametric() (one warm solve per basis change) against a grid
+# of re-solves: warm (the built model updated in place) and cold (a model
+# built per point). "max error" compares the parametric curve, evaluated
+# by interpolation between its breakpoints, with the warm grid.
+CASES = [
+    ('capacity_limit', 60.0, 200.0),
+    ('c1_capacity_cost', 0.0, 400.0),
+    ('a_price', 0.0, 150.0),
+]
+
+
+def build(two_stage):
+    return component_model.build_two_stage() if two_stage else component_model.build_deterministic()
+
+
+def grid_warm(parameter, grid, two_stage):
+    model = build(two_stage)
+    model.solve()
+    _, set_value = parameter_setter(model, parameter)
+    values = []
+    for value in grid.tolist():
+        set_value(value)
+        model.solve(warm=True)
+        values.append(model.profit())
+    return np.array(values)
+
+
+def grid_cold(parameter, grid, two_stage):
+    values = []
+    for value in grid.tolist():
+        model = build(two_stage)
+        parameter_setter(model, parameter)[1](value)
+        model.solve()
+        values.append(model.profit())
+    return np.array(values)
+
+
+def run(points, two_stage):
+    print(f"{'parameter':>18} {'method':>12} {'seconds':>9} {'solves':>7} {'pieces':>7} {'max error':>10} {'speedup':>8}")
+    for parameter, start, stop in CASES:
+        grid = np.linspace(start, stop, points)
+        t0 = time.perf_counter()
+        model = build(two_stage)
+        model.solve()
+        curve = parametric(model, parameter, start, stop)
+        parametric_seconds = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        warm = grid_warm(parameter, grid, two_stage)
+        warm_seconds = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cold = grid_cold(parameter, grid, two_stage)
+        cold_seconds = time.perf_counter() - t0
+        error = np.max(np.abs(np.interp(grid, curve.breakpoints, curve.values) - warm))
+        if not np.allclose(warm, cold):
+            raise Exception(f"Warm and cold grids disagree over {parameter}.")
+        print(f"{parameter:>18} {'parametric':>12} {parametric_seconds:9.4f} {curve.solves:7d} "
+              f"{len(curve.slopes):7d} {error:10.2e} {'':>8}")
+        print(f"{'':>18} {'grid warm':>12} {warm_seconds:9.4f} {points:7d} {'':>7} {'':>10} "
+              f"{warm_seconds / parametric_seconds:7.1f}x")
+        print(f"{'':>18} {'grid cold':>12} {cold_seconds:9.4f} {points:7d} {'':>7} {'':>10} "
+              f"{cold_seconds / parametric_seconds:7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parametric LP against grid sweeps on the component model')
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--two-stage', action='store_true', help='use the three price cases (default: Ch2 exercise 1)')
+    args = parser.parse_args()
+    run(args.points, args.two_stage)
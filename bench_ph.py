@@ -0,0 +1,56 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+from ortools.linear_solver import pywraplp
+
+import farmer_model
+import ph
+from results import STATUS_NAMES
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Integer farmer model (integer acres and tons): the monolithic extensive
+# form solved by CBC under a time limit vs. progressive hedging. Three
+# scenarios are the book data; larger counts are sampled yields. "gap" is
+# the PH profit shortfall relative to the best extensive-form solution
+# found, and "WS bound" is PH's iteration-0 wait-and-see bound.
+def extensive_form(scenarios, time_limit):
+    start = time.perf_counter()
+    model = farmer_model.build_two_stage(scenarios, method='matrix', names=False)
+    model.solver.SetTimeLimit(int(time_limit * 1000))
+    status = model.solve()
+    profit = model.profit() if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE) else float('nan')
+    return profit, STATUS_NAMES.get(status, str(status)), time.perf_counter() - start
+
+
+def run(counts, time_limit, rho_factor, rho_growth, max_iterations, processes, seed):
+    print(f"{'scenarios':>10} {'EF s':>9} {'EF status':>10} {'EF profit':>12} {'PH s':>9} {'iters':>6} "
+          f"{'converged':>9} {'PH profit':>12} {'gap %':>7} {'WS bound':>12}")
+    for n in counts:
+        scenarios = farmer_model.SCENARIOS if n == 3 else farmer_model.sample_scenarios(n, seed=seed)
+        ef_profit, ef_status, ef_time = extensive_form(scenarios, time_limit)
+        start = time.perf_counter()
+        result = ph.solve_ph(farmer_model, scenarios, rho_factor=rho_factor, rho_growth=rho_growth,
+                             max_iterations=max_iterations, time_limit=time_limit, processes=processes)
+        ph_time = time.perf_counter() - start
+        gap = 100 * (ef_profit - result.profit) / abs(ef_profit)
+        print(f"{n:>10} {ef_time:9.2f} {ef_status:>10} {ef_profit:12.2f} {ph_time:9.2f} {result.iterations:>6} "
+              f"{str(result.converged):>9} {result.profit:12.2f} {gap:7.3f} {result.bound:12.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extensive form vs. progressive hedging on the integer farmer model')
+    parser.add_argument('--counts', type=int, nargs='+', default=[3, 10, 100, 1000])
+    parser.add_argument('--time-limit', type=float, default=300, help='seconds per method and count')
+    parser.add_argument('--rho-factor', type=float, default=1.0)
+    parser.add_argument('--rho-growth', type=float, default=1.1)
+    parser.add_argument('--max-iterations', type=int, default=50)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.counts, args.time_limit, args.rho_factor, args.rho_growth, args.max_iterations, args.processes,
+        args.seed)
@@ -0,0 +1,54 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import component_model
+import farmer_model
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Compare the ways of getting a solution out of a solved extensive form:
+# printing every variable (what the chapter scripts do, and what callers
+# used to parse), one solution_value() call per variable, a SolveResult
+# snapshot, and a SolveResult written to a binary .npz file.
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(sizes, repeat):
+    print(f"{'model':>10} {'scenarios':>10} {'columns':>8} {'print s':>9} {'loop s':>9} "
+          f"{'result s':>9} {'save s':>9}")
+    path = os.path.join(tempfile.mkdtemp(), 'result.npz')
+    for name, module, sample, solver_id in (('component', component_model, component_model.sample_scenarios, 'GLOP'),
+                                            ('farmer', farmer_model, farmer_model.sample_scenarios, 'GLOP')):
+        for n in sizes:
+            kwargs = {'integer': False} if module is farmer_model else {}
+            model = module.build_two_stage(sample(n), solver_id=solver_id, method='matrix', **kwargs)
+            model.solve()
+            variables = model.solver.variables()
+            with contextlib.redirect_stdout(io.StringIO()):
+                print_time = timed(model.print_results, repeat)
+            loop_time = timed(lambda: [var.solution_value() for var in variables], repeat)
+            result_time = timed(model.result, repeat)
+            result = model.result()
+            save_time = timed(lambda: result.save(path), repeat)
+            print(f"{name:>10} {n:>10} {len(variables):>8} {print_time:9.4f} {loop_time:9.4f} "
+                  f"{result_time:9.4f} {save_time:9.4f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solution extraction: printing vs. SolveResult')
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.scenarios, args.repeat)
@@ -0,0 +1,112 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import numpy as np
+
+import component_model
+import farmer_model
+from risk import CVaRLShaped, CVaRObjective, chance_frontier
+
+# ============================================
+# BENCHMARK
+# ============================================
+# A CVaR frontier over sampled scenario tables, solved four ways: the
+# extensive form rebuilt per alpha (cold) or re-solved in place (warm), and
+# the L-shaped decomposition with a fresh master per alpha (cold) or one
+# master whose cuts carry over (warm). The farmer model is its LP
+# relaxation here so both formulations solve the same problem. "profit" is
+# the risk-adjusted objective in profit terms at the last alpha. The
+# chance-constrained farmer keeps the planting decisions continuous too;
+# the binaries are the scenario violation indicators.
+MODELS = {'farmer': farmer_model, 'component': component_model}
+
+
+def extensive_cold(module, scenarios, alphas, weight):
+    values = []
+    for alpha in alphas:
+        model = module.build_two_stage(scenarios, **_options(module))
+        CVaRObjective(model, alpha, weight)
+        model.solve()
+        values.append(model.solver.Objective().Value())
+    return values
+
+
+def extensive_warm(module, scenarios, alphas, weight):
+    model = module.build_two_stage(scenarios, **_options(module))
+    mode = CVaRObjective(model, alphas[0], weight)
+    values = []
+    for i, alpha in enumerate(alphas):
+        mode.set(alpha)
+        model.solve(warm=i > 0)
+        values.append(model.solver.Objective().Value())
+    return values
+
+
+def lshaped_cold(module, scenarios, alphas, weight, processes):
+    values = []
+    for alpha in alphas:
+        with CVaRLShaped(_form(module, scenarios), processes) as solver:
+            values.append(solver.solve(alpha, weight).objective)
+    return values
+
+
+def lshaped_warm(module, scenarios, alphas, weight, processes):
+    with CVaRLShaped(_form(module, scenarios), processes) as solver:
+        return [solver.solve(alpha, weight).objective for alpha in alphas]
+
+
+def _options(module):
+    return {'integer': False} if module is farmer_model else {}
+
+
+def _form(module, scenarios):
+    return module.two_stage_arrays(scenarios, **_options(module))
+
+
+def run(sizes, alphas, weight, processes, chance_sizes, levels):
+    print(f"CVaR frontier over alphas {alphas}, weight {weight}")
+    print(f"{'model':>10} {'scen':>6} {'method':>18} {'seconds':>9} {'profit':>14} {'max diff':>9}")
+    for name, module in MODELS.items():
+        for n in sizes:
+            scenarios = module.sample_scenarios(n)
+            reference = None
+            for method, run_method in (('extensive cold', lambda: extensive_cold(module, scenarios, alphas, weight)),
+                                       ('extensive warm', lambda: extensive_warm(module, scenarios, alphas, weight)),
+                                       ('L-shaped cold', lambda: lshaped_cold(module, scenarios, alphas, weight,
+                                                                              processes)),
+                                       ('L-shaped warm', lambda: lshaped_warm(module, scenarios, alphas, weight,
+                                                                              processes))):
+                start = time.perf_counter()
+                values = np.array(run_method())
+                seconds = time.perf_counter() - start
+                # both formulations minimize cost; the component extensive form maximizes profit
+                costs = -values if (module is component_model and method.startswith('extensive')) else values
+                reference = costs if reference is None else reference
+                diff = np.max(np.abs(costs - reference) / np.maximum(1.0, np.abs(reference)))
+                print(f"{name:>10} {n:6d} {method:>18} {seconds:9.3f} {-costs[-1]:14.2f} {diff:9.1e}")
+
+    print(f"\nFarmer no-purchase chance constraint (continuous recourse, CBC) over levels {levels}")
+    print(f"{'scen':>6} {'level':>6} {'s/level':>9} {'E[profit]':>12} {'violation':>10}")
+    for n in chance_sizes:
+        start = time.perf_counter()
+        model = farmer_model.build_two_stage(farmer_model.sample_scenarios(n), integer=False, solver_id='CBC')
+        points = chance_frontier(model, levels)
+        seconds = time.perf_counter() - start
+        for point in points:
+            print(f"{n:6d} {point.parameter:6.2f} {seconds / len(levels):9.3f} {point.expected_profit:12.2f} "
+                  f"{point.violation:10.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='CVaR frontier and chance constraint benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.5, 0.8, 0.9, 0.95, 0.99])
+    parser.add_argument('--weight', type=float, default=0.5)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--chance-sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--levels', type=float, nargs='+', default=[0.8, 0.9, 0.95])
+    args = parser.parse_args()
+    run(args.sizes, args.alphas, args.weight, args.processes, args.chance_sizes, args.levels)
@@ -0,0 +1,58 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import numpy as np
+
+from rolling_horizon import RollingHorizon, forecast_stream
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Weekly re-planning over a shifting forecast set, three ways: rebuild the
+# model over the active forecasts and solve it from scratch every week;
+# keep one live model and append the new forecasts; keep one live model
+# and refill the retired forecasts' slots. Both live variants re-solve warm
+# and are checked against the rebuild's profit every week. Week 0 (the
+# initial build and solve) is excluded from the latencies.
+MODES = ('rebuild', 'append', 'refill')
+
+
+def run(num_forecasts, turnover, weeks, seed):
+    stream = forecast_stream(num_forecasts, turnover, weeks, seed=seed)
+    forecasts = next(stream)
+    planners = {mode: RollingHorizon(forecasts, reuse=mode == 'refill') for mode in MODES[1:]}
+    for planner in planners.values():
+        planner.replan()
+    latencies = {mode: [] for mode in MODES}
+    for add, retire in stream:
+        for mode, planner in planners.items():
+            latencies[mode].append(planner.replan(add, retire).seconds)
+        start = time.perf_counter()
+        fresh = planners['refill'].rebuild()
+        fresh.solve()
+        latencies['rebuild'].append(time.perf_counter() - start)
+        for mode, planner in planners.items():
+            if abs(planner.model.profit() - fresh.profit()) > 1e-6 * max(1.0, abs(fresh.profit())):
+                raise Exception(f"{mode}: profit {planner.model.profit()} != rebuilt {fresh.profit()}")
+
+    rebuild_mean = np.mean(latencies['rebuild'])
+    for mode in MODES:
+        values = 1000 * np.array(latencies[mode])
+        slots = planners[mode].model.num_scenarios if mode in planners else num_forecasts
+        print(f"{num_forecasts:10d} {mode:>8} {slots:6d} {values.mean():9.2f} {np.median(values):9.2f} "
+              f"{values.max():9.2f} {rebuild_mean / np.mean(latencies[mode]):8.1f}x", flush=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rolling-horizon re-planning: live model vs. weekly rebuild')
+    parser.add_argument('--forecasts', type=int, nargs='+', default=[100, 300, 1000, 3000])
+    parser.add_argument('--turnover', type=int, default=5)
+    parser.add_argument('--weeks', type=int, default=52)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(f"{'forecasts':>10} {'mode':>8} {'slots':>6} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9} {'speedup':>9}")
+    for n in args.forecasts:
+        run(n, args.turnover, args.weeks, args.seed)
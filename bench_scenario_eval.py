@@ -0,0 +1,63 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import os
+import time
+
+import numpy as np
+
+import component_model
+import farmer_model
+from recourse import ScenarioEvaluator
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Throughput of recourse evaluation at a fixed first-stage decision as the
+# process count grows. Pool start-up is timed separately from evaluation,
+# since the evaluator is meant to stay alive across repeated calls.
+FIRST_STAGE = {
+    'component': (component_model, [69.1666667, 50.8333333]),
+    'farmer': (farmer_model, [170, 80, 250]),
+}
+
+
+def process_counts(limit):
+    counts, p = [], 1
+    while p < limit:
+        counts.append(p)
+        p *= 2
+    return counts + [limit]
+
+
+def run(num_scenarios, max_processes, repeats, seed):
+    print(f"{'model':>10} {'procs':>6} {'start s':>8} {'eval s':>8} {'scen/s':>10} {'speedup':>8}")
+    for name, (module, x) in FIRST_STAGE.items():
+        form = module.two_stage_arrays(module.sample_scenarios(num_scenarios, seed=seed))
+        reference, serial_time = None, None
+        for processes in process_counts(max_processes):
+            start = time.perf_counter()
+            with ScenarioEvaluator(form, processes) as evaluator:
+                startup = time.perf_counter() - start
+                evaluator.evaluate(x)   # warm-up
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    values, duals = evaluator.evaluate(x)
+                elapsed = (time.perf_counter() - start) / repeats
+            if reference is None:
+                reference, serial_time = (values, duals), elapsed
+            elif not (np.allclose(values, reference[0]) and np.allclose(duals, reference[1])):
+                raise AssertionError(f"{name}: parallel results differ from serial with {processes} processes")
+            print(f"{name:>10} {processes:>6} {startup:8.3f} {elapsed:8.3f} "
+                  f"{num_scenarios / elapsed:10.0f} {serial_time / elapsed:8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parallel recourse evaluation benchmark')
+    parser.add_argument('--scenarios', type=int, default=20000)
+    parser.add_argument('--max-processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.scenarios, args.max_processes, args.repeats, args.seed)
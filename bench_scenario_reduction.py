@@ -0,0 +1,58 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import benders
+import component_model
+import farmer_model
+from recourse import evaluate_scenarios
+from scenarios import reduce_scenarios
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Reduce a large sampled scenario table with fast forward selection and
+# report the trade-off between solve time and objective error. "error" is
+# the gap between the reduced optimum and the full optimum; "loss" is how
+# much worse the reduced first-stage decision does when evaluated on the
+# full table. All problems are solved with the L-shaped method.
+def evaluate(module, table, x):
+    form = module.two_stage_arrays(table)
+    values, _ = evaluate_scenarios(form, x, processes=1)
+    return form.profit_sign * (form.c @ x + form.probs @ values)
+
+
+def run(num_scenarios, sizes, seed):
+    print(f"{'model':>10} {'keep':>6} {'reduce s':>9} {'solve s':>8} {'kantorovich':>12} "
+          f"{'profit':>12} {'error %':>8} {'loss %':>8}")
+    for name, module in (('component', component_model), ('farmer', farmer_model)):
+        table = module.sample_scenarios(num_scenarios, seed=seed)
+        start = time.perf_counter()
+        full = benders.solve_lshaped(module.two_stage_arrays(table))
+        full_time = time.perf_counter() - start
+        print(f"{name:>10} {num_scenarios:>6} {'-':>9} {full_time:8.3f} {0:12.4f} {full.profit:12.2f} "
+              f"{0:8.3f} {0:8.3f}")
+
+        for keep in sizes:
+            start = time.perf_counter()
+            reduced = reduce_scenarios(table, keep)
+            reduce_time = time.perf_counter() - start
+            start = time.perf_counter()
+            result = benders.solve_lshaped(module.two_stage_arrays(reduced.table))
+            solve_time = time.perf_counter() - start
+
+            error = 100 * abs(result.profit - full.profit) / abs(full.profit)
+            loss = 100 * (full.profit - evaluate(module, table, result.x)) / abs(full.profit)
+            print(f"{name:>10} {keep:>6} {reduce_time:9.3f} {solve_time:8.3f} {reduced.distance:12.4f} "
+                  f"{result.profit:12.2f} {error:8.3f} {loss:8.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scenario reduction error vs. solve time report')
+    parser.add_argument('--scenarios', type=int, default=10000)
+    parser.add_argument('--keep', type=int, nargs='+', default=[5, 10, 25, 50, 100, 200])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.scenarios, args.keep, args.seed)
@@ -0,0 +1,51 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import farmer_model
+import farmer_multistage
+from sddp import solve_sddp
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Multi-season farmer over stagewise-independent yield trees: the
+# deterministic equivalent (one block per tree node, skipped above
+# --max-de-nodes) vs. SDDP (one LP per season plus cuts). "rows" is the
+# total LP row count each method holds, the memory driver: it grows with
+# the tree for the deterministic equivalent and with seasons x cuts for SDDP.
+def run(seasons, outcomes, forward_paths, max_de_nodes, seed):
+    print(f"{'seasons':>7} {'outcomes':>8} {'nodes':>9} {'DE s':>8} {'DE rows':>9} {'DE profit':>12} "
+          f"{'SDDP s':>8} {'iters':>6} {'SDDP rows':>9} {'SDDP profit':>12} {'policy profit':>24}")
+    for k in outcomes:
+        scenarios = farmer_model.SCENARIOS if k == 3 else farmer_model.sample_scenarios(k, seed=seed)
+        for num_seasons in seasons:
+            tree = farmer_multistage.farmer_tree(num_seasons, scenarios)
+            de = '-', '-', '-'
+            if tree.num_nodes <= max_de_nodes:
+                start = time.perf_counter()
+                profit, _ = farmer_multistage.solve_deterministic_equivalent(tree)
+                de = (f"{time.perf_counter() - start:.2f}", farmer_multistage.NODE_ROWS * tree.num_nodes,
+                      f"{profit:.2f}")
+
+            start = time.perf_counter()
+            stages = farmer_multistage.stage_problems(tree)
+            result = solve_sddp(tree, stages, forward_paths, seed=seed)
+            sddp_time = time.perf_counter() - start
+            rows = sum(stage.solver.NumConstraints() for stage in stages)
+            policy = f"{-result.upper_bound:.2f} +/- {result.upper_half_width:.2f}"
+            print(f"{num_seasons:>7} {k:>8} {tree.num_nodes:>9} {de[0]:>8} {de[1]:>9} {de[2]:>12} "
+                  f"{sddp_time:8.2f} {result.iterations:>6} {rows:>9} {result.profit:12.2f} {policy:>24}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Deterministic equivalent vs. SDDP for multi-season planning')
+    parser.add_argument('--seasons', type=int, nargs='+', default=[2, 3, 4, 5])
+    parser.add_argument('--outcomes', type=int, nargs='+', default=[3, 10])
+    parser.add_argument('--forward-paths', type=int, default=10)
+    parser.add_argument('--max-de-nodes', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.seasons, args.outcomes, args.forward_paths, args.max_de_nodes, args.seed)
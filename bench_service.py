@@ -0,0 +1,170 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# ============================================
+# BENCHMARK
+# ============================================
+# A load generator against service.py on a local port: `clients`
+# concurrent keep-alive connections each send `requests` what-if queries
+# drawn from a pool of distinct queries with skewed popularity, so hot
+# queries overlap in flight the way dashboard users repeat each other.
+# Each service configuration runs in its own server process; latency is
+# measured at the client, from request to full response. The baseline
+# is the current practice: one `python batch.py case.json` subprocess per
+# query, run one at a time on an otherwise idle machine.
+CONFIGURATIONS = {
+    'process, batch + coalesce': ['--executor', 'process'],
+    'process, neither': ['--executor', 'process', '--batch-window', '0', '--max-batch', '1', '--no-coalesce'],
+    'thread, batch + coalesce': ['--executor', 'thread'],
+    'thread, neither': ['--executor', 'thread', '--batch-window', '0', '--max-batch', '1', '--no-coalesce'],
+}
+# book optima that every configuration must reproduce under load
+CHECKS = [
+    ({'model': 'farmer'}, 108390.0),
+    ({'model': 'farmer', 'scenarios': [[0.8, 0.8, 0.8, 1.0]]}, 59950.0),
+    ({'model': 'component'}, 5990.0),
+    ({'model': 'component', 'data': {'capacity_limit': 100}}, 5450.0),
+]
+
+
+def query_pool(size, seed=0):
+    """`size` distinct what-if queries over both models' default scenario tables."""
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < size:
+        if rng.random() < 0.5:
+            data = {'total_land': rng.choice(range(400, 601, 10)), 'purchase_markup': rng.choice([1.2, 1.4, 1.6])}
+            query = {'model': 'farmer', 'data': data}
+        else:
+            data = {'capacity_limit': rng.choice(range(80, 161, 5)), 'a_demand': rng.choice(range(300, 501, 25))}
+            query = {'model': 'component', 'data': data}
+        if query not in queries:
+            queries.append(query)
+    return queries
+
+
+async def post(reader, writer, path, payload=None):
+    """Send one request on a keep-alive connection; return (status code, decoded JSON body)."""
+    body = b'' if payload is None else json.dumps(payload).encode()
+    method = 'GET' if payload is None else 'POST'
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port, queries, weights, requests, seed, latencies):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for query in rng.choices(queries, weights, k=requests):
+            start = time.perf_counter()
+            status, response = await post(reader, writer, '/solve', query)
+            latencies.append(time.perf_counter() - start)
+            if status != 200 or response['status'] != 'OPTIMAL':
+                raise Exception(f"{query} failed: {status} {response}")
+    finally:
+        writer.close()
+
+
+async def load(port, clients, requests, pool_size, skew):
+    queries = query_pool(pool_size)
+    weights = [1.0 / (rank + 1) ** skew for rank in range(len(queries))]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for query, _ in CHECKS:  # build every model in the worker(s) before timing
+        await post(reader, writer, '/solve', query)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, queries, weights, requests, seed, latencies) for seed in range(clients)))
+    seconds = time.perf_counter() - start
+    for query, expected in CHECKS:
+        _, response = await post(reader, writer, '/solve', query)
+        if abs(response['profit'] - expected) > 1e-6 * abs(expected):
+            raise Exception(f"{query}: profit {response['profit']} under load, expected {expected}")
+    _, stats = await post(reader, writer, '/stats')
+    writer.close()
+    return np.array(latencies), seconds, stats
+
+
+def start_server(port, flags, workers):
+    command = [sys.executable, 'service.py', '--port', str(port), '--workers', str(workers), *flags]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith('serving'):
+        server.kill()
+        raise Exception(f"service did not start: {line!r}")
+    return server
+
+
+def subprocess_baseline(n):
+    """Latencies of `n` queries answered by a fresh batch.py process each."""
+    latencies = []
+    for query in query_pool(n, seed=1):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as case_file:
+            json.dump(query, case_file)
+        try:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, 'batch.py', case_file.name, '--processes', '1'], check=True,
+                           stdout=subprocess.DEVNULL)
+            latencies.append(time.perf_counter() - start)
+        finally:
+            os.unlink(case_file.name)
+    return np.array(latencies)
+
+
+def report(name, latencies, seconds, stats=None):
+    extra = '' if stats is None else f" {stats['coalesced']:10d} {stats['mean_batch_size']:10.2f}"
+    print(f"{name:>28} {len(latencies):8d} {1000 * np.percentile(latencies, 50):9.2f} "
+          f"{1000 * np.percentile(latencies, 99):9.2f} {len(latencies) / seconds:9.1f}{extra}")
+
+
+def run(clients, requests, pool_size, skew, workers, port, baseline, configurations):
+    print(f"{clients} clients x {requests} requests over {pool_size} distinct queries (skew {skew}), "
+          f"{workers} worker(s)")
+    print(f"{'configuration':>28} {'requests':>8} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} "
+          f"{'coalesced':>10} {'mean batch':>10}")
+    if baseline:
+        start = time.perf_counter()
+        latencies = subprocess_baseline(baseline)
+        report('subprocess per query', latencies, time.perf_counter() - start)
+    for name in configurations:
+        server = start_server(port, CONFIGURATIONS[name], workers)
+        try:
+            latencies, seconds, stats = asyncio.run(load(port, clients, requests, pool_size, skew))
+        finally:
+            server.terminate()
+            server.wait()
+        report(name, latencies, seconds, stats)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the solve service against a subprocess per query')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=50, help='per client')
+    parser.add_argument('--pool-size', type=int, default=40, help='distinct queries in the mix')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent of query popularity')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--baseline', type=int, default=10, help='subprocess queries to time (0 to skip)')
+    parser.add_argument('--configurations', nargs='+', choices=list(CONFIGURATIONS), default=list(CONFIGURATIONS))
+    args = parser.parse_args()
+    run(args.clients, args.requests, args.pool_size, args.skew, args.workers, args.port, args.baseline,
+        args.configurations)
@@ -0,0 +1,71 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import component_model
+import farmer_model
+from solve_cache import SolveCache, cached_solve
+
+# ============================================
+# BENCHMARK
+# ============================================
+# A request stream that keeps revisiting a few cases: the farmer's low,
+# standard and high yield seasons under a handful of purchase markups, and
+# the component model under recurring price cases. Each worker process
+# replays its own shuffled stream through a SolveCache on one shared SQLite
+# file, so the run also exercises concurrent writers.
+def requests(seed, n):
+    rng = np.random.default_rng(seed)
+    cases = [(farmer_model, [(m, m, m, 1.0)], {'purchase_markup': markup})
+             for m in (0.8, 1.0, 1.2) for markup in (1.2, 1.4, 1.6)]
+    cases += [(component_model, [(a, b, 1.0)], None) for a in (30, 50, 70) for b in (50, 60, 70)]
+    cases += [(component_model, component_model.SCENARIOS, {'capacity_limit': limit}) for limit in (100, 120, 140)]
+    return [cases[i] for i in rng.integers(len(cases), size=n)]
+
+
+def replay(args):
+    path, seed, n, use_cache = args
+    stream = requests(seed, n)
+    start = time.perf_counter()
+    with SolveCache(path if use_cache else None, max_entries=16 if use_cache else 0) as cache:
+        profits = [cached_solve(cache, module, scenarios, data).profit for module, scenarios, data in stream]
+        metrics = cache.metrics()
+    return time.perf_counter() - start, profits, metrics
+
+
+def run(n, processes, seed):
+    path = os.path.join(tempfile.mkdtemp(), 'solve_cache.sqlite')
+    tasks = [(path, seed + i, n, True) for i in range(processes)]
+    with multiprocessing.Pool(processes) as pool:
+        baseline = pool.map(replay, [(None, seed + i, n, False) for i in range(processes)])
+        cold = pool.map(replay, tasks)
+        warm = pool.map(replay, tasks)
+    for i in range(processes):
+        if not (np.allclose(baseline[i][1], cold[i][1]) and np.allclose(baseline[i][1], warm[i][1])):
+            raise Exception("Cached profits differ from uncached ones.")
+
+    print(f"{processes} worker(s) x {n} requests, shared cache {path}")
+    print(f"{'run':>10} {'seconds':>9} {'hits':>6} {'disk hits':>9} {'misses':>7} {'hit rate':>9} {'saved s':>8}")
+    for name, runs in (('no cache', baseline), ('cold', cold), ('restarted', warm)):
+        seconds = max(r[0] for r in runs)
+        total = {key: sum(r[2][key] for r in runs) for key in ('hits', 'disk_hits', 'misses', 'saved_seconds')}
+        lookups = total['hits'] + total['disk_hits'] + total['misses']
+        rate = (total['hits'] + total['disk_hits']) / lookups if lookups else 0.0
+        print(f"{name:>10} {seconds:9.3f} {total['hits']:>6} {total['disk_hits']:>9} {total['misses']:>7} "
+              f"{rate:9.1%} {total['saved_seconds']:8.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve cache hit rate and latency saved')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.requests, args.processes, args.seed)
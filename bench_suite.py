@@ -0,0 +1,225 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+
+import numpy as np
+
+# imported before the cases fork, so no case pays for (or counts) the imports
+import component_model  # noqa: F401
+import farmer_model  # noqa: F401
+from instrumentation import instrumented_solve
+
+# ============================================
+# DECLARE CONSTANTS
+# ============================================
+# Every model script with the optimum the book gives for it, as profit.
+SCRIPTS = {
+    'Ch1_Farmer_Low': 59950.0,
+    'Ch1_Farmer_Standard': 118600.0,
+    'Ch1_Farmer_High': 167620.0,
+    'Ch1_Farmer_TwoStage': 108390.0,
+    'Ch2_ModelingExercise_1': 5800.0,
+    'Ch2_ModelingExercise_2d': 5990.0,
+    'Ch2_ModelingExercise_2d_refactored': 5990.0,
+}
+# scripts that must agree on the optimum and on every variable value
+TWINS = [('Ch2_ModelingExercise_2d', 'Ch2_ModelingExercise_2d_refactored')]
+SIZES = [3, 100, 1000, 10000]
+MODEL_MODULES = ('farmer_model', 'component_model')
+BASELINES = 'bench_baselines.json'
+PHASES = ('total_seconds', 'build_seconds', 'solve_seconds', 'extract_seconds')
+MEMORY = 'peak_mb'
+OBJECTIVE_TOLERANCE = 1e-6  # relative
+
+
+# ============================================
+# CASES
+# ============================================
+# A case runs in a fresh forked process, whose peak RSS (VmHWM) is reset
+# through /proc/self/clear_refs before it starts: peak_mb is that peak less
+# the RSS at the start, so OR-Tools and NumPy (imported by then) do not
+# count. Timings are the fastest of `repeat` runs in that child.
+#
+# Script cases run a Ch*.py file with runpy and read the profit it prints,
+# so they check the scripts exactly as a reader runs them; the solve phase
+# is the solver's own wall time. Model cases build farmer_model /
+# component_model instances over the book scenarios (size 3) or sampled
+# tables, through instrumentation.instrumented_solve. Sampled farmer
+# instances are LP relaxations: the integer extensive form at 10,000
+# scenarios would turn a benchmark into a MIP stress test.
+def case_names(sizes):
+    names = [f'script:{script}' for script in SCRIPTS]
+    names += [f'{module}:{n}' for module in MODEL_MODULES for n in sizes]
+    return names
+
+
+def run_script(script):
+    """Run a Ch*.py script; return (profit printed, solver after the run)."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        namespace = runpy.run_path(f'{script}.py', run_name='__main__')
+    profit = np.nan
+    for line in out.getvalue().splitlines():
+        if line.startswith('Overall Profit = $'):
+            profit = float(line.split('$')[1])
+    solver = namespace['solver'] if 'solver' in namespace else namespace['model'].solver
+    return profit, solver
+
+
+def measure_script(script, repeat):
+    record = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        profit, solver = run_script(script)
+        timings = {'total_seconds': time.perf_counter() - start, 'solve_seconds': solver.wall_time() / 1000}
+        for key, value in timings.items():
+            record[key] = min(record.get(key, np.inf), value)
+    record['profit'] = profit
+    record['values'] = [var.solution_value() for var in solver.variables()]
+    return record
+
+
+def measure_model(module_name, n, repeat):
+    module = importlib.import_module(module_name)
+    scenarios = module.SCENARIOS if n == 3 else module.sample_scenarios(n)
+    options = {'integer': False} if module_name == 'farmer_model' and n != 3 else {}
+    record = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, result, phases = instrumented_solve(module, scenarios, **options)
+        phases['total_seconds'] = time.perf_counter() - start
+        for key in PHASES:
+            record[key] = min(record.get(key, np.inf), phases[key])
+    record['profit'] = result.profit
+    record['status'] = result.status_name
+    return record
+
+
+def measure(name, repeat):
+    """Run one case in this process; return its record (timings, profit, peak_mb)."""
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    before = _memory_mb('VmRSS')
+    kind, _, target = name.partition(':')
+    if kind == 'script':
+        record = measure_script(target, repeat)
+    else:
+        record = measure_model(kind, int(target), repeat)
+    record[MEMORY] = _memory_mb('VmHWM') - before
+    return record
+
+
+def measure_isolated(name, repeat):
+    with multiprocessing.get_context('fork').Pool(1) as pool:
+        return pool.apply(measure, (name, repeat))
+
+
+def _memory_mb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise Exception(f"{field} missing from /proc/self/status")
+
+
+# ============================================
+# BASELINE CHECKS
+# ============================================
+def check(name, record, baseline, threshold, slack, memory_slack):
+    """Return the problems with `record` against the known optimum and the stored baseline.
+
+    Each phase and the peak memory may exceed the baseline by `threshold`
+    (relative) plus `slack` seconds or `memory_slack` MB.
+    """
+    problems = []
+    expected = SCRIPTS.get(name.partition(':')[2]) if name.startswith('script:') else None
+    if expected is None and baseline is not None:
+        expected = baseline['profit']
+    if expected is not None and \
+            not abs(record['profit'] - expected) <= OBJECTIVE_TOLERANCE * max(1.0, abs(expected)):
+        problems.append(f"profit {record['profit']} drifted from {expected}")
+    if baseline is not None:
+        for key in PHASES:
+            if key in record and key in baseline and \
+                    record[key] > baseline[key] * (1 + threshold) + slack:
+                problems.append(f"{key} {record[key]:.4f} s regressed from {baseline[key]:.4f} s")
+        if MEMORY in baseline and record[MEMORY] > baseline[MEMORY] * (1 + threshold) + memory_slack:
+            problems.append(f"{MEMORY} {record[MEMORY]:.1f} MB regressed from {baseline[MEMORY]:.1f} MB")
+    return problems
+
+
+def check_twins(records):
+    problems = []
+    for first, second in TWINS:
+        a, b = records.get(f'script:{first}'), records.get(f'script:{second}')
+        if a is None or b is None:
+            continue
+        if abs(a['profit'] - b['profit']) > OBJECTIVE_TOLERANCE * abs(a['profit']):
+            problems.append(f"{first} and {second} disagree: profit {a['profit']} vs {b['profit']}")
+        elif len(a['values']) != len(b['values']) or not np.allclose(a['values'], b['values'], atol=1e-6):
+            problems.append(f"{first} and {second} reach the same profit with different solutions")
+    return problems
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(records, path):
+    stored = load_baselines(path)
+    for name, record in records.items():
+        stored[name] = {key: value for key, value in record.items() if key != 'values'}
+    with open(path, 'w') as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def run(sizes, repeat, threshold, slack, memory_slack, baselines_path, update, only):
+    baselines = load_baselines(baselines_path)
+    names = [name for name in case_names(sizes) if not only or any(part in name for part in only)]
+    print(f"{'case':>38} {'profit':>14} {'total s':>9} {'build s':>9} {'solve s':>9} {'extract s':>9} "
+          f"{'peak MB':>8}  check")
+    records, failures = {}, []
+    for name in names:
+        record = records[name] = measure_isolated(name, repeat)
+        problems = check(name, record, None if update else baselines.get(name), threshold, slack, memory_slack)
+        failures += [f"{name}: {problem}" for problem in problems]
+        cells = ' '.join(f"{record[key]:9.4f}" if key in record else f"{'':>9}" for key in PHASES)
+        print(f"{name:>38} {record['profit']:14.2f} {cells} {record[MEMORY]:8.1f}  "
+              f"{'ok' if not problems else 'FAIL'}", flush=True)
+    failures += check_twins(records)
+    if update:
+        save_baselines(records, baselines_path)
+        print(f"\nbaselines for {len(records)} case(s) written to {baselines_path}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return not failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regression and performance suite over every model script')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='scenario counts of the model cases')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case; the fastest counts')
+    parser.add_argument('--threshold', type=float, default=0.5, help='allowed relative slowdown per phase')
+    parser.add_argument('--slack', type=float, default=0.01, help='allowed absolute slowdown per phase, seconds')
+    parser.add_argument('--memory-slack', type=float, default=8.0, help='allowed absolute peak memory growth, MB')
+    parser.add_argument('--baselines', default=BASELINES)
+    parser.add_argument('--update', action='store_true', help='record this run as the baselines')
+    parser.add_argument('--only', nargs='+', default=None, help='run the cases whose names contain any of these')
+    args = parser.parse_args()
+    if not run(args.sizes, args.repeat, args.threshold, args.slack, args.memory_slack, args.baselines, args.update,
+               args.only):
+        sys.exit(1)
@@ -0,0 +1,107 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+
+import numpy as np
+
+import component_model
+import farmer_model
+from scenarios import replicate_scenarios
+
+# ============================================
+# BENCHMARK
+# ============================================
+# Apply successive random parameter perturbations and compare a cold run
+# (rebuild the solver from scratch, then solve) against updating the
+# persistent model in place and re-solving warm. Every warm objective is
+# checked against the cold one. The component model is solved with GLOP
+# (basis reuse); the integer farmer model with SCIP (incumbent hint).
+def component_perturbation(rng, data, table, base):
+    key = rng.choice(['a_price', 'b_price', 'capacity_limit', 'a_demand', 'c1_batch'])
+    if key in ('a_price', 'b_price'):
+        i = int(rng.integers(len(table)))
+        column = 0 if key == 'a_price' else 1
+        table[i, column] = base[i, column] * rng.uniform(0.8, 1.2)
+        price = table[i, column]
+        return lambda model: model.set_prices(i, **{key: price})
+    data[key] = component_model.COMPONENT_DATA[key] * rng.uniform(0.8, 1.2)
+    value = data[key]
+    return lambda model: model.update(**{key: value})
+
+
+def farmer_perturbation(rng, data, table, base):
+    key = rng.choice(['yield', 'sell_price_w', 'sell_price_c', 'quota_s', 'total_land'])
+    if key == 'yield':
+        s = int(rng.integers(len(table)))
+        table[s, :3] = base[s, :3] * rng.uniform(0.9, 1.1, 3)
+        multipliers = table[s, :3].copy()
+        return lambda model: model.set_scenario(s, multipliers=multipliers)
+    data[key] = round(farmer_model.FARMER_DATA[key] * rng.uniform(0.8, 1.2))
+    value = data[key]
+    return lambda model: model.update(**{key: value})
+
+
+MODELS = {
+    'component': (component_model, component_perturbation),
+    'farmer': (farmer_model, farmer_perturbation),
+}
+
+
+def build(module, table, data):
+    if module is component_model:
+        return module.build_two_stage(table, data, solver_id='GLOP', method='matrix', names=False)
+    return module.build_two_stage(table, data, solver_id='auto-warm', method='matrix', names=False)
+
+
+def run(name, module, perturb, base, perturbations, seed):
+    rng = np.random.default_rng(seed)
+    base = np.asarray(base, dtype=float)
+    table = base.copy()
+    data = {}
+    warm_model = build(module, table, data)
+    warm_model.solve()
+
+    cold_total, cold_solve, warm_total = [], [], []
+    for _ in range(perturbations):
+        apply = perturb(rng, data, table, base)
+
+        start = time.perf_counter()
+        cold_model = build(module, table, data)
+        solve_start = time.perf_counter()
+        cold_model.solve()
+        cold_total.append(time.perf_counter() - start)
+        cold_solve.append(time.perf_counter() - solve_start)
+
+        start = time.perf_counter()
+        apply(warm_model)
+        warm_model.solve(warm=True)
+        warm_total.append(time.perf_counter() - start)
+
+        if not np.isclose(warm_model.profit(), cold_model.profit(), rtol=1e-6, atol=1e-6):
+            raise AssertionError(f"{name}: warm {warm_model.profit()} != cold {cold_model.profit()}")
+
+    def stats(values):
+        values = 1000 * np.asarray(values)
+        return f"{values.mean():9.3f} {np.percentile(values, 50):9.3f} {np.percentile(values, 99):9.3f}"
+
+    print(f"{name:>10} {len(table):>6} {'cold':>6} {stats(cold_total)}   (solve only {np.mean(cold_solve) * 1000:.3f})")
+    print(f"{'':>10} {'':>6} {'warm':>6} {stats(warm_total)}   "
+          f"speedup {np.mean(cold_total) / np.mean(warm_total):.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cold rebuild vs. warm in-place re-solve benchmark')
+    parser.add_argument('--perturbations', type=int, default=1000)
+    parser.add_argument('--scenarios', type=int, default=3,
+                        help='replicate the original scenarios up to this many rows')
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'model':>10} {'scen':>6} {'mode':>6} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name in args.models:
+        module, perturb = MODELS[name]
+        run(name, module, perturb, replicate_scenarios(module.SCENARIOS, args.scenarios),
+            args.perturbations, args.seed)
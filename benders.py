@@ -0,0 +1,123 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import create_solver, solver_bound, solver_parameters
+from recourse import ScenarioEvaluator, subgradients
+
+# ============================================
+# L-SHAPED METHOD
+# ============================================
+# Both models have relatively complete recourse (the farmer can always buy,
+# the component plant can always produce nothing), so only optimality cuts
+# are needed. Integer first stages (farmer acres) are kept integral in the
+# master; the recourse is always solved as an LP.
+LShapedResult = namedtuple(
+    'LShapedResult',
+    ['x', 'objective', 'profit', 'lower_bound', 'upper_bound', 'gap', 'iterations', 'num_cuts', 'history'],
+)
+
+
+def relative_gap(lower, upper):
+    return (upper - lower) / max(1.0, abs(upper))
+
+
+def solve_lshaped(form, multi_cut=False, gap=1e-6, max_iterations=200, processes=1, verbose=False):
+    """Solve a TwoStageForm with the L-shaped method.
+
+    multi_cut=True keeps one epigraph variable theta_s per scenario and adds
+    a cut per scenario; otherwise a single aggregated cut is added per
+    iteration. Stops once (upper - lower) / max(1, |upper|) <= gap.
+    processes > 1 (or None for all cores) evaluates the scenario
+    subproblems on a process pool.
+    """
+    with ScenarioEvaluator(form, processes) as evaluator:
+        return _solve_lshaped(form, evaluator, multi_cut, gap, max_iterations, verbose)
+
+
+def build_master(form, num_theta):
+    """The master of a TwoStageForm: its first-stage columns and rows, and `num_theta` free epigraph columns.
+
+    Returns (master, x, theta); the objective is left for the caller to set.
+    """
+    integer = np.broadcast_to(np.asarray(form.integer, dtype=bool), (len(form.c),))
+    master = create_solver('auto', integer.any())
+    inf = master.infinity()
+    x = [master.IntVar(lb, solver_bound(ub, inf), f'x{j}') if is_int else
+         master.NumVar(lb, solver_bound(ub, inf), f'x{j}')
+         for j, (lb, ub, is_int) in enumerate(zip(form.col_lb.tolist(), form.col_ub.tolist(), integer.tolist()))]
+    for r, coefficients in enumerate(np.asarray(form.A, dtype=float).tolist()):
+        ct = master.Constraint(solver_bound(form.row_lb[r], inf), solver_bound(form.row_ub[r], inf))
+        for var, coef in zip(x, coefficients):
+            ct.SetCoefficient(var, coef)
+    theta = [master.NumVar(-inf, inf, f'theta{k}') for k in range(num_theta)]
+    return master, x, theta
+
+
+def _solve_lshaped(form, evaluator, multi_cut, gap, max_iterations, verbose):
+    probs = np.asarray(form.probs, dtype=float)
+    num_s = len(probs)
+    master, x, theta = build_master(form, num_s if multi_cut else 1)
+    inf = master.infinity()
+    objective = master.Objective()
+    objective.SetMinimization()
+    for var, coef in zip(x, form.c.tolist()):
+        objective.SetCoefficient(var, coef)
+
+    # a MIP master stops within its own gap, so its bound (the L-shaped lower
+    # bound) must be proven to a fraction of the L-shaped gap
+    params = solver_parameters(gap / 10)
+    best_x, upper, lower = None, np.inf, -np.inf
+    history, num_cuts = [], 0
+    for iteration in range(1, max_iterations + 1):
+        status = master.Solve(params)
+        if status != pywraplp.Solver.OPTIMAL:
+            raise Exception(f"Master problem ended with status code: {status}")
+        x_hat = np.array([var.solution_value() for var in x])
+        theta_hat = np.array([var.solution_value() for var in theta])
+        if iteration > 1:
+            lower = objective.BestBound() if master.IsMip() else objective.Value()
+
+        values, duals = evaluator.evaluate(x_hat)
+        grads = subgradients(form, duals)
+        candidate = form.c @ x_hat + probs @ values
+        if candidate < upper:
+            best_x, upper = x_hat, candidate
+
+        current_gap = relative_gap(lower, upper)
+        history.append((iteration, lower, upper, current_gap))
+        if verbose:
+            print(f"iter {iteration:4d}  lower = {lower:14.4f}  upper = {upper:14.4f}  gap = {current_gap:.2e}")
+        if current_gap <= gap:
+            break
+
+        # cut: theta >= Q(x_hat) + g @ (x - x_hat)  <=>  theta - g @ x >= Q(x_hat) - g @ x_hat
+        if multi_cut:
+            rhs = values - grads @ x_hat
+            violated = range(num_s) if iteration == 1 else \
+                np.flatnonzero(theta_hat < values - 1e-9 * np.maximum(1.0, np.abs(values))).tolist()
+            for s in violated:
+                _add_cut(master, theta[s], x, grads[s], rhs[s], inf)
+            num_cuts += len(violated)
+        else:
+            _add_cut(master, theta[0], x, probs @ grads, probs @ (values - grads @ x_hat), inf)
+            num_cuts += 1
+
+        if iteration == 1:
+            for k, var in enumerate(theta):
+                objective.SetCoefficient(var, probs[k] if multi_cut else 1.0)
+
+    return LShapedResult(best_x, upper, form.profit_sign * upper, lower, upper,
+                         relative_gap(lower, upper), iteration, num_cuts, history)
+
+
+def _add_cut(master, theta, x, grad, rhs, inf):
+    ct = master.Constraint(rhs, inf)
+    ct.SetCoefficient(theta, 1)
+    for var, coef in zip(x, grad.tolist()):
+        if coef:
+            ct.SetCoefficient(var, -coef)
@@ -0,0 +1,274 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from backends import create_solver
+from component_model import SCENARIOS, component_data
+from matrix_form import MatrixForm, coo_matrix, load_matrix_form
+import persistent
+from reporting import print_solve_result
+from results import SolveResult
+
+# ============================================
+# DECLARE CONSTANTS
+# ============================================
+# The component-capacity model with components and products as data.
+# Components are dicts of
+#     name              label used in the variable names
+#     cost              $ per unit used
+#     capacity_cost     $ per batch of capacity
+#     current_capacity  batches already in place (lower bound)
+#     batch             units one batch of capacity makes
+# and products dicts of name and demand (units). The recipe says how many
+# units of each component one unit of a product uses; it is sparse, given
+# as {(product name, component name): units} or a products x components
+# matrix. Scenarios are rows of one price per product and a probability.
+# The book's two components and two products are book_production().
+COMPONENT_FIELDS = ('name', 'cost', 'capacity_cost', 'current_capacity', 'batch')
+PRODUCT_FIELDS = ('name', 'demand')
+
+# A production instance as arrays; `recipe` is a products x components
+# CSR matrix.
+Production = namedtuple('Production', ['component_names', 'cost', 'capacity_cost', 'current_capacity', 'batch',
+                                       'product_names', 'demand', 'recipe', 'capacity_limit'])
+
+
+# ============================================
+# DATA HELPERS
+# ============================================
+def book_production(data=None):
+    """Ch2's components, products and recipe as a Production, with COMPONENT_DATA `data` overrides."""
+    d = component_data(data)
+    components = [{'name': f'Component {j}', 'cost': d[f'c{j}_cost'], 'capacity_cost': d[f'c{j}_capacity_cost'],
+                   'current_capacity': d[f'c{j}_current_capacity'], 'batch': d[f'c{j}_batch']} for j in (1, 2)]
+    products = [{'name': f'Product {p.upper()}', 'demand': d[f'{p}_demand']} for p in ('a', 'b')]
+    recipe = {(f'Product {p.upper()}', f'Component {j}'): d[f'{p}_c{j}_req'] for p in ('a', 'b') for j in (1, 2)}
+    return production(components, products, recipe, d['capacity_limit'])
+
+
+def production(components, products, recipe, capacity_limit):
+    """Build a Production from component and product dicts and a sparse recipe."""
+    columns = {}
+    for kind, rows, fields in (('component', components, COMPONENT_FIELDS), ('product', products, PRODUCT_FIELDS)):
+        for row in rows:
+            unknown = set(row) - set(fields)
+            if unknown:
+                raise KeyError(f"Unknown {kind} field(s): {', '.join(sorted(unknown))}")
+            missing = set(fields) - set(row)
+            if missing:
+                raise ValueError(f"{kind.capitalize()} {row.get('name')!r} is missing {', '.join(sorted(missing))}")
+        for field in fields:
+            columns[kind, field] = [row[field] for row in rows]
+        if len(set(columns[kind, 'name'])) != len(rows):
+            raise ValueError(f"{kind.capitalize()} names must be unique.")
+    component_names, product_names = columns['component', 'name'], columns['product', 'name']
+
+    if isinstance(recipe, dict):
+        product_index = {name: i for i, name in enumerate(product_names)}
+        component_index = {name: j for j, name in enumerate(component_names)}
+        unknown = [pair for pair in recipe if pair[0] not in product_index or pair[1] not in component_index]
+        if unknown:
+            raise KeyError(f"Recipe entries for unknown products / components: {unknown[:5]}")
+        rows = [product_index[product] for product, _ in recipe]
+        cols = [component_index[component] for _, component in recipe]
+        recipe = coo_matrix(rows, cols, list(recipe.values()), (len(product_names), len(component_names)))
+    recipe = sp.csr_matrix(recipe, dtype=float)
+    if recipe.shape != (len(product_names), len(component_names)):
+        raise ValueError(f"Recipe must be {len(product_names)} x {len(component_names)}, not {recipe.shape}")
+    recipe.eliminate_zeros()
+
+    component = {field: np.array(columns['component', field], dtype=float) for field in COMPONENT_FIELDS[1:]}
+    if component['current_capacity'].sum() > capacity_limit:
+        raise ValueError("Current capacity exceeds the capacity limit.")
+    return Production(component_names, component['cost'], component['capacity_cost'],
+                      component['current_capacity'], component['batch'], product_names,
+                      np.array(columns['product', 'demand'], dtype=float), recipe, float(capacity_limit))
+
+
+def scenario_table(scenarios, num_products):
+    """Split a scenario table into (S x num_products prices, S probabilities)."""
+    table = np.array(scenarios, dtype=float)
+    if table.ndim != 2 or table.shape[1] != num_products + 1:
+        raise ValueError(f"Scenario table must have rows of {num_products} prices and a probability.")
+    probs = table[:, -1]
+    if (probs < 0).any() or not np.isclose(probs.sum(), 1.0):
+        raise ValueError("Scenario probabilities must be non-negative and sum to 1.")
+    return table[:, :-1], probs
+
+
+def unit_revenues(prices, plant):
+    """Per-unit revenue of every product net of its component costs, per scenario."""
+    return prices - plant.recipe @ plant.cost
+
+
+def sample_production(num_products, num_components, components_per_product=3, seed=0):
+    """Draw a Production whose recipe uses `components_per_product` random components per product."""
+    rng = np.random.default_rng(seed)
+    per_product = min(components_per_product, num_components)
+    components = [{'name': f'Component {j + 1}', 'cost': rng.uniform(0.2, 2), 'capacity_cost': rng.uniform(100, 200),
+                   'current_capacity': rng.uniform(0, 5), 'batch': rng.uniform(50, 100)}
+                  for j in range(num_components)]
+    products = [{'name': f'Product {i + 1}', 'demand': rng.uniform(100, 500)} for i in range(num_products)]
+    rows = np.repeat(np.arange(num_products), per_product)
+    cols = np.concatenate([rng.choice(num_components, per_product, replace=False) for _ in range(num_products)])
+    recipe = coo_matrix(rows, cols, rng.uniform(1, 10, size=len(rows)), (num_products, num_components))
+    current = sum(component['current_capacity'] for component in components)
+    return production(components, products, recipe, current + 20 * num_components)
+
+
+def sample_scenarios(n, plant, margin=(0.9, 1.6), spread=0.1, seed=0):
+    """Draw `n` equally likely price scenarios around each product's full unit cost times a margin.
+
+    Full unit cost is components plus capacity (capacity_cost / batch per
+    unit of component), so some products are worth making and some not.
+    """
+    rng = np.random.default_rng(seed)
+    full_cost = plant.recipe @ (plant.cost + plant.capacity_cost / plant.batch)
+    base = full_cost * rng.uniform(*margin, size=len(full_cost))
+    table = np.empty((n, len(base) + 1))
+    table[:, :-1] = base * rng.uniform(1 - spread, 1 + spread, size=(n, len(base)))
+    table[:, -1] = 1 / n
+    return table
+
+
+# ============================================
+# MODEL
+# ============================================
+# Column layout: one capacity column per component, then per scenario one
+# column per product. Row layout: capacity limit, then one usage row per
+# component and scenario:
+#     sum_i recipe[i, j] * units[s, i] - batch[j] * capacity[j] <= 0
+# Demand and current capacity are column bounds. A scenario block holds
+# the recipe's nonzeros plus one batch entry per component, so the build
+# is proportional to the recipe's nonzeros, not products x components.
+class ProductionModel:
+    """Extensive form of the two-stage component-capacity problem over any Production.
+
+    Handles are positions, not pywraplp objects: SolveResult views slice
+    the solution by the layout above.
+    """
+
+    def __init__(self, solver, plant, prices, probs, names):
+        self.solver = solver
+        self.plant = plant
+        self.prices = prices
+        self.probs = probs
+        self.names = names
+        self.status = None
+
+    @property
+    def num_scenarios(self):
+        return len(self.probs)
+
+    def solve(self, warm=False, gap=None):
+        self.status = persistent.solve(self.solver, warm, gap=gap)
+        return self.status
+
+    def profit(self):
+        return self.solver.Objective().Value()
+
+    def capacity(self):
+        return dict(zip(self.plant.component_names, self.result().first_stage.tolist()))
+
+    @property
+    def layout(self):
+        """Column / row layout and objective sign of a SolveResult of this model."""
+        return {'num_first_stage': len(self.plant.component_names), 'num_recourse': len(self.plant.product_names),
+                'row_start': 1, 'rows_per_scenario': len(self.plant.component_names), 'sign': 1}
+
+    def result(self):
+        return SolveResult.from_solver(self.solver, self.status, **self.layout)
+
+    def print_results(self):
+        print_solve_result(self.result(), self.names)
+
+
+def build_two_stage(plant, scenarios, solver_id='auto', method='matrix', names=True):
+    """Build the extensive form of the component-capacity model for `plant` over a price table.
+
+    method='matrix' assembles the model as sparse arrays and loads it in
+    bulk; method='loop' sets coefficients scenario by scenario, walking
+    the recipe's nonzeros (names=False skips the column names).
+    """
+    prices, probs = scenario_table(scenarios, len(plant.product_names))
+    if method == 'matrix':
+        form = extensive_form_arrays(plant, scenarios, names)
+        return ProductionModel(load_matrix_form(form, solver_id), plant, prices, probs, form.names)
+    if method != 'loop':
+        raise ValueError(f"Unknown build method: {method}")
+
+    solver = create_solver(solver_id)
+    inf = solver.infinity()
+    objective = solver.Objective()
+    objective.SetMaximization()
+    var_names = _column_names(plant, len(probs)) if names else None
+    label = iter(var_names) if names else None
+
+    x = [solver.NumVar(lb, inf, next(label) if names else '') for lb in plant.current_capacity.tolist()]
+    capacity_row = solver.Constraint(-inf, plant.capacity_limit, 'Capacity')
+    for var, cost in zip(x, plant.capacity_cost.tolist()):
+        objective.SetCoefficient(var, -cost)
+        capacity_row.SetCoefficient(var, 1)
+
+    # the recipe by component: usage row j touches the products in column j
+    by_component = plant.recipe.tocsc()
+    indptr, products, units = by_component.indptr.tolist(), by_component.indices.tolist(), by_component.data.tolist()
+    revenues = unit_revenues(prices, plant)
+    for s, p in enumerate(probs.tolist()):
+        made = [solver.NumVar(0, demand, next(label) if names else '') for demand in plant.demand.tolist()]
+        for var, revenue in zip(made, revenues[s].tolist()):
+            objective.SetCoefficient(var, p * revenue)
+        for j, batch in enumerate(plant.batch.tolist()):
+            row = solver.Constraint(-inf, 0)
+            for k in range(indptr[j], indptr[j + 1]):
+                row.SetCoefficient(made[products[k]], units[k])
+            row.SetCoefficient(x[j], -batch)
+    return ProductionModel(solver, plant, prices, probs, var_names)
+
+
+# ============================================
+# MATRIX FORM
+# ============================================
+def extensive_form_arrays(plant, scenarios, names=True):
+    """Assemble the extensive form as a MatrixForm without a solver."""
+    num_j, num_p = len(plant.component_names), len(plant.product_names)
+    prices, probs = scenario_table(scenarios, num_p)
+    num_s = len(probs)
+    n = num_j + num_p * num_s
+    m = 1 + num_j * num_s
+
+    c = np.concatenate([-plant.capacity_cost, (probs[:, None] * unit_revenues(prices, plant)).ravel()])
+    col_lb = np.concatenate([plant.current_capacity, np.zeros(num_p * num_s)])
+    col_ub = np.concatenate([np.full(num_j, np.inf), np.tile(plant.demand, num_s)])
+
+    # each scenario block is the transposed recipe plus -batch on the capacity columns
+    usage = plant.recipe.tocoo()
+    row0 = 1 + num_j * np.arange(num_s)[:, None]
+    col0 = num_j + num_p * np.arange(num_s)[:, None]
+    rows = np.concatenate([np.zeros(num_j, dtype=int), (row0 + usage.col).ravel(), (row0 + np.arange(num_j)).ravel()])
+    cols = np.concatenate([np.arange(num_j), (col0 + usage.row).ravel(), np.tile(np.arange(num_j), num_s)])
+    vals = np.concatenate([np.ones(num_j), np.tile(usage.data, num_s), np.tile(-plant.batch, num_s)])
+
+    row_lb = np.full(m, -np.inf)
+    row_ub = np.zeros(m)
+    row_ub[0] = plant.capacity_limit
+    return MatrixForm(c, coo_matrix(rows, cols, vals, (m, n)), row_lb, row_ub, col_lb, col_ub, False, True,
+                      _column_names(plant, num_s) if names else None)
+
+
+def _column_names(plant, num_s):
+    names = [f'Batches of {name}' for name in plant.component_names]
+    for s in range(num_s):
+        tag = f' - Case {s + 1}' if num_s > 1 else ''
+        names += [f'Units of {name}{tag}' for name in plant.product_names]
+    return names
+
+
+if __name__ == '__main__':
+    model = build_two_stage(book_production(), SCENARIOS)
+    model.solve()
+    model.print_results()
@@ -0,0 +1,456 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import numpy as np
+
+from backends import create_solver
+from matrix_form import MatrixForm, TwoStageForm, coo_matrix, load_matrix_form
+import persistent
+from reporting import print_solve_result
+from results import SolveResult
+
+# ============================================
+# DECLARE CONSTANTS
+# ============================================
+COMPONENT_DATA = {
+    'a_c1_req': 6,
+    'a_c2_req': 8,
+    'b_c1_req': 10,
+    'b_c2_req': 5,
+    'c1_cost': 0.4,
+    'c2_cost': 1.2,
+    'c1_capacity_cost': 150,
+    'c2_capacity_cost': 180,
+    'c1_current_capacity': 40,
+    'c2_current_capacity': 20,
+    'capacity_limit': 120,
+    'c1_batch': 60,
+    'c2_batch': 90,
+    'a_demand': 500,
+    'b_demand': 200,
+}
+
+# Scenarios: (a_price, b_price, probability)
+SCENARIOS = [
+    (70, 50, 0.3),
+    (50, 60, 0.4),
+    (30, 70, 0.3),
+]
+
+# Ch2_ModelingExercise_1.py is the single-scenario case
+DETERMINISTIC = [(50, 60, 1.0)]
+
+
+# ============================================
+# DATA HELPERS
+# ============================================
+def component_data(data=None, **overrides):
+    """Return a copy of COMPONENT_DATA with `data` and keyword overrides applied."""
+    merged = dict(COMPONENT_DATA)
+    for key, value in {**(data or {}), **overrides}.items():
+        if key not in COMPONENT_DATA:
+            raise KeyError(f"Unknown component parameter: {key}")
+        merged[key] = value
+    return merged
+
+
+def scenario_table(scenarios):
+    """Split a scenario table into (S x 2 prices, S probabilities)."""
+    table = np.array(scenarios, dtype=float)
+    if table.ndim != 2 or table.shape[1] != 3:
+        raise ValueError("Scenario table must have rows of (a_price, b_price, probability).")
+    probs = table[:, 2]
+    if (probs < 0).any() or not np.isclose(probs.sum(), 1.0):
+        raise ValueError("Scenario probabilities must be non-negative and sum to 1.")
+    return table[:, :2], probs
+
+
+def unit_revenues(prices, d):
+    """Per-unit revenue of products A and B net of component costs, per scenario."""
+    a_cost = d['a_c1_req'] * d['c1_cost'] + d['a_c2_req'] * d['c2_cost']
+    b_cost = d['b_c1_req'] * d['c1_cost'] + d['b_c2_req'] * d['c2_cost']
+    return prices - np.array([a_cost, b_cost])
+
+
+def sample_scenarios(n, base=SCENARIOS, spread=0.1, seed=0):
+    """Replicate `base` up to `n` equally likely scenarios with +/- spread price noise."""
+    rng = np.random.default_rng(seed)
+    prices, _ = scenario_table(base)
+    table = np.empty((n, 3))
+    table[:, :2] = prices[np.arange(n) % len(prices)] * rng.uniform(1 - spread, 1 + spread, size=(n, 2))
+    table[:, 2] = 1 / n
+    return table
+
+
+# ============================================
+# MODEL
+# ============================================
+class ComponentModel:
+    """Extensive form of the two-stage component-capacity problem.
+
+    x = (x_c1, x_c2) are the first-stage capacity batches; x_a[i], x_b[i]
+    are the product units produced under price case i, limited by the rows
+    usage[i] = (C1 usage, C2 usage). `bound_rows` holds the demand and
+    current-capacity rows of the expression path; the matrix path states
+    those as variable bounds and leaves it empty. The solver stays alive:
+    update() and set_prices() change coefficients and bounds in place,
+    add_scenario() and retire_scenario() change the set of price cases
+    (matrix path), and solve(warm=True) re-solves from the last basis.
+    """
+
+    def __init__(self, solver, x, x_a, x_b, capacity_row, usage, bound_rows, prices, probs, data):
+        self.solver = solver
+        self.x = x
+        self.x_a = x_a
+        self.x_b = x_b
+        self.capacity_row = capacity_row
+        self.usage = usage
+        self.bound_rows = bound_rows
+        self.prices = prices
+        self.probs = probs
+        self.data = data
+        self.retired = set()
+        self.status = None
+
+    @property
+    def num_scenarios(self):
+        return len(self.probs)
+
+    def solve(self, warm=False, gap=None):
+        self.status = persistent.solve(self.solver, warm, gap=gap)
+        return self.status
+
+    def profit(self):
+        return self.solver.Objective().Value()
+
+    def capacity(self):
+        return [var.solution_value() for var in self.x]
+
+    @property
+    def layout(self):
+        """Column / row layout and objective sign of a SolveResult of this model.
+
+        The expression path has four rows per scenario (A demand, B demand,
+        C1 usage, C2 usage) from row 0; the matrix path has the two usage
+        rows per scenario after the capacity row.
+        """
+        row_start, rows_per_scenario = (0, 4) if self.bound_rows else (1, ROWS_PER_SCENARIO)
+        return {'num_first_stage': NUM_FIRST_STAGE, 'num_recourse': NUM_RECOURSE, 'row_start': row_start,
+                'rows_per_scenario': rows_per_scenario, 'sign': 1}
+
+    def result(self):
+        """Snapshot the last solve as a SolveResult (recourse columns x_a, x_b)."""
+        return SolveResult.from_solver(self.solver, self.status, **self.layout)
+
+    def print_results(self):
+        print_solve_result(self.result(), [var.name() for var in self.solver.variables()])
+
+    def scenario_cost(self, i):
+        """(variable, coefficient) terms of price case i's cost: capacity cost minus revenue."""
+        d = self.data
+        a_revenue, b_revenue = unit_revenues(self.prices[i], d).tolist()
+        return [(self.x[0], d['c1_capacity_cost']), (self.x[1], d['c2_capacity_cost']),
+                (self.x_a[i], -a_revenue), (self.x_b[i], -b_revenue)]
+
+    def loss_bound(self):
+        """Upper bound on any case's cost at an optimal solution (nothing is made at a loss)."""
+        d = self.data
+        return max(d['c1_capacity_cost'], d['c2_capacity_cost']) * d['capacity_limit']
+
+    # ============================================
+    # IN-PLACE UPDATES
+    # ============================================
+    def update(self, **params):
+        """Change COMPONENT_DATA parameters in the built model, e.g. update(a_demand=450)."""
+        self.data = component_data(self.data, **params)
+        d = self.data
+        if OBJECTIVE_PARAMS.intersection(params):
+            self._sync_objective()
+        if USAGE_PARAMS.intersection(params):
+            for i, (c1_row, c2_row) in enumerate(self.usage):
+                c1_row.SetCoefficient(self.x_a[i], d['a_c1_req'])
+                c1_row.SetCoefficient(self.x_b[i], d['b_c1_req'])
+                c1_row.SetCoefficient(self.x[0], -d['c1_batch'])
+                c2_row.SetCoefficient(self.x_a[i], d['a_c2_req'])
+                c2_row.SetCoefficient(self.x_b[i], d['b_c2_req'])
+                c2_row.SetCoefficient(self.x[1], -d['c2_batch'])
+        if 'capacity_limit' in params:
+            self.capacity_row.SetUb(d['capacity_limit'])
+        x_a = [var for i, var in enumerate(self.x_a) if i not in self.retired]
+        x_b = [var for i, var in enumerate(self.x_b) if i not in self.retired]
+        for key, variables, set_bound in (('a_demand', x_a, 'SetUb'), ('b_demand', x_b, 'SetUb'),
+                                          ('c1_current_capacity', self.x[:1], 'SetLb'),
+                                          ('c2_current_capacity', self.x[1:], 'SetLb')):
+            if key in params:
+                for handle in self.bound_rows.get(key, variables):
+                    getattr(handle, set_bound)(d[key])
+
+    def set_prices(self, i, a_price=None, b_price=None, prob=None):
+        """Replace the product prices and/or probability of price case i."""
+        if a_price is not None:
+            self.prices[i, 0] = a_price
+        if b_price is not None:
+            self.prices[i, 1] = b_price
+        if prob is not None:
+            self.probs[i] = prob
+        self._sync_objective(scenarios=[i])
+
+    def set_scenario(self, i, prices=None, prob=None):
+        """Scenario-table form of set_prices: prices = (a_price, b_price)."""
+        a_price, b_price = (None, None) if prices is None else prices
+        self.set_prices(i, a_price, b_price, prob)
+
+    def set_probabilities(self, probs):
+        """Replace every case's probability at once; only the changed ones touch the solver."""
+        probs = np.array(probs, dtype=float)
+        changed = np.flatnonzero(probs != self.probs).tolist()
+        self.probs = probs
+        self._sync_objective(scenarios=changed)
+
+    # ============================================
+    # SCENARIO SET CHANGES
+    # ============================================
+    # Rolling re-planning shifts the set of price cases on the live model.
+    # A retired case keeps its slot, so no column or row index moves: its
+    # probability drops to 0 and its columns are fixed at 0. A new case
+    # either refills a retired slot (coefficients and bounds only) or is
+    # appended as two columns and two usage rows at the end, which the
+    # matrix layout's SolveResult views read like any other case. The
+    # expression layout interleaves its demand rows with the usage rows,
+    # so it only supports refilling.
+    def add_scenario(self, prices, prob, slot=None):
+        """Add a price case (prices = (a_price, b_price)); return its index.
+
+        `slot` refills a retired case; otherwise the case is appended.
+        Probabilities are not renormalized (see set_probabilities).
+        """
+        d = self.data
+        if slot is not None:
+            if slot not in self.retired:
+                raise ValueError(f"Case {slot} is active; only a retired case can be refilled.")
+            self.retired.discard(slot)
+            # the expression layout states demand as rows, not column bounds
+            inf = self.solver.infinity()
+            self.x_a[slot].SetBounds(0, inf if self.bound_rows else d['a_demand'])
+            self.x_b[slot].SetBounds(0, inf if self.bound_rows else d['b_demand'])
+            self.set_prices(slot, *prices, prob=prob)
+            return slot
+        if self.bound_rows:
+            raise Exception("Appending price cases needs the matrix layout (build_two_stage(method='matrix')).")
+        i = self.num_scenarios
+        solver = self.solver
+        inf = solver.infinity()
+        self.x_a.append(solver.NumVar(0, d['a_demand'], f"Units of Product A - Case {i+1}"))
+        self.x_b.append(solver.NumVar(0, d['b_demand'], f"Units of Product B - Case {i+1}"))
+        rows = []
+        for x_c, a_req, b_req, batch in ((self.x[0], d['a_c1_req'], d['b_c1_req'], d['c1_batch']),
+                                         (self.x[1], d['a_c2_req'], d['b_c2_req'], d['c2_batch'])):
+            row = solver.Constraint(-inf, 0)
+            row.SetCoefficient(self.x_a[i], a_req)
+            row.SetCoefficient(self.x_b[i], b_req)
+            row.SetCoefficient(x_c, -batch)
+            rows.append(row)
+        self.usage.append(tuple(rows))
+        self.prices = np.vstack([self.prices, np.asarray(prices, dtype=float)])
+        self.probs = np.append(self.probs, prob)
+        self._sync_objective(scenarios=[i])
+        return i
+
+    def retire_scenario(self, i):
+        """Deactivate case i: probability 0, columns fixed at 0. Probabilities are not renormalized."""
+        self.retired.add(i)
+        self.x_a[i].SetBounds(0, 0)
+        self.x_b[i].SetBounds(0, 0)
+        self.probs[i] = 0
+        self._sync_objective(scenarios=[i])
+
+    def _sync_objective(self, scenarios=None):
+        d = self.data
+        objective = self.solver.Objective()
+        objective.SetCoefficient(self.x[0], -d['c1_capacity_cost'])
+        objective.SetCoefficient(self.x[1], -d['c2_capacity_cost'])
+        indices = range(self.num_scenarios) if scenarios is None else scenarios
+        revenues = unit_revenues(self.prices, d)
+        for i in indices:
+            objective.SetCoefficient(self.x_a[i], self.probs[i] * revenues[i, 0])
+            objective.SetCoefficient(self.x_b[i], self.probs[i] * revenues[i, 1])
+
+
+OBJECTIVE_PARAMS = {'a_c1_req', 'a_c2_req', 'b_c1_req', 'b_c2_req', 'c1_cost', 'c2_cost',
+                    'c1_capacity_cost', 'c2_capacity_cost'}
+USAGE_PARAMS = {'a_c1_req', 'a_c2_req', 'b_c1_req', 'b_c2_req', 'c1_batch', 'c2_batch'}
+
+
+def build_two_stage(scenarios=SCENARIOS, data=None, solver_id='auto', method='expression', names=True):
+    """Build the component-capacity extensive form.
+
+    method='expression' adds up pywraplp expressions exactly as
+    Ch2_ModelingExercise_2d_refactored.py does; method='matrix' assembles
+    the same model as sparse arrays and loads it in bulk. The matrix form
+    states demand and current capacity as variable bounds instead of rows.
+    solver_id='auto' picks an LP engine (see backends.py).
+    """
+    if method == 'matrix':
+        return _build_from_matrix(scenarios, data, solver_id, names)
+    if method != 'expression':
+        raise ValueError(f"Unknown build method: {method}")
+    d = component_data(data)
+    prices, probs = scenario_table(scenarios)
+
+    solver = create_solver(solver_id)
+
+    x_c1 = solver.NumVar(0, solver.infinity(), "Batches of Component 1")
+    x_c2 = solver.NumVar(0, solver.infinity(), "Batches of Component 2")
+
+    x_a, x_b = [], []
+    for i in range(len(probs)):
+        x_a.append(solver.NumVar(0, solver.infinity(), f"Units of Product A - Case {i+1}"))
+        x_b.append(solver.NumVar(0, solver.infinity(), f"Units of Product B - Case {i+1}"))
+
+    objective_terms = []
+    for i, ((a_revenue, b_revenue), prob) in enumerate(zip(unit_revenues(prices, d).tolist(), probs.tolist())):
+        objective_terms.append(prob * (a_revenue * x_a[i] + b_revenue * x_b[i]))
+
+    solver.Maximize(sum(objective_terms) - d['c1_capacity_cost'] * x_c1 - d['c2_capacity_cost'] * x_c2)
+
+    bound_rows = {'a_demand': [], 'b_demand': []}
+    usage = []
+    for i in range(len(probs)):
+        bound_rows['a_demand'].append(solver.Add(x_a[i] <= d['a_demand']))  # Demand for A
+        bound_rows['b_demand'].append(solver.Add(x_b[i] <= d['b_demand']))  # Demand for B
+        usage.append((
+            solver.Add(d['a_c1_req'] * x_a[i] + d['b_c1_req'] * x_b[i] <= d['c1_batch'] * x_c1),  # C1 usage
+            solver.Add(d['a_c2_req'] * x_a[i] + d['b_c2_req'] * x_b[i] <= d['c2_batch'] * x_c2),  # C2 usage
+        ))
+
+    capacity_row = solver.Add(x_c1 + x_c2 <= d['capacity_limit'])
+    bound_rows['c1_current_capacity'] = [solver.Add(x_c1 >= d['c1_current_capacity'])]
+    bound_rows['c2_current_capacity'] = [solver.Add(x_c2 >= d['c2_current_capacity'])]
+
+    return ComponentModel(solver, [x_c1, x_c2], x_a, x_b, capacity_row, usage, bound_rows, prices, probs, d)
+
+
+def build_deterministic(a_price=50, b_price=60, data=None, solver_id='auto'):
+    """Single-price model of Ch2_ModelingExercise_1.py: one scenario, probability 1."""
+    return build_two_stage([(a_price, b_price, 1.0)], data, solver_id)
+
+
+# ============================================
+# MATRIX FORM
+# ============================================
+# Column layout: x_c1, x_c2, then (x_a, x_b) per scenario. Row layout:
+# capacity limit, then (C1 usage, C2 usage) per scenario.
+NUM_FIRST_STAGE = 2
+NUM_RECOURSE = 2
+ROWS_PER_SCENARIO = 2
+
+
+def extensive_form_arrays(scenarios=SCENARIOS, data=None, names=True):
+    """Assemble the component-capacity extensive form as a MatrixForm."""
+    d = component_data(data)
+    prices, probs = scenario_table(scenarios)
+    num_s = len(probs)
+    n = NUM_FIRST_STAGE + NUM_RECOURSE * num_s
+    m = 1 + ROWS_PER_SCENARIO * num_s
+    inf = np.inf
+
+    c = np.concatenate([[-d['c1_capacity_cost'], -d['c2_capacity_cost']],
+                        (probs[:, None] * unit_revenues(prices, d)).ravel()])
+
+    col_lb = np.zeros(n)
+    col_ub = np.full(n, inf)
+    col_lb[:2] = d['c1_current_capacity'], d['c2_current_capacity']
+    col_ub[NUM_FIRST_STAGE::NUM_RECOURSE] = d['a_demand']
+    col_ub[NUM_FIRST_STAGE + 1::NUM_RECOURSE] = d['b_demand']
+
+    col0 = NUM_FIRST_STAGE + NUM_RECOURSE * np.arange(num_s)
+    row0 = 1 + ROWS_PER_SCENARIO * np.arange(num_s)
+    ones = np.ones(num_s)
+    rows = np.concatenate([[0, 0], row0, row0, row0, row0 + 1, row0 + 1, row0 + 1])
+    cols = np.concatenate([[0, 1],
+                           col0, col0 + 1, np.zeros(num_s, dtype=int),
+                           col0, col0 + 1, np.ones(num_s, dtype=int)])
+    vals = np.concatenate([[1, 1],
+                           d['a_c1_req'] * ones, d['b_c1_req'] * ones, -d['c1_batch'] * ones,
+                           d['a_c2_req'] * ones, d['b_c2_req'] * ones, -d['c2_batch'] * ones])
+
+    row_lb = np.full(m, -inf)
+    row_ub = np.zeros(m)
+    row_ub[0] = d['capacity_limit']
+
+    var_names = None
+    if names:
+        var_names = ["Batches of Component 1", "Batches of Component 2"]
+        for i in range(num_s):
+            var_names += [f"Units of Product A - Case {i+1}", f"Units of Product B - Case {i+1}"]
+
+    return MatrixForm(c, coo_matrix(rows, cols, vals, (m, n)), row_lb, row_ub,
+                      col_lb, col_ub, False, True, var_names)
+
+
+def two_stage_arrays(scenarios=SCENARIOS, data=None):
+    """Split the model into first stage (x_c1, x_c2) and per-scenario recourse.
+
+    Stated as a minimization (capacity cost minus expected revenue), so
+    profit_sign is -1.
+    """
+    d = component_data(data)
+    prices, probs = scenario_table(scenarios)
+    num_s = len(probs)
+    inf = np.inf
+
+    W = np.array([[d['a_c1_req'], d['b_c1_req']],      # C1 usage - c1_batch * x_c1 <= 0
+                  [d['a_c2_req'], d['b_c2_req']]],     # C2 usage - c2_batch * x_c2 <= 0
+                 dtype=float)
+    T = np.broadcast_to(np.diag([-d['c1_batch'], -d['c2_batch']]).astype(float),
+                        (num_s, ROWS_PER_SCENARIO, NUM_FIRST_STAGE))
+
+    return TwoStageForm(
+        c=np.array([d['c1_capacity_cost'], d['c2_capacity_cost']], dtype=float),
+        A=np.ones((1, NUM_FIRST_STAGE)), row_lb=np.array([-inf]), row_ub=np.array([d['capacity_limit']], dtype=float),
+        col_lb=np.array([d['c1_current_capacity'], d['c2_current_capacity']], dtype=float),
+        col_ub=np.full(NUM_FIRST_STAGE, inf), integer=False,
+        q=-unit_revenues(prices, d), W=W, T=T,
+        h_lb=np.full((num_s, ROWS_PER_SCENARIO), -inf), h_ub=np.zeros((num_s, ROWS_PER_SCENARIO)),
+        y_lb=np.zeros(NUM_RECOURSE), y_ub=np.array([d['a_demand'], d['b_demand']], dtype=float),
+        probs=probs, profit_sign=-1,
+    )
+
+
+def _build_from_matrix(scenarios, data, solver_id, names):
+    prices, probs = scenario_table(scenarios)
+    solver = load_matrix_form(extensive_form_arrays(scenarios, data, names), solver_id)
+    return wrap_solver(solver, prices, probs, component_data(data))
+
+
+def wrap_solver(solver, prices, probs, d):
+    """ComponentModel over a solver that already holds the extensive form (e.g. reloaded from a file).
+
+    Both build methods lay the columns out the same way. The rows tell
+    them apart: the matrix form has the capacity row and two usage rows
+    per case; the expression form has (A demand, B demand, C1 usage, C2
+    usage) per case, then the capacity row and the two current-capacity
+    rows.
+    """
+    variables = solver.variables()
+    constraints = solver.constraints()
+    num_s = len(probs)
+    x = variables[:NUM_FIRST_STAGE]
+    x_a = variables[NUM_FIRST_STAGE::NUM_RECOURSE]
+    x_b = variables[NUM_FIRST_STAGE + 1::NUM_RECOURSE]
+    if len(constraints) == 1 + ROWS_PER_SCENARIO * num_s:
+        usage = list(zip(constraints[1::ROWS_PER_SCENARIO], constraints[2::ROWS_PER_SCENARIO]))
+        return ComponentModel(solver, x, x_a, x_b, constraints[0], usage, {}, prices, probs, d)
+    if len(constraints) != 4 * num_s + 3:
+        raise Exception(f"{len(constraints)} rows match neither component layout for {num_s} cases")
+    bound_rows = {'a_demand': constraints[0:4 * num_s:4], 'b_demand': constraints[1:4 * num_s:4],
+                  'c1_current_capacity': [constraints[4 * num_s + 1]],
+                  'c2_current_capacity': [constraints[4 * num_s + 2]]}
+    usage = list(zip(constraints[2:4 * num_s:4], constraints[3:4 * num_s:4]))
+    return ComponentModel(solver, x, x_a, x_b, constraints[4 * num_s], usage, bound_rows, prices, probs, d)
+
+
+if __name__ == '__main__':
+    model = build_two_stage(SCENARIOS)
+    model.solve()
+    model.print_results()
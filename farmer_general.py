@@ -0,0 +1,288 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import create_solver
+from farmer_model import SCENARIOS, farmer_data
+from matrix_form import MatrixForm, coo_matrix, load_matrix_form
+import persistent
+from reporting import print_solve_result
+from results import SolveResult
+
+# ============================================
+# DECLARE CONSTANTS
+# ============================================
+# The farmer model with the crops as data instead of three hard-coded
+# names. Each crop is a dict:
+#     name            label used in the variable names
+#     plant_cost      $ per acre
+#     yield           tons per acre in an average season
+#     sell_price      $ per ton sold, up to `quota` tons
+#     quota           tons sellable at sell_price (default: no quota)
+#     excess_price    $ per ton sold beyond the quota (default: none sold)
+#     purchase_price  $ per ton bought (default: the crop cannot be bought)
+#     required        tons needed from harvest or purchases (default 0)
+# The book's wheat, corn and sugar beets are book_crops().
+CROP_FIELDS = ('name', 'plant_cost', 'yield', 'sell_price', 'quota', 'excess_price', 'purchase_price',
+               'required')
+CROP_DEFAULTS = {'quota': np.inf, 'excess_price': np.nan, 'purchase_price': np.nan, 'required': 0.0}
+
+# Crop columns as arrays; excess_price / purchase_price are NaN where the
+# crop has no excess sales / cannot be bought.
+CropTable = namedtuple('CropTable', ['names', 'plant_cost', 'base_yield', 'sell_price', 'quota',
+                                     'excess_price', 'purchase_price', 'required'])
+
+
+# ============================================
+# DATA HELPERS
+# ============================================
+def book_crops(data=None):
+    """The Ch1 crops as a crop list, from farmer_model.FARMER_DATA with `data` overrides."""
+    d = farmer_data(data)
+    return [
+        {'name': 'Wheat', 'plant_cost': d['plant_cost_w'], 'yield': d['yield_w'], 'sell_price': d['sell_price_w'],
+         'purchase_price': d['purchase_price_w'], 'required': d['required_w']},
+        {'name': 'Corn', 'plant_cost': d['plant_cost_c'], 'yield': d['yield_c'], 'sell_price': d['sell_price_c'],
+         'purchase_price': d['purchase_price_c'], 'required': d['required_c']},
+        {'name': 'Sugar Beets', 'plant_cost': d['plant_cost_s'], 'yield': d['yield_s'],
+         'sell_price': d['sell_price_s_high'], 'quota': d['quota_s'], 'excess_price': d['sell_price_s_low']},
+    ]
+
+
+def crop_table(crops):
+    """Turn a list of crop dicts (or a CropTable) into a CropTable of arrays."""
+    if isinstance(crops, CropTable):
+        return crops
+    columns = {field: [] for field in CROP_FIELDS}
+    for crop in crops:
+        unknown = set(crop) - set(CROP_FIELDS)
+        if unknown:
+            raise KeyError(f"Unknown crop field(s): {', '.join(sorted(unknown))}")
+        missing = [field for field in CROP_FIELDS if field not in crop and field not in CROP_DEFAULTS]
+        if missing:
+            raise ValueError(f"Crop {crop.get('name', len(columns['name']))!r} is missing {', '.join(missing)}")
+        for field in CROP_FIELDS:
+            value = crop.get(field, CROP_DEFAULTS.get(field))
+            columns[field].append(np.nan if value is None else value)
+    if len(set(columns['name'])) != len(columns['name']):
+        raise ValueError("Crop names must be unique.")
+    arrays = {field: np.array(columns[field], dtype=float) for field in CROP_FIELDS if field != 'name'}
+    return CropTable(columns['name'], arrays['plant_cost'], arrays['yield'], arrays['sell_price'], arrays['quota'],
+                     arrays['excess_price'], arrays['purchase_price'], arrays['required'])
+
+
+def scenario_table(scenarios, num_crops):
+    """Split a scenario table into (S x num_crops yield multipliers, S probabilities)."""
+    table = np.array(scenarios, dtype=float)
+    if table.ndim != 2 or table.shape[1] != num_crops + 1:
+        raise ValueError(f"Scenario table must have rows of {num_crops} yield multipliers and a probability.")
+    probs = table[:, -1]
+    if (probs < 0).any() or not np.isclose(probs.sum(), 1.0):
+        raise ValueError("Scenario probabilities must be non-negative and sum to 1.")
+    return table[:, :-1], probs
+
+
+def sample_crops(n, seed=0):
+    """Draw `n` crops: about a third needed as feed (and purchasable), a fifth sold under a quota."""
+    rng = np.random.default_rng(seed)
+    crops = []
+    for k in range(n):
+        crop_yield = rng.uniform(2, 20)
+        crop = {'name': f'Crop {k + 1}', 'plant_cost': rng.uniform(100, 300), 'yield': crop_yield,
+                'sell_price': rng.uniform(120, 400) / crop_yield}
+        kind = rng.uniform()
+        if kind < 1 / 3:
+            crop['purchase_price'] = 1.4 * crop['sell_price']
+            crop['required'] = rng.uniform(0.1, 0.5) * crop_yield * 500 / n
+        elif kind < 1 / 3 + 1 / 5:
+            crop['quota'] = rng.uniform(0.5, 2) * crop_yield * 500 / n
+            crop['excess_price'] = crop['sell_price'] * rng.uniform(0.2, 0.5)
+        crops.append(crop)
+    return crops
+
+
+def sample_scenarios(n, num_crops, low=0.8, high=1.2, seed=0):
+    """Draw `n` equally likely scenarios with independent uniform yield multipliers."""
+    rng = np.random.default_rng(seed)
+    table = np.empty((n, num_crops + 1))
+    table[:, :-1] = rng.uniform(low, high, size=(n, num_crops))
+    table[:, -1] = 1 / n
+    return table
+
+
+# ============================================
+# MODEL
+# ============================================
+# Column layout: one acres column per crop, then per scenario the tons sold
+# of every crop, the tons sold beyond the quota of the crops with an excess
+# price, and the tons bought of the purchasable crops. Row layout: land,
+# then one balance row per crop and scenario:
+#     yield * multiplier * acres + bought - sold - excess >= required
+# Every row and column carries only the coefficients the crop has, so the
+# build is proportional to the nonzeros. For the book crops the columns
+# and costs are farmer_model's; the beet row is its yield row negated.
+class CropModel:
+    """Extensive form of the two-stage farmer problem over any crop list.
+
+    Handles are positions, not pywraplp objects: `recourse` names the
+    columns of a scenario block, and SolveResult views slice the solution
+    by that layout.
+    """
+
+    def __init__(self, solver, crops, total_land, multipliers, probs, names):
+        self.solver = solver
+        self.crops = crops
+        self.total_land = total_land
+        self.multipliers = multipliers
+        self.probs = probs
+        self.names = names
+        self.status = None
+        self._hint = None
+
+    @property
+    def num_crops(self):
+        return len(self.crops.names)
+
+    @property
+    def num_scenarios(self):
+        return len(self.probs)
+
+    @property
+    def recourse(self):
+        """(kind, crop index) of each column in a scenario block; kind is 'sell', 'excess' or 'buy'."""
+        return recourse_columns(self.crops)
+
+    def solve(self, warm=False, gap=None):
+        self.status = persistent.solve(self.solver, warm, self._hint, gap)
+        if self.status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            self._hint = persistent.solution_values(self.solver)
+        return self.status
+
+    def profit(self):
+        return -1 * self.solver.Objective().Value()
+
+    def acres(self):
+        return dict(zip(self.crops.names, self.result().first_stage.tolist()))
+
+    @property
+    def layout(self):
+        """Column / row layout and objective sign of a SolveResult of this model."""
+        return {'num_first_stage': self.num_crops, 'num_recourse': len(self.recourse), 'row_start': 1,
+                'rows_per_scenario': self.num_crops, 'sign': -1}
+
+    def result(self):
+        return SolveResult.from_solver(self.solver, self.status, **self.layout)
+
+    def print_results(self):
+        print_solve_result(self.result(), self.names)
+
+
+def recourse_columns(crops):
+    crops = crop_table(crops)
+    k = np.arange(len(crops.names))
+    return [('sell', j) for j in k.tolist()] + \
+        [('excess', j) for j in np.flatnonzero(~np.isnan(crops.excess_price)).tolist()] + \
+        [('buy', j) for j in np.flatnonzero(~np.isnan(crops.purchase_price)).tolist()]
+
+
+def build_two_stage(crops, scenarios, total_land=500, solver_id='auto', integer=True, method='matrix',
+                    names=True):
+    """Build the extensive form of the farmer model for `crops` over a scenario table.
+
+    method='matrix' assembles the model as sparse arrays and loads it in
+    bulk; method='loop' sets coefficients scenario by scenario, as
+    farmer_model's loop path does (names=False skips the column names).
+    """
+    crops = crop_table(crops)
+    multipliers, probs = scenario_table(scenarios, len(crops.names))
+    if method == 'matrix':
+        form = extensive_form_arrays(crops, scenarios, total_land, integer, names)
+        solver = load_matrix_form(form, solver_id)
+        return CropModel(solver, crops, total_land, multipliers, probs, form.names)
+    if method != 'loop':
+        raise ValueError(f"Unknown build method: {method}")
+
+    solver = create_solver(solver_id, integer)
+    new_var = solver.IntVar if integer else solver.NumVar
+    inf = solver.infinity()
+    objective = solver.Objective()
+    objective.SetMinimization()
+    var_names = _column_names(crops, len(probs)) if names else None
+    label = iter(var_names) if names else None
+
+    x = [new_var(0, inf, next(label) if names else '') for _ in crops.names]
+    land = solver.Constraint(-inf, total_land, 'Land')
+    for var, cost in zip(x, crops.plant_cost.tolist()):
+        objective.SetCoefficient(var, cost)
+        land.SetCoefficient(var, 1)
+
+    recourse = recourse_columns(crops)
+    prices = {'sell': -crops.sell_price, 'excess': -crops.excess_price, 'buy': crops.purchase_price}
+    entry = {'sell': -1, 'excess': -1, 'buy': 1}
+    for s, p in enumerate(probs.tolist()):
+        rows = [solver.Constraint(required, inf) for required in crops.required.tolist()]
+        for k, (row, base_yield) in enumerate(zip(rows, (crops.base_yield * multipliers[s]).tolist())):
+            row.SetCoefficient(x[k], base_yield)
+        for kind, k in recourse:
+            var = new_var(0, crops.quota[k] if kind == 'sell' else inf, next(label) if names else '')
+            objective.SetCoefficient(var, p * prices[kind][k])
+            rows[k].SetCoefficient(var, entry[kind])
+    return CropModel(solver, crops, total_land, multipliers, probs, var_names)
+
+
+# ============================================
+# MATRIX FORM
+# ============================================
+def extensive_form_arrays(crops, scenarios, total_land=500, integer=True, names=True):
+    """Assemble the extensive form as a MatrixForm without a solver."""
+    crops = crop_table(crops)
+    num_k = len(crops.names)
+    multipliers, probs = scenario_table(scenarios, num_k)
+    num_s = len(probs)
+    recourse = recourse_columns(crops)
+    kinds = np.array([kind for kind, _ in recourse])
+    crop_of = np.array([k for _, k in recourse], dtype=int)
+    num_r = len(recourse)
+    n = num_k + num_r * num_s
+    m = 1 + num_k * num_s
+
+    block_cost = np.select([kinds == 'sell', kinds == 'excess'],
+                           [-crops.sell_price[crop_of], -crops.excess_price[crop_of]], crops.purchase_price[crop_of])
+    c = np.concatenate([crops.plant_cost, np.outer(probs, block_cost).ravel()])
+    col_lb = np.zeros(n)
+    col_ub = np.concatenate([np.full(num_k, np.inf),
+                             np.tile(np.where(kinds == 'sell', crops.quota[crop_of], np.inf), num_s)])
+
+    # one block per scenario: the yield entries on the acres, +-1 on recourse
+    row0 = 1 + num_k * np.arange(num_s)[:, None]
+    col0 = num_k + num_r * np.arange(num_s)[:, None]
+    rows = np.concatenate([np.zeros(num_k, dtype=int), (row0 + np.arange(num_k)).ravel(),
+                           (row0 + crop_of).ravel()])
+    cols = np.concatenate([np.arange(num_k), np.tile(np.arange(num_k), num_s), (col0 + np.arange(num_r)).ravel()])
+    vals = np.concatenate([np.ones(num_k), (crops.base_yield * multipliers).ravel(),
+                           np.tile(np.where(kinds == 'buy', 1.0, -1.0), num_s)])
+
+    row_lb = np.concatenate([[-np.inf], np.tile(crops.required, num_s)])
+    row_ub = np.concatenate([[total_land], np.full(num_k * num_s, np.inf)])
+    return MatrixForm(c, coo_matrix(rows, cols, vals, (m, n)), row_lb, row_ub, col_lb, col_ub, integer, False,
+                      _column_names(crops, num_s) if names else None)
+
+
+def _column_names(crops, num_s):
+    names = [f'Acres of {name}' for name in crops.names]
+    labels = {'sell': 'Tons of {} Sold', 'excess': 'Tons of {} Sold (Excess)', 'buy': 'Tons of {} Bought'}
+    block = [labels[kind].format(crops.names[k]) for kind, k in recourse_columns(crops)]
+    for s in range(num_s):
+        tag = f' - Scenario {s + 1}' if num_s > 1 else ''
+        names += [name + tag for name in block]
+    return names
+
+
+if __name__ == '__main__':
+    model = build_two_stage(book_crops(), SCENARIOS)
+    model.solve()
+    model.print_results()
@@ -0,0 +1,441 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import create_solver
+from matrix_form import MatrixForm, TwoStageForm, coo_matrix, load_matrix_form
+import persistent
+from reporting import print_solve_result
+from results import SolveResult
+
+# ============================================
+# DECLARE CONSTANTS
+# ============================================
+FARMER_DATA = {
+    'total_land': 500,
+    'required_w': 200,
+    'required_c': 240,
+    'plant_cost_w': 150,
+    'plant_cost_c': 230,
+    'plant_cost_s': 260,
+    'sell_price_w': 170,
+    'sell_price_c': 150,
+    'purchase_markup': 1.4,
+    'sell_price_s_high': 36,
+    'sell_price_s_low': 10,
+    'quota_s': 6000,
+    'yield_w': 2.5,
+    'yield_c': 3,
+    'yield_s': 20,
+}
+
+# Scenarios: (wheat yield multiplier, corn yield multiplier, beet yield multiplier, probability)
+SCENARIOS = [
+    (0.8, 0.8, 0.8, 1/3),
+    (1.0, 1.0, 1.0, 1/3),
+    (1.2, 1.2, 1.2, 1/3),
+]
+
+CROPS = ('Wheat', 'Corn', 'Sugar Beets')
+
+
+# ============================================
+# DATA HELPERS
+# ============================================
+def farmer_data(data=None, **overrides):
+    """Return a copy of FARMER_DATA with `data` and keyword overrides applied."""
+    merged = dict(FARMER_DATA)
+    for key, value in {**(data or {}), **overrides}.items():
+        if key not in FARMER_DATA:
+            raise KeyError(f"Unknown farmer parameter: {key}")
+        merged[key] = value
+    merged['purchase_price_w'] = merged['purchase_markup'] * merged['sell_price_w']
+    merged['purchase_price_c'] = merged['purchase_markup'] * merged['sell_price_c']
+    return merged
+
+
+def scenario_table(scenarios):
+    """Split a scenario table into (S x 3 yield multipliers, S probabilities)."""
+    table = np.array(scenarios, dtype=float)
+    if table.ndim != 2 or table.shape[1] != 4:
+        raise ValueError("Scenario table must have rows of (m_w, m_c, m_s, probability).")
+    probs = table[:, 3]
+    if (probs < 0).any() or not np.isclose(probs.sum(), 1.0):
+        raise ValueError("Scenario probabilities must be non-negative and sum to 1.")
+    return table[:, :3], probs
+
+
+def sample_scenarios(n, low=0.8, high=1.2, seed=0):
+    """Draw `n` equally likely scenarios with independent uniform yield multipliers."""
+    rng = np.random.default_rng(seed)
+    table = np.empty((n, 4))
+    table[:, :3] = rng.uniform(low, high, size=(n, 3))
+    table[:, 3] = 1 / n
+    return table
+
+
+# ============================================
+# MODEL
+# ============================================
+class FarmerModel:
+    """Extensive form of the two-stage farmer problem over a scenario table.
+
+    Per scenario s the recourse variables are sell[s] = (wheat, corn, beets
+    at quota price, beets at low price) and buy[s] = (wheat, corn), and the
+    rows are rows[s] = (wheat requirement, corn requirement, beet yield).
+    The solver stays alive: update() and set_scenario() change coefficients
+    and bounds in place, and solve(warm=True) re-solves from the last
+    solution.
+    """
+
+    def __init__(self, solver, x, sell, buy, land, rows, multipliers, probs, data):
+        self.solver = solver
+        self.x = x
+        self.sell = sell
+        self.buy = buy
+        self.land = land
+        self.rows = rows
+        self.multipliers = multipliers
+        self.probs = probs
+        self.data = data
+        self.status = None
+        self._hint = None
+
+    @property
+    def num_scenarios(self):
+        return len(self.probs)
+
+    def solve(self, warm=False, gap=None):
+        self.status = persistent.solve(self.solver, warm, self._hint, gap)
+        if self.status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            self._hint = persistent.solution_values(self.solver)
+        return self.status
+
+    def profit(self):
+        return -1 * self.solver.Objective().Value()
+
+    def acres(self):
+        return [var.solution_value() for var in self.x]
+
+    @property
+    def layout(self):
+        """Column / row layout and objective sign of a SolveResult of this model."""
+        return {'num_first_stage': NUM_FIRST_STAGE, 'num_recourse': NUM_RECOURSE, 'row_start': 1,
+                'rows_per_scenario': ROWS_PER_SCENARIO, 'sign': -1}
+
+    def result(self):
+        """Snapshot the last solve as a SolveResult (recourse columns w1..w4, y1, y2)."""
+        return SolveResult.from_solver(self.solver, self.status, **self.layout)
+
+    def print_results(self):
+        print_solve_result(self.result(), [var.name() for var in self.solver.variables()])
+
+    def scenario_cost(self, s):
+        """(variable, coefficient) terms of scenario s's cost: planting plus purchases minus sales."""
+        d = self.data
+        terms = list(zip(self.x, (d['plant_cost_w'], d['plant_cost_c'], d['plant_cost_s'])))
+        terms += zip(self.sell[s], (-d['sell_price_w'], -d['sell_price_c'], -d['sell_price_s_high'],
+                                    -d['sell_price_s_low']))
+        terms += zip(self.buy[s], (d['purchase_price_w'], d['purchase_price_c']))
+        return terms
+
+    def loss_bound(self):
+        """Upper bound on any scenario's cost at an optimal solution.
+
+        Planting costs at most the dearest crop on all land; purchases never
+        exceed the requirement, since buying to resell loses the markup.
+        """
+        d = self.data
+        return max(d['plant_cost_w'], d['plant_cost_c'], d['plant_cost_s']) * d['total_land'] + \
+            d['purchase_price_w'] * d['required_w'] + d['purchase_price_c'] * d['required_c']
+
+    # ============================================
+    # IN-PLACE UPDATES
+    # ============================================
+    def update(self, **params):
+        """Change FARMER_DATA parameters in the built model, e.g. update(quota_s=5000)."""
+        self.data = farmer_data({key: self.data[key] for key in FARMER_DATA}, **params)
+        d = self.data
+        if OBJECTIVE_PARAMS.intersection(params):
+            self._sync_objective()
+        if 'total_land' in params:
+            self.land.SetUb(d['total_land'])
+        if 'quota_s' in params:
+            for w in self.sell:
+                w[2].SetUb(d['quota_s'])
+        if 'required_w' in params or 'required_c' in params:
+            for wheat, corn, _ in self.rows:
+                wheat.SetLb(d['required_w'])
+                corn.SetLb(d['required_c'])
+        if YIELD_PARAMS.intersection(params):
+            for s in range(self.num_scenarios):
+                self._sync_yields(s)
+
+    def set_scenario(self, s, multipliers=None, prob=None):
+        """Replace the yield multipliers and/or probability of scenario s.
+
+        Probabilities are not renormalized; keep the table summing to 1.
+        """
+        if multipliers is not None:
+            self.multipliers[s] = multipliers
+            self._sync_yields(s)
+        if prob is not None:
+            self.probs[s] = prob
+            self._sync_objective(scenarios=[s])
+
+    def _sync_objective(self, scenarios=None):
+        d = self.data
+        objective = self.solver.Objective()
+        for var, key in zip(self.x, ('plant_cost_w', 'plant_cost_c', 'plant_cost_s')):
+            objective.SetCoefficient(var, d[key])
+        sell_prices = (d['sell_price_w'], d['sell_price_c'], d['sell_price_s_high'], d['sell_price_s_low'])
+        buy_prices = (d['purchase_price_w'], d['purchase_price_c'])
+        for s in range(self.num_scenarios) if scenarios is None else scenarios:
+            p = self.probs[s]
+            for var, price in zip(self.sell[s], sell_prices):
+                objective.SetCoefficient(var, -p * price)
+            for var, price in zip(self.buy[s], buy_prices):
+                objective.SetCoefficient(var, p * price)
+
+    def _sync_yields(self, s):
+        d = self.data
+        m_w, m_c, m_s = self.multipliers[s].tolist()
+        wheat, corn, beets = self.rows[s]
+        wheat.SetCoefficient(self.x[0], d['yield_w'] * m_w)
+        corn.SetCoefficient(self.x[1], d['yield_c'] * m_c)
+        beets.SetCoefficient(self.x[2], -d['yield_s'] * m_s)
+
+
+OBJECTIVE_PARAMS = {'plant_cost_w', 'plant_cost_c', 'plant_cost_s', 'sell_price_w', 'sell_price_c',
+                    'purchase_markup', 'sell_price_s_high', 'sell_price_s_low'}
+YIELD_PARAMS = {'yield_w', 'yield_c', 'yield_s'}
+
+
+def build_two_stage(scenarios=SCENARIOS, data=None, solver_id='auto', integer=True,
+                    method='loop', names=True):
+    """Build the extensive form of the farmer model, one block per scenario row.
+
+    method='loop' sets coefficients scenario by scenario; method='matrix'
+    assembles the same model as sparse arrays and loads it in bulk
+    (names=False skips variable names there to save load time).
+    solver_id='auto' picks the engine for the problem type (see backends.py).
+    """
+    if method == 'matrix':
+        return _build_from_matrix(scenarios, data, solver_id, integer, names)
+    if method != 'loop':
+        raise ValueError(f"Unknown build method: {method}")
+    d = farmer_data(data)
+    multipliers, probs = scenario_table(scenarios)
+
+    solver = create_solver(solver_id, integer)
+    new_var = solver.IntVar if integer else solver.NumVar
+    inf = solver.infinity()
+
+    # Land Allocation
+    x = [new_var(0, inf, f'Acres of {crop}') for crop in CROPS]
+
+    objective = solver.Objective()
+    objective.SetMinimization()
+    objective.SetCoefficient(x[0], d['plant_cost_w'])
+    objective.SetCoefficient(x[1], d['plant_cost_c'])
+    objective.SetCoefficient(x[2], d['plant_cost_s'])
+
+    land = solver.Constraint(-inf, d['total_land'], 'Land')   # capacity
+    for var in x:
+        land.SetCoefficient(var, 1)
+
+    sell_prices = (d['sell_price_w'], d['sell_price_c'], d['sell_price_s_high'], d['sell_price_s_low'])
+    buy_prices = (d['purchase_price_w'], d['purchase_price_c'])
+    base_yield = (d['yield_w'], d['yield_c'], d['yield_s'])
+
+    # Coefficients are set row by row instead of via `solver.Add(expr)` so the
+    # loop allocates no intermediate expression objects per scenario.
+    sell, buy, rows = [], [], []
+    for s, (m_w, m_c, m_s) in enumerate(multipliers.tolist()):
+        tag = _scenario_tag(s, len(probs))
+        w = [new_var(0, inf, f'Tons of Wheat Sold{tag}'),
+             new_var(0, inf, f'Tons of Corn Sold{tag}'),
+             new_var(0, inf, f'Tons of Sugar Beets Sold (Higher){tag}'),
+             new_var(0, inf, f'Tons of Sugar Beets Sold (Lower){tag}')]
+        y = [new_var(0, inf, f'Tons of Wheat Bought{tag}'),
+             new_var(0, inf, f'Tons of Corn Bought{tag}')]
+        p = probs[s]
+        for var, price in zip(w, sell_prices):
+            objective.SetCoefficient(var, -p * price)
+        for var, price in zip(y, buy_prices):
+            objective.SetCoefficient(var, p * price)
+
+        # ensure required wheat / corn: yield * x + y - w >= required
+        scenario_rows = []
+        for k, (m, required) in enumerate(((m_w, d['required_w']), (m_c, d['required_c']))):
+            ct = solver.Constraint(required, inf)
+            ct.SetCoefficient(x[k], base_yield[k] * m)
+            ct.SetCoefficient(y[k], 1)
+            ct.SetCoefficient(w[k], -1)
+            scenario_rows.append(ct)
+
+        # beets sold do not exceed yield
+        ct = solver.Constraint(-inf, 0)
+        ct.SetCoefficient(w[2], 1)
+        ct.SetCoefficient(w[3], 1)
+        ct.SetCoefficient(x[2], -base_yield[2] * m_s)
+        scenario_rows.append(ct)
+
+        # beets sold at high price limited by quota
+        w[2].SetUb(d['quota_s'])
+
+        sell.append(w)
+        buy.append(y)
+        rows.append(scenario_rows)
+
+    return FarmerModel(solver, x, sell, buy, land, rows, multipliers, probs, d)
+
+
+def build_deterministic(yield_multiplier=1.0, data=None, solver_id='auto'):
+    """Single-season model of Ch1_Farmer_Low/Standard/High.py: one scenario, probability 1."""
+    m = yield_multiplier
+    multipliers = (m, m, m) if np.isscalar(m) else tuple(m)
+    return build_two_stage([(*multipliers, 1.0)], data, solver_id)
+
+
+def _scenario_tag(s, num_s):
+    return f' - Scenario {s + 1}' if num_s > 1 else ''
+
+
+# ============================================
+# MATRIX FORM
+# ============================================
+# Column layout: x1, x2, x3, then six columns per scenario
+# (w1, w2, w3, w4, y1, y2). Row layout: land, then three rows per scenario
+# (wheat requirement, corn requirement, beet yield).
+NUM_FIRST_STAGE = 3
+NUM_RECOURSE = 6
+ROWS_PER_SCENARIO = 3
+
+
+def extensive_form_arrays(scenarios=SCENARIOS, data=None, integer=True, names=True):
+    """Assemble the farmer extensive form as a MatrixForm without a solver."""
+    d = farmer_data(data)
+    multipliers, probs = scenario_table(scenarios)
+    num_s = len(probs)
+    n = NUM_FIRST_STAGE + NUM_RECOURSE * num_s
+    m = 1 + ROWS_PER_SCENARIO * num_s
+    inf = np.inf
+
+    recourse_cost = np.array([-d['sell_price_w'], -d['sell_price_c'],
+                              -d['sell_price_s_high'], -d['sell_price_s_low'],
+                              d['purchase_price_w'], d['purchase_price_c']])
+    c = np.concatenate([[d['plant_cost_w'], d['plant_cost_c'], d['plant_cost_s']],
+                        np.outer(probs, recourse_cost).ravel()])
+
+    col_lb = np.zeros(n)
+    col_ub = np.full(n, inf)
+    col_ub[NUM_FIRST_STAGE + 2::NUM_RECOURSE] = d['quota_s']   # beets at quota price
+
+    col0 = NUM_FIRST_STAGE + NUM_RECOURSE * np.arange(num_s)
+    row0 = 1 + ROWS_PER_SCENARIO * np.arange(num_s)
+    ones = np.ones(num_s)
+    rows = np.concatenate([
+        np.zeros(3, dtype=int),                                  # land
+        row0, row0, row0,                                        # wheat: x1, y1, -w1
+        row0 + 1, row0 + 1, row0 + 1,                            # corn: x2, y2, -w2
+        row0 + 2, row0 + 2, row0 + 2,                            # beets: w3, w4, -x3
+    ])
+    cols = np.concatenate([
+        np.arange(3),
+        np.zeros(num_s, dtype=int), col0 + 4, col0,
+        np.ones(num_s, dtype=int), col0 + 5, col0 + 1,
+        col0 + 2, col0 + 3, np.full(num_s, 2),
+    ])
+    vals = np.concatenate([
+        np.ones(3),
+        d['yield_w'] * multipliers[:, 0], ones, -ones,
+        d['yield_c'] * multipliers[:, 1], ones, -ones,
+        ones, ones, -d['yield_s'] * multipliers[:, 2],
+    ])
+
+    row_lb = np.empty(m)
+    row_ub = np.empty(m)
+    row_lb[0], row_ub[0] = -inf, d['total_land']
+    row_lb[row0], row_ub[row0] = d['required_w'], inf
+    row_lb[row0 + 1], row_ub[row0 + 1] = d['required_c'], inf
+    row_lb[row0 + 2], row_ub[row0 + 2] = -inf, 0
+
+    var_names = None
+    if names:
+        var_names = [f'Acres of {crop}' for crop in CROPS]
+        for s in range(num_s):
+            tag = _scenario_tag(s, num_s)
+            var_names += [f'Tons of Wheat Sold{tag}', f'Tons of Corn Sold{tag}',
+                          f'Tons of Sugar Beets Sold (Higher){tag}',
+                          f'Tons of Sugar Beets Sold (Lower){tag}',
+                          f'Tons of Wheat Bought{tag}', f'Tons of Corn Bought{tag}']
+
+    return MatrixForm(c, coo_matrix(rows, cols, vals, (m, n)), row_lb, row_ub,
+                      col_lb, col_ub, integer, False, var_names)
+
+
+def two_stage_arrays(scenarios=SCENARIOS, data=None, integer=True):
+    """Split the farmer model into first stage (acres) and per-scenario recourse.
+
+    The recourse y = (w1, w2, w3, w4, y1, y2) is continuous here: the
+    decomposition solvers need LP duals from the second stage.
+    """
+    d = farmer_data(data)
+    multipliers, probs = scenario_table(scenarios)
+    num_s = len(probs)
+    inf = np.inf
+
+    q = np.tile([-d['sell_price_w'], -d['sell_price_c'], -d['sell_price_s_high'],
+                 -d['sell_price_s_low'], d['purchase_price_w'], d['purchase_price_c']], (num_s, 1))
+    W = np.array([[-1, 0, 0, 0, 1, 0],     # wheat: yield * x1 + y1 - w1 >= required_w
+                  [0, -1, 0, 0, 0, 1],     # corn:  yield * x2 + y2 - w2 >= required_c
+                  [0, 0, 1, 1, 0, 0]],     # beets: w3 + w4 - yield * x3 <= 0
+                 dtype=float)
+    T = np.zeros((num_s, ROWS_PER_SCENARIO, NUM_FIRST_STAGE))
+    T[:, 0, 0] = d['yield_w'] * multipliers[:, 0]
+    T[:, 1, 1] = d['yield_c'] * multipliers[:, 1]
+    T[:, 2, 2] = -d['yield_s'] * multipliers[:, 2]
+    h_lb = np.tile([d['required_w'], d['required_c'], -inf], (num_s, 1))
+    h_ub = np.tile([inf, inf, 0.0], (num_s, 1))
+    y_ub = np.array([inf, inf, d['quota_s'], inf, inf, inf])
+
+    return TwoStageForm(
+        c=np.array([d['plant_cost_w'], d['plant_cost_c'], d['plant_cost_s']], dtype=float),
+        A=np.ones((1, NUM_FIRST_STAGE)), row_lb=np.array([-inf]), row_ub=np.array([d['total_land']], dtype=float),
+        col_lb=np.zeros(NUM_FIRST_STAGE), col_ub=np.full(NUM_FIRST_STAGE, inf), integer=integer,
+        q=q, W=W, T=T, h_lb=h_lb, h_ub=h_ub, y_lb=np.zeros(NUM_RECOURSE), y_ub=y_ub,
+        probs=probs, profit_sign=-1,
+    )
+
+
+def _build_from_matrix(scenarios, data, solver_id, integer, names):
+    multipliers, probs = scenario_table(scenarios)
+    form = extensive_form_arrays(scenarios, data, integer, names)
+    return wrap_solver(load_matrix_form(form, solver_id), multipliers, probs, farmer_data(data))
+
+
+def wrap_solver(solver, multipliers, probs, d):
+    """FarmerModel over a solver that already holds the extensive form (e.g. reloaded from a file).
+
+    Both build methods share one column and row layout, so the handles
+    are slices of solver.variables() and solver.constraints().
+    """
+    variables = solver.variables()
+    x = variables[:NUM_FIRST_STAGE]
+    constraints = solver.constraints()
+    sell, buy, rows = [], [], []
+    for start in range(NUM_FIRST_STAGE, len(variables), NUM_RECOURSE):
+        sell.append(variables[start:start + 4])
+        buy.append(variables[start + 4:start + 6])
+    for start in range(1, len(constraints), ROWS_PER_SCENARIO):
+        rows.append(constraints[start:start + ROWS_PER_SCENARIO])
+    return FarmerModel(solver, x, sell, buy, constraints[0], rows, multipliers, probs, d)
+
+
+if __name__ == '__main__':
+    model = build_two_stage(SCENARIOS)
+    model.solve()
+    model.print_results()
@@ -0,0 +1,246 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import create_solver
+from farmer_model import CROPS, FARMER_DATA, SCENARIOS
+from matrix_form import MatrixForm, coo_matrix, load_matrix_form
+from scenario_tree import ScenarioTree
+
+# ============================================
+# DECLARE CONSTANTS
+# ============================================
+# Multi-season farmer: at every node of a scenario tree the farmer learns the
+# season's yield multipliers, harvests the acres planted at the parent,
+# meets the feed requirement from harvest, purchases and stored grain, sells
+# the rest or stores wheat and corn for next season (beets do not keep), and
+# plants next season's acres on the same land. The root plants the first
+# season. The model is the LP relaxation of the book's integer model: the
+# decomposition solver needs duals.
+STORAGE_DATA = {
+    'storage_cost_w': 10,   # $/ton carried into the next season
+    'storage_cost_c': 10,
+    'initial_w': 0,         # tons in store before the first season
+    'initial_c': 0,
+}
+
+# State passed from one season to the next: acres planted, tons stored.
+STATE = ('Acres of Wheat', 'Acres of Corn', 'Acres of Sugar Beets', 'Tons of Wheat Stored', 'Tons of Corn Stored')
+NUM_STATE = len(STATE)
+
+
+# ============================================
+# DATA HELPERS
+# ============================================
+def multistage_data(data=None, **overrides):
+    """Return FARMER_DATA plus STORAGE_DATA with `data` and keyword overrides applied."""
+    merged = {**FARMER_DATA, **STORAGE_DATA}
+    for key, value in {**(data or {}), **overrides}.items():
+        if key not in merged:
+            raise KeyError(f"Unknown farmer parameter: {key}")
+        merged[key] = value
+    merged['purchase_price_w'] = merged['purchase_markup'] * merged['sell_price_w']
+    merged['purchase_price_c'] = merged['purchase_markup'] * merged['sell_price_c']
+    return merged
+
+
+def farmer_tree(num_seasons, scenarios=SCENARIOS):
+    """Stagewise-independent yield tree: every season branches on the scenario table."""
+    return ScenarioTree.from_scenario_table(scenarios, num_seasons)
+
+
+def _node_costs(d):
+    # per node block: w1..w4 sold, y1, y2 bought, wheat and corn stored, acres planted
+    return np.array([-d['sell_price_w'], -d['sell_price_c'], -d['sell_price_s_high'], -d['sell_price_s_low'],
+                     d['purchase_price_w'], d['purchase_price_c'], d['storage_cost_w'], d['storage_cost_c'],
+                     d['plant_cost_w'], d['plant_cost_c'], d['plant_cost_s']])
+
+
+# ============================================
+# DETERMINISTIC EQUIVALENT
+# ============================================
+# One block of 11 columns per tree node (sold w1..w4, bought y1, y2,
+# stored wheat and corn, acres planted for the next season) and four rows
+# (wheat, corn, beets, land). The root only plants and holds the initial
+# stock; leaves plant nothing. Memory grows with the tree, so this is the
+# reference for small trees only.
+NODE_COLUMNS = 11
+NODE_ROWS = 4
+
+
+def deterministic_equivalent_arrays(tree, data=None):
+    """Assemble the multi-season LP over every node of `tree` as a MatrixForm."""
+    d = multistage_data(data)
+    n = tree.num_nodes
+    inf = np.inf
+    col0 = NODE_COLUMNS * np.arange(n)
+    row0 = NODE_ROWS * np.arange(n)
+    child = np.arange(1, n)
+    parent = tree.parent[child]
+    m = tree.values[child]
+
+    c = (tree.prob[:, None] * _node_costs(d)).ravel()
+    col_lb = np.zeros(n * NODE_COLUMNS)
+    col_ub = np.full(n * NODE_COLUMNS, inf)
+    col_ub[col0 + 2] = d['quota_s']
+    col_ub[:6] = 0                                        # nothing is traded at the root
+    col_lb[6:8] = col_ub[6:8] = d['initial_w'], d['initial_c']
+    c[6:8] = 0                                            # the initial stock is sunk
+    for offset in range(8, 11):
+        col_ub[col0[tree.leaves] + offset] = 0            # no planting after the last season
+
+    ones = np.ones(n - 1)
+    rows = np.concatenate([
+        row0[child], row0[child], row0[child], row0[child], row0[child],              # wheat
+        row0[child] + 1, row0[child] + 1, row0[child] + 1, row0[child] + 1, row0[child] + 1,  # corn
+        row0[child] + 2, row0[child] + 2, row0[child] + 2,                            # beets
+        np.repeat(row0 + 3, 3),                                                       # land
+    ])
+    cols = np.concatenate([
+        col0[parent] + 8, col0[parent] + 6, col0[child] + 4, col0[child], col0[child] + 6,
+        col0[parent] + 9, col0[parent] + 7, col0[child] + 5, col0[child] + 1, col0[child] + 7,
+        col0[child] + 2, col0[child] + 3, col0[parent] + 10,
+        (col0[:, None] + np.arange(8, 11)).ravel(),
+    ])
+    vals = np.concatenate([
+        d['yield_w'] * m[:, 0], ones, ones, -ones, -ones,
+        d['yield_c'] * m[:, 1], ones, ones, -ones, -ones,
+        ones, ones, -d['yield_s'] * m[:, 2],
+        np.ones(3 * n),
+    ])
+
+    row_lb = np.tile([d['required_w'], d['required_c'], -inf, -inf], n)
+    row_ub = np.tile([inf, inf, 0.0, d['total_land']], n)
+    row_lb[:3], row_ub[:3] = -inf, inf                    # the root has no harvest
+    return MatrixForm(c, coo_matrix(rows, cols, vals, (NODE_ROWS * n, NODE_COLUMNS * n)), row_lb, row_ub,
+                      col_lb, col_ub, False, False, None)
+
+
+def solve_deterministic_equivalent(tree, data=None, solver_id='auto'):
+    """Solve the deterministic equivalent; return (expected profit, first-season acres)."""
+    solver = load_matrix_form(deterministic_equivalent_arrays(tree, data), solver_id)
+    status = solver.Solve()
+    if status != pywraplp.Solver.OPTIMAL:
+        raise Exception(f"Deterministic equivalent ended with status code: {status}")
+    acres = [var.solution_value() for var in solver.variables()[8:11]]
+    return -solver.Objective().Value(), acres
+
+
+# ============================================
+# STAGE PROBLEMS
+# ============================================
+class StageProblem:
+    """One season's LP, shared by every node of its stage.
+
+    The incoming state (acres planted, tons stored) is held by variables
+    fixed through their bounds, whose reduced costs are the gradient of the
+    stage value with respect to the state. set_outcome() writes a node's
+    yield multipliers into the harvest coefficients in place, and
+    add_cut() bounds the future cost theta from below.
+    """
+
+    def __init__(self, data=None, root=False, last=False, future_bound=0.0, solver_id='auto'):
+        d = self.data = multistage_data(data)
+        self.root = root
+        solver = self.solver = create_solver(solver_id)
+        inf = solver.infinity()
+
+        self.state_in = [solver.NumVar(0, 0, f'{name} (incoming)') for name in STATE]
+        self.sold = [solver.NumVar(0, inf, f'Tons of {crop} Sold') for crop in ('Wheat', 'Corn')] + \
+            [solver.NumVar(0, d['quota_s'], 'Tons of Sugar Beets Sold (Higher)'),
+             solver.NumVar(0, inf, 'Tons of Sugar Beets Sold (Lower)')]
+        self.bought = [solver.NumVar(0, inf, f'Tons of {crop} Bought') for crop in ('Wheat', 'Corn')]
+        self.stored = [solver.NumVar(0, inf, f'Tons of {crop} Stored') for crop in ('Wheat', 'Corn')]
+        self.planted = [solver.NumVar(0, 0 if last else inf, f'Acres of {crop}') for crop in CROPS]
+        self.theta = None if last else solver.NumVar(-future_bound, inf, 'Future cost')
+
+        objective = self.objective = solver.Objective()
+        objective.SetMinimization()
+        for var, coef in zip(self.sold + self.bought + self.stored + self.planted, _node_costs(d).tolist()):
+            objective.SetCoefficient(var, coef)
+        if self.theta is not None:
+            objective.SetCoefficient(self.theta, 1)
+
+        # harvest + purchases + stock - sales - new stock >= requirement
+        self.rows = []
+        for k, required in enumerate((d['required_w'], d['required_c'])):
+            ct = solver.Constraint(required, inf)
+            ct.SetCoefficient(self.state_in[3 + k], 1)
+            ct.SetCoefficient(self.bought[k], 1)
+            ct.SetCoefficient(self.sold[k], -1)
+            ct.SetCoefficient(self.stored[k], -1)
+            self.rows.append(ct)
+        ct = solver.Constraint(-inf, 0)
+        ct.SetCoefficient(self.sold[2], 1)
+        ct.SetCoefficient(self.sold[3], 1)
+        self.rows.append(ct)
+        land = solver.Constraint(-inf, d['total_land'])
+        for var in self.planted:
+            land.SetCoefficient(var, 1)
+
+        if root:
+            # the root trades nothing and passes the initial stock on
+            for ct in self.rows:
+                ct.SetBounds(-inf, inf)
+            for var in self.sold + self.bought:
+                var.SetUb(0)
+            for var, key in zip(self.stored, ('initial_w', 'initial_c')):
+                var.SetBounds(d[key], d[key])
+                objective.SetCoefficient(var, 0)
+
+    @property
+    def state_out(self):
+        return self.planted + self.stored
+
+    def set_outcome(self, multipliers):
+        d = self.data
+        m_w, m_c, m_s = np.asarray(multipliers, dtype=float).tolist()
+        self.rows[0].SetCoefficient(self.state_in[0], d['yield_w'] * m_w)
+        self.rows[1].SetCoefficient(self.state_in[1], d['yield_c'] * m_c)
+        self.rows[2].SetCoefficient(self.state_in[2], -d['yield_s'] * m_s)
+
+    def set_state(self, state):
+        for var, value in zip(self.state_in, np.asarray(state, dtype=float).tolist()):
+            var.SetBounds(value, value)
+
+    def add_cut(self, intercept, gradient):
+        """theta >= intercept + gradient @ state_out."""
+        ct = self.solver.Constraint(intercept, self.solver.infinity())
+        ct.SetCoefficient(self.theta, 1)
+        for var, coef in zip(self.state_out, np.asarray(gradient, dtype=float).tolist()):
+            if coef:
+                ct.SetCoefficient(var, -coef)
+
+    def solve(self):
+        """Return (stage value incl. theta, outgoing state, d value / d incoming state)."""
+        status = self.solver.Solve()
+        if status != pywraplp.Solver.OPTIMAL:
+            raise Exception(f"Stage problem ended with status code: {status}")
+        state_out = np.array([var.solution_value() for var in self.state_out])
+        gradient = np.array([var.reduced_cost() for var in self.state_in])
+        return self.objective.Value(), state_out, gradient
+
+    def stage_cost(self):
+        """Objective value without the future cost theta."""
+        theta = 0.0 if self.theta is None else self.theta.solution_value()
+        return self.objective.Value() - theta
+
+
+def stage_problems(tree, data=None, solver_id='auto'):
+    """One StageProblem for the root and for each season of `tree`.
+
+    theta_t needs a finite lower bound before the first cut. No season
+    earns more than all land in its best-paying crop at the highest yield
+    multiplier in the tree, plus selling the grain stored from the season
+    before, so theta_t >= -2 * (seasons left) * that amount.
+    """
+    d = multistage_data(data)
+    num_seasons = tree.num_stages - 1
+    best_acre = max(d['yield_w'] * d['sell_price_w'], d['yield_c'] * d['sell_price_c'],
+                    d['yield_s'] * d['sell_price_s_high']) * tree.values[1:].max()
+    per_season = 2 * d['total_land'] * best_acre
+    return [StageProblem(data, root=(t == 0), last=(t == num_seasons),
+                         future_bound=(num_seasons - t) * per_season, solver_id=solver_id)
+            for t in range(num_seasons + 1)]
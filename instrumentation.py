@@ -0,0 +1,262 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import cProfile
+import json
+import math
+import sys
+import time
+from contextlib import contextmanager
+
+from ortools.linear_solver import linear_solver_pb2
+
+from backends import resolve_solver_id
+import component_model
+import farmer_model
+
+# ============================================
+# SOLVE INSTRUMENTATION
+# ============================================
+# One record per instrumented solve, a flat dict that serializes as one
+# JSON line:
+#   build_seconds    Python model construction (module.build_two_stage)
+#   solve_seconds    the solver.Solve() call, wall clock
+#   engine_seconds   the part of it the engine itself reports; the rest
+#                    (interface_seconds) is pywraplp handing the model to
+#                    the engine. pywraplp does not report presolve apart
+#                    from the search, so presolve is inside engine_seconds.
+#                    Engines report whole milliseconds, so interface_seconds
+#                    is only meaningful on solves well above that.
+#   extract_seconds  copying the solution out (model.result())
+#   report_seconds   print_results(), when asked for
+# plus CPU seconds of the solve (more than its wall time when the engine
+# runs threads), iterations, branch-and-bound nodes, model size and status.
+# Hooks are plain callables f(model, record), run right before and after
+# Solve(); a hook may add keys to the record, which are emitted with it.
+MODELS = {'farmer': farmer_model, 'component': component_model}
+PHASES = ('build', 'solve', 'extract', 'report')
+
+
+def model_size(solver):
+    """Variables, constraints, integer variables and nonzeros of a pywraplp model."""
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+    return {
+        'variables': len(proto.variable),
+        'constraints': len(proto.constraint),
+        'integer_variables': sum(var.is_integer for var in proto.variable),
+        'nonzeros': sum(len(ct.var_index) for ct in proto.constraint),
+    }
+
+
+class Instrumentation:
+    """Collects solve records, runs pre/post-solve hooks and writes records to sinks.
+
+    `labels` are added to every record (e.g. {'run': 'nightly'}); a sink is
+    anything with a write(record) method, such as JsonLinesSink.
+    """
+
+    def __init__(self, sinks=(), labels=None):
+        self.sinks = list(sinks)
+        self.labels = dict(labels or {})
+        self.pre_solve = []
+        self.post_solve = []
+        self.records = []
+
+    def add_hook(self, event, hook):
+        """Register `hook(model, record)` for event 'pre_solve' or 'post_solve'."""
+        if event not in ('pre_solve', 'post_solve'):
+            raise ValueError(f"Unknown hook event: {event}")
+        getattr(self, event).append(hook)
+
+    def new_record(self, **fields):
+        return {'timestamp': time.time(), **self.labels, **fields}
+
+    @contextmanager
+    def phase(self, record, name):
+        """Time the enclosed block into record[f'{name}_seconds'] (accumulating)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = f'{name}_seconds'
+            record[key] = record.get(key, 0.0) + time.perf_counter() - start
+
+    def solve(self, model, record, warm=False, gap=None):
+        """Solve a built FarmerModel / ComponentModel, timing the call and running the hooks."""
+        for hook in self.pre_solve:
+            hook(model, record)
+        cpu = time.process_time()
+        with self.phase(record, 'solve'):
+            status = model.solve(warm, gap)
+        record['solve_cpu_seconds'] = time.process_time() - cpu
+        for hook in self.post_solve:
+            hook(model, record)
+        return status
+
+    def emit(self, record):
+        self.records.append(record)
+        for sink in self.sinks:
+            sink.write(record)
+
+
+def instrumented_solve(module, scenarios=None, data=None, instrumentation=None, report=False, **options):
+    """Build, solve and extract `module` (farmer_model or component_model) under `instrumentation`.
+
+    `options` go to module.build_two_stage (solver_id, integer, method, ...).
+    Returns (model, SolveResult, record); the record has been emitted.
+    """
+    instrumentation = Instrumentation() if instrumentation is None else instrumentation
+    scenarios = module.SCENARIOS if scenarios is None else scenarios
+    record = instrumentation.new_record(model=module.__name__, scenarios=len(scenarios))
+
+    with instrumentation.phase(record, 'build'):
+        model = module.build_two_stage(scenarios, data, **options)
+    record['solver'] = resolve_solver_id(options.get('solver_id', 'auto'), model.solver.IsMip())
+    record.update(model_size(model.solver))
+
+    instrumentation.solve(model, record)
+
+    with instrumentation.phase(record, 'extract'):
+        result = model.result()
+    response = linear_solver_pb2.MPSolutionResponse()
+    model.solver.FillSolutionResponseProto(response)
+    engine = response.solve_info.solve_wall_time_seconds if response.HasField('solve_info') else math.nan
+    record.update(
+        engine_seconds=engine,
+        interface_seconds=max(0.0, record['solve_seconds'] - engine),
+        status=result.status_name,
+        objective=result.objective,
+        profit=result.profit,
+        iterations=result.iterations,
+        nodes=result.nodes,
+    )
+    if report:
+        with instrumentation.phase(record, 'report'):
+            model.print_results()
+
+    instrumentation.emit(record)
+    return model, result, record
+
+
+# ============================================
+# OUTPUT FORMATS
+# ============================================
+def _json_value(value):
+    # NaN and infinity are not JSON; emit null
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class JsonLinesSink:
+    """Write each record as one JSON line to a path (appending) or an open file."""
+
+    def __init__(self, target):
+        self.file = open(target, 'a') if isinstance(target, str) else target
+        self.owned = isinstance(target, str)
+
+    def write(self, record):
+        self.file.write(json.dumps({key: _json_value(value) for key, value in record.items()}) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+
+
+PROMETHEUS_LABELS = ('model', 'solver', 'scenarios')
+PROMETHEUS_COUNTERS = {
+    'solves_total': 'Instrumented solves.',
+    'iterations_total': 'Simplex / interior point iterations.',
+    'nodes_total': 'Branch-and-bound nodes.',
+}
+PROMETHEUS_GAUGES = ('variables', 'constraints', 'integer_variables', 'nonzeros', 'objective')
+
+
+def prometheus_text(records, prefix='sp'):
+    """Aggregate records into Prometheus text exposition format.
+
+    Series are labelled by model, solver and scenario count. Phase times,
+    iterations and nodes are summed into counters; model size and the
+    objective are gauges holding the latest record's value.
+    """
+    groups = {}
+    for record in records:
+        labels = tuple((key, record.get(key)) for key in PROMETHEUS_LABELS)
+        groups.setdefault(labels, []).append(record)
+
+    def series(name, labels, value, extra=()):
+        text = ','.join(f'{key}="{label}"' for key, label in (*labels, *extra))
+        return f'{prefix}_{name}{{{text}}} {value}'
+
+    lines = [f'# HELP {prefix}_phase_seconds_total Wall time per solve phase.',
+             f'# TYPE {prefix}_phase_seconds_total counter']
+    for labels, group in groups.items():
+        for phase in PHASES + ('engine', 'interface'):
+            values = [r[f'{phase}_seconds'] for r in group if f'{phase}_seconds' in r]
+            if values:
+                lines.append(series('phase_seconds_total', labels, repr(math.fsum(values)), [('phase', phase)]))
+    for name, text in PROMETHEUS_COUNTERS.items():
+        lines += [f'# HELP {prefix}_{name} {text}', f'# TYPE {prefix}_{name} counter']
+        key = name[:-len('_total')]
+        for labels, group in groups.items():
+            total = len(group) if key == 'solves' else sum(r.get(key) or 0 for r in group)
+            lines.append(series(name, labels, total))
+    for name in PROMETHEUS_GAUGES:
+        lines += [f'# HELP {prefix}_model_{name} Latest model {name.replace("_", " ")}.',
+                  f'# TYPE {prefix}_model_{name} gauge']
+        for labels, group in groups.items():
+            value = group[-1].get(name)
+            lines.append(series(f'model_{name}', labels, 'NaN' if value is None else value))
+    return '\n'.join(lines) + '\n'
+
+
+# ============================================
+# PROFILING HOOKS
+# ============================================
+def cprofile_hooks(profiler):
+    """(pre_solve, post_solve) hooks that enable `profiler` (a cProfile.Profile) around each solve."""
+    def start(model, record):
+        profiler.enable()
+
+    def stop(model, record):
+        profiler.disable()
+    return start, stop
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Instrumented farmer / component solves with JSON-lines or '
+                                                 'Prometheus metrics')
+    parser.add_argument('--model', choices=sorted(MODELS), default='farmer')
+    parser.add_argument('--scenarios', type=int, default=None, help='sampled scenario count (default: the book table)')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--solver-id', default='auto')
+    parser.add_argument('--method', default=None, help="build method ('loop' / 'expression' or 'matrix')")
+    parser.add_argument('--format', choices=['json', 'prometheus'], default='json')
+    parser.add_argument('--output', default=None, help='append to this file instead of writing to stdout')
+    parser.add_argument('--report', action='store_true', help='also print (and time) the solution')
+    parser.add_argument('--profile', default=None, help='dump a cProfile of the solve calls to this file')
+    args = parser.parse_args()
+
+    module = MODELS[args.model]
+    scenarios = None if args.scenarios is None else module.sample_scenarios(args.scenarios)
+    options = {'solver_id': args.solver_id}
+    if args.method is not None:
+        options['method'] = args.method
+    out = sys.stdout if args.output is None else open(args.output, 'a')
+    instrumentation = Instrumentation([JsonLinesSink(out)] if args.format == 'json' else [])
+    if args.profile is not None:
+        profiler = cProfile.Profile()
+        start_hook, stop_hook = cprofile_hooks(profiler)
+        instrumentation.add_hook('pre_solve', start_hook)
+        instrumentation.add_hook('post_solve', stop_hook)
+    for _ in range(args.repeat):
+        instrumented_solve(module, scenarios, instrumentation=instrumentation, report=args.report, **options)
+    if args.format == 'prometheus':
+        out.write(prometheus_text(instrumentation.records))
+    if args.profile is not None:
+        profiler.dump_stats(args.profile)
+    if out is not sys.stdout:
+        out.close()
@@ -0,0 +1,502 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+import farmer_general
+import farmer_model
+from backends import configure, create_solver
+from matrix_form import MatrixForm, load_matrix_form
+
+# ============================================
+# LAGRANGIAN RELAXATION
+# ============================================
+# The farmer extensive form (cost minimization over any crop list, see
+# farmer_general) couples its blocks in two places, and either can be
+# dualized with a price per acre:
+#
+#   dualize='land'               the land row sum_k x_k <= total_land. The
+#       model splits into one subproblem per crop over all scenarios:
+#           min (c_k + lam) x_k + sum_s p_s q_sk y_sk,  x_k <= total_land
+#       and L(lam) = sum_k v_k(lam) - lam * total_land, lam >= 0.
+#   dualize='nonanticipativity'  one copy x_s of the acres per scenario,
+#       with x_s = sum_t p_t x_t priced by lam_s. The model splits into
+#       one single-scenario farmer model per scenario:
+#           min (c + lam_s) x_s + q_s y_s,  land row kept
+#       and L(lam) = sum_s p_s v_s(lam_s), with sum_s p_s lam_s = 0.
+#
+# Every L(lam) is a lower bound on the optimal cost (an upper bound on
+# profit). Integer scenario subproblems are MIPs solved to the solver's
+# default gap, so the bound uses each subproblem's best bound, not its
+# incumbent.
+# The multipliers are updated by subgradient steps (Polyak step length
+# towards the best plan found, halved when the bound stalls) or by a
+# trust-region bundle method (cutting-plane model of L maximized as an LP
+# in a box around the best multipliers, the box grown on good steps and
+# shrunk on bad ones).
+#
+# Each iteration also turns the subproblem acres into a plan, priced
+# exactly by re-solving the subproblems with the acres fixed; the cheapest
+# plan is returned. In land mode every crop subproblem solve is a priced
+# point (acres, cost of the crop) of that crop, and the plan mixes each
+# crop's points into acres within the land at least total cost (a small
+# knapsack over convex combinations). The subproblem acres scaled down to
+# the land are always among the points, so a plan exists from the first
+# iteration.
+# In scenario mode the expected cost of fixed acres still splits by crop,
+# so plans are priced the same way, on the land mode's crop subproblems:
+# each scenario's acres and their probability-weighted mean, fitted to the
+# land, add their crops' points, and the plan mixes them. Mixing crops
+# from different scenarios finds plans no single scenario proposes (on
+# the book data, the optimum's wheat is the land the others leave free).
+#
+# Subproblems keep their solvers alive between iterations and can run on
+# worker processes, which own a fixed block of subproblems for the whole
+# run (as in ph.py). SCIP is the default subproblem engine: on the book
+# crops over 1,000 sampled scenarios it matches CBC on the wheat and corn
+# subproblems and is about 10x faster on sugar beets (0.14-0.19 s per
+# solve against 1.1-2 s), although CBC is the faster engine on the whole
+# extensive form (see backends.py).
+DUALIZE = ('land', 'nonanticipativity')
+METHODS = ('subgradient', 'bundle')
+
+LagrangianResult = namedtuple(
+    'LagrangianResult',
+    ['x', 'objective', 'profit', 'bound', 'gap', 'iterations', 'multipliers', 'seconds', 'history'],
+)
+
+
+class AcreSubproblem:
+    """A farmer_general model whose acres are charged an extra price on top of their planting cost."""
+
+    def __init__(self, crops, scenarios, total_land, integer, solver_id, gap=None, time_limit=None):
+        self.model = farmer_general.build_two_stage(crops, scenarios, total_land, solver_id, integer, names=False)
+        configure(self.model.solver, time_limit=time_limit)
+        solver = self.model.solver
+        self.x = solver.variables()[:self.model.num_crops]
+        self.cost = self.model.crops.plant_cost
+        self.gap = gap
+        # evaluate() fixes the acres with these rows, not with variable
+        # bounds: SCIP turns an integer variable fixed at 0 or 1 into a
+        # binary one and then rejects any later fix above 1.
+        self.fix = []
+        for var in self.x:
+            ct = solver.Constraint(-solver.infinity(), solver.infinity())
+            ct.SetCoefficient(var, 1)
+            self.fix.append(ct)
+
+    def solve(self, price):
+        """Return (acres, bound on the priced objective, cost of the solution without the price)."""
+        objective = self.model.solver.Objective()
+        for var, cost, extra in zip(self.x, self.cost.tolist(), np.broadcast_to(price, self.cost.shape).tolist()):
+            objective.SetCoefficient(var, cost + extra)
+        status = self.model.solve(warm=True, gap=self.gap)
+        if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            raise Exception(f"Lagrangian subproblem ended with status code: {status}")
+        acres = np.array([var.solution_value() for var in self.x])
+        bound = objective.BestBound() if self.model.solver.IsMip() else objective.Value()
+        return acres, bound, objective.Value() - np.broadcast_to(price, acres.shape) @ acres
+
+    def evaluate(self, x):
+        """Expected cost with the acres fixed at x and no price."""
+        inf = self.model.solver.infinity()
+        for ct, value in zip(self.fix, np.atleast_1d(x).tolist()):
+            ct.SetBounds(value, value)
+        try:
+            return self.solve(0.0)[2]
+        finally:
+            for ct in self.fix:
+                ct.SetBounds(-inf, inf)
+
+
+# ============================================
+# PARALLEL SUBPROBLEMS
+# ============================================
+def _worker_main(conn, specs):
+    subproblems = [AcreSubproblem(*spec) for spec in specs]
+    while (message := conn.recv()) is not None:
+        command, args = message
+        try:
+            conn.send([getattr(sub, command)(arg) for sub, arg in zip(subproblems, args)])
+        except Exception as error:
+            conn.send(error)
+    conn.close()
+
+
+class SubproblemPool:
+    """AcreSubproblems built from `specs`, in-process (processes=1) or in blocks on worker processes."""
+
+    def __init__(self, specs, processes=1, start_method=None):
+        self.processes = min(processes or os.cpu_count() or 1, len(specs))
+        self.local = None
+        self.workers = []
+        if self.processes == 1:
+            self.local = [AcreSubproblem(*spec) for spec in specs]
+            return
+        context = multiprocessing.get_context(start_method)
+        bounds = np.linspace(0, len(specs), self.processes + 1).astype(int).tolist()
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker_main, args=(child, specs[a:b]), daemon=True)
+            process.start()
+            child.close()
+            self.workers.append((parent, process, a, b))
+
+    def call(self, command, args):
+        """Run sub.<command>(arg) for every subproblem and its arg; return the results in order."""
+        if self.local is not None:
+            return [getattr(sub, command)(arg) for sub, arg in zip(self.local, args)]
+        for conn, _, a, b in self.workers:
+            conn.send((command, args[a:b]))
+        parts = [conn.recv() for conn, *_ in self.workers]
+        for part in parts:
+            if isinstance(part, Exception):
+                raise part
+        return [result for part in parts for result in part]
+
+    def close(self):
+        for conn, process, *_ in self.workers:
+            conn.send(None)
+            conn.close()
+            process.join()
+        self.workers = []
+
+
+# ============================================
+# RELAXATIONS
+# ============================================
+# A relaxation evaluates L at a multiplier array and returns (L, a
+# supergradient of L, the subproblem acres); `direction` and `project`
+# keep subgradient steps inside the multiplier domain, and `lower` /
+# `equality` state that domain for the bundle master LP.
+class LandRelaxation:
+    """Dualize the land row: one subproblem per crop, over every scenario."""
+
+    def __init__(self, crops, scenarios, total_land, integer, solver_id, gap, solve_limit, processes):
+        multipliers, probs = farmer_general.scenario_table(scenarios, len(crops.names))
+        self.num_crops = len(crops.names)
+        self.total_land = total_land
+        self.integer = integer
+        self.shape = (1,)
+        self.lower = np.zeros(1)
+        self.equality = None
+        self.solver_id = solver_id
+        self.points = [{} for _ in range(self.num_crops)]  # per crop: acres -> cheapest cost seen
+        specs = [(_single_crop(crops, k), np.column_stack([multipliers[:, k], probs]), total_land, integer,
+                  solver_id, gap, solve_limit) for k in range(len(crops.names))]
+        self.pool = SubproblemPool(specs, processes)
+
+    def dual(self, lam):
+        results = self.pool.call('solve', [lam[0]] * self.num_crops)
+        x = np.array([acres[0] for acres, _, _ in results])
+        if self.integer:
+            x = np.round(x) + 0.0
+        for points, acres, (_, _, cost) in zip(self.points, x.tolist(), results):
+            _record(points, acres, cost)
+        value = sum(bound for _, bound, _ in results) - lam[0] * self.total_land
+        return value, np.array([x.sum() - self.total_land]), x
+
+    def direction(self, gradient):
+        return gradient
+
+    def project(self, lam):
+        return np.maximum(lam, 0.0)
+
+    def plan(self, x):
+        scaled = fit_to_land(x, self.total_land, self.integer)
+        if any(acres not in points for points, acres in zip(self.points, scaled.tolist())):
+            self.evaluate(scaled)
+        return choose_acres(self.points, self.total_land, self.integer, self.solver_id)
+
+    def evaluate(self, x):
+        costs = self.pool.call('evaluate', [[acres] for acres in x.tolist()])
+        for points, acres, cost in zip(self.points, x.tolist(), costs):
+            _record(points, acres, cost)
+        return sum(costs)
+
+    def close(self):
+        self.pool.close()
+
+
+class NonanticipativityRelaxation:
+    """Dualize x_s = sum_t p_t x_t: one single-scenario subproblem per scenario."""
+
+    def __init__(self, crops, scenarios, total_land, integer, solver_id, gap, solve_limit, processes):
+        multipliers, self.probs = farmer_general.scenario_table(scenarios, len(crops.names))
+        num_s, num_k = multipliers.shape
+        self.total_land = total_land
+        self.integer = integer
+        self.shape = (num_s, num_k)
+        self.lower = np.full(num_s * num_k, -np.inf)
+        # sum_s p_s lam_sk = 0 for every crop k, on the row-major flattened lam
+        self.equality = np.kron(self.probs[None, :], np.eye(num_k))
+        specs = [(crops, [(*row, 1.0)], total_land, integer, solver_id, gap, solve_limit)
+                 for row in multipliers.tolist()]
+        self.pool = SubproblemPool(specs, processes)
+        self.crop_plans = LandRelaxation(crops, scenarios, total_land, integer, solver_id, gap, solve_limit, processes)
+
+    def dual(self, lam):
+        results = self.pool.call('solve', list(lam))
+        x = np.array([acres for acres, _, _ in results])
+        value = self.probs @ np.array([bound for _, bound, _ in results])
+        return value, self.probs[:, None] * x, x
+
+    def direction(self, gradient):
+        p = self.probs
+        return gradient - p[:, None] * (p @ gradient) / (p @ p)
+
+    def project(self, lam):
+        return self.direction(lam)
+
+    def plan(self, x):
+        crops = self.crop_plans
+        for acres in [self.probs @ x, *x]:
+            scaled = fit_to_land(acres, self.total_land, self.integer)
+            if any(value not in points for points, value in zip(crops.points, scaled.tolist())):
+                crops.evaluate(scaled)
+        return choose_acres(crops.points, self.total_land, self.integer, crops.solver_id)
+
+    def evaluate(self, x):
+        return self.crop_plans.evaluate(x)
+
+    def close(self):
+        self.pool.close()
+        self.crop_plans.close()
+
+
+RELAXATIONS = {'land': LandRelaxation, 'nonanticipativity': NonanticipativityRelaxation}
+
+
+def _single_crop(crops, k):
+    return farmer_general.CropTable([crops.names[k]], *(column[k:k + 1] for column in crops[1:]))
+
+
+def _record(points, acres, cost):
+    points[acres] = min(points.get(acres, np.inf), cost)
+
+
+def choose_acres(points, total_land, integer, solver_id='SCIP'):
+    """Acres per crop within the land at least total cost, each a convex combination of its priced points.
+
+    In continuous models a crop's cost is convex in its acres, so the
+    chords between priced points over-estimate it and the chosen acres
+    cost at most the value found here. Integer tons break the convexity;
+    the chords are then only an estimate, and the plan is priced exactly
+    afterwards either way.
+    """
+    solver = create_solver(solver_id if integer else 'auto', integer)
+    land = solver.Constraint(-solver.infinity(), total_land)
+    objective = solver.Objective()
+    objective.SetMinimization()
+    x = []
+    for crop_points in points:
+        acres = solver.IntVar(0, total_land, '') if integer else solver.NumVar(0, total_land, '')
+        land.SetCoefficient(acres, 1)
+        pick = solver.Constraint(1, 1)
+        mix = solver.Constraint(0, 0)
+        mix.SetCoefficient(acres, -1)
+        for value, cost in crop_points.items():
+            weight = solver.NumVar(0, 1, '')
+            pick.SetCoefficient(weight, 1)
+            mix.SetCoefficient(weight, value)
+            objective.SetCoefficient(weight, cost)
+        x.append(acres)
+    if solver.Solve() != pywraplp.Solver.OPTIMAL:
+        raise Exception("No mix of priced acres fits the land.")
+    x = np.array([acres.solution_value() for acres in x])
+    return np.round(x) + 0.0 if integer else x
+
+
+def fit_to_land(x, total_land, integer):
+    """Round acres (integer models) and scale them down to the land when they exceed it."""
+    x = np.maximum(np.asarray(x, dtype=float), 0.0)
+    if integer:
+        x = np.round(x)
+    if x.sum() > total_land:
+        x = x * total_land / x.sum()
+        x = np.floor(x) if integer else x
+    return x
+
+
+# ============================================
+# SOLVER
+# ============================================
+def solve_lagrangian(crops=None, scenarios=None, total_land=None, dualize='land', method='subgradient', integer=True,
+                     max_iterations=100, tolerance=1e-3, time_limit=None, processes=1, solver_id='SCIP', gap=1e-3,
+                     solve_limit=1.0, step=2.0, patience=3, radius=None, verbose=False):
+    """Bound the farmer model from below by Lagrangian relaxation and return the best plan found.
+
+    Defaults to the book crops, scenarios and land. Stops when the gap
+    between the best plan's cost and the best bound is at most `tolerance`
+    (relative), when the bundle model predicts no further increase, after
+    `max_iterations`, or after `time_limit` seconds. `step` is the
+    initial Polyak step factor, halved after `patience` iterations without
+    a better bound; `radius` is the bundle method's initial box half-width
+    in $ per acre (default: the dearest planting cost). `gap` and
+    `solve_limit` (seconds) stop each integer subproblem solve early; the
+    bound absorbs the difference through the subproblem's best bound.
+    Without them SCIP can spend minutes closing the last fraction of a
+    percent on a single subproblem. In the result, objective and profit
+    are the plan's, bound is the profit no plan can beat, and history
+    holds (iteration, bound, best cost) per iteration.
+    """
+    if dualize not in RELAXATIONS:
+        raise ValueError(f"dualize must be one of {DUALIZE}, not {dualize!r}")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, not {method!r}")
+    crops = farmer_general.crop_table(farmer_general.book_crops() if crops is None else crops)
+    scenarios = farmer_model.SCENARIOS if scenarios is None else scenarios
+    total_land = farmer_model.FARMER_DATA['total_land'] if total_land is None else total_land
+    start = time.perf_counter()
+    relaxation = RELAXATIONS[dualize](crops, scenarios, total_land, integer, solver_id, gap, solve_limit, processes)
+    state = {'bound': -np.inf, 'lam': None, 'cost': np.inf, 'x': None, 'priced': {}, 'history': []}
+
+    def evaluate(lam, iteration):
+        value, gradient, x = relaxation.dual(lam)
+        if value > state['bound']:
+            state['bound'], state['lam'] = value, lam
+        plan = relaxation.plan(x)
+        key = tuple(plan.tolist())
+        if key not in state['priced']:
+            state['priced'][key] = cost = relaxation.evaluate(plan)
+            if cost < state['cost']:
+                state['cost'], state['x'] = cost, plan
+        state['history'].append((iteration, value, state['cost']))
+        if verbose:
+            print(f"iter {iteration:4d}  L = {value:14.4f}  best bound = {state['bound']:14.4f}  "
+                  f"best plan = {state['cost']:14.4f}")
+        return value, gradient
+
+    def done(iteration):
+        return _gap(state['cost'], state['bound']) <= tolerance or iteration >= max_iterations or \
+            (time_limit is not None and time.perf_counter() - start > time_limit)
+
+    try:
+        lam = np.zeros(relaxation.shape)
+        if method == 'subgradient':
+            iteration = _subgradient(relaxation, lam, evaluate, done, state, step, patience)
+        else:
+            scale = crops.plant_cost.max() if radius is None else radius
+            iteration = _bundle(relaxation, lam, evaluate, done, tolerance, scale)
+    finally:
+        relaxation.close()
+    cost, bound = state['cost'], state['bound']
+    return LagrangianResult(state['x'], cost, -cost, -bound, _gap(cost, bound), iteration, state['lam'],
+                            time.perf_counter() - start, state['history'])
+
+
+def _gap(cost, bound):
+    return max(cost - bound, 0.0) / max(abs(cost), 1.0) if np.isfinite(cost) else np.inf
+
+
+def _subgradient(relaxation, lam, evaluate, done, state, step, patience):
+    iteration, stalled, best = 0, 0, -np.inf
+    while True:
+        value, gradient = evaluate(lam, iteration)
+        if value > best + 1e-9 * max(1.0, abs(best)):
+            best, stalled = value, 0
+        else:
+            stalled += 1
+            if stalled >= patience:
+                step, stalled = step / 2, 0
+        iteration += 1
+        direction = relaxation.direction(gradient)
+        norm = float(np.sum(direction ** 2))
+        if done(iteration) or norm == 0:
+            return iteration
+        target = state['cost'] if np.isfinite(state['cost']) else value + max(1.0, abs(value)) * 0.1
+        moved = relaxation.project(lam + step * max(target - value, 0.0) / norm * direction)
+        if np.array_equal(moved, lam):
+            return iteration  # the step is projected away: lam is optimal over the domain
+        lam = moved
+
+
+def _bundle(relaxation, lam, evaluate, done, tolerance, radius):
+    center = lam.ravel()
+    center_value, gradient = evaluate(lam, 0)
+    cuts = [(center_value, gradient.ravel(), center)]
+    iteration = 1
+    while not done(iteration):
+        candidate, predicted = _bundle_master(relaxation, cuts, center, radius)
+        if predicted - center_value <= tolerance * max(1.0, abs(center_value)):
+            break
+        value, gradient = evaluate(candidate.reshape(relaxation.shape), iteration)
+        iteration += 1
+        cuts.append((value, gradient.ravel(), candidate))
+        gain = (value - center_value) / (predicted - center_value)
+        if gain >= 0.1:
+            center, center_value = candidate, value
+            if gain >= 0.5:
+                radius *= 2
+        elif gain < 0:
+            radius /= 2
+    return iteration
+
+
+def _bundle_master(relaxation, cuts, center, radius):
+    """Maximize the cutting-plane model of L in the box |lam - center| <= radius; return (lam, model value)."""
+    d = len(center)
+    # columns: lam (d), theta; rows: theta - g_i lam <= L_i - g_i lam_i, then the equalities
+    rows = [np.concatenate([-g, [1.0]]) for _, g, _ in cuts]
+    row_ub = [value - g @ point for value, g, point in cuts]
+    row_lb = [-np.inf] * len(cuts)
+    if relaxation.equality is not None:
+        rows += [np.concatenate([e, [0.0]]) for e in relaxation.equality]
+        row_lb += [0.0] * len(relaxation.equality)
+        row_ub += [0.0] * len(relaxation.equality)
+    c = np.zeros(d + 1)
+    c[-1] = 1
+    col_lb = np.concatenate([np.maximum(center - radius, relaxation.lower), [-np.inf]])
+    col_ub = np.concatenate([np.maximum(center + radius, relaxation.lower), [np.inf]])
+    form = MatrixForm(c, np.array(rows), np.array(row_lb), np.array(row_ub), col_lb, col_ub, False, True, None)
+    solver = load_matrix_form(form, 'GLOP')
+    if solver.Solve() != pywraplp.Solver.OPTIMAL:
+        raise Exception("Bundle master LP did not solve to optimality.")
+    values = np.array([var.solution_value() for var in solver.variables()])
+    return values[:d], values[d]
+
+
+def print_lagrangian(name, result):
+    print(name)
+    print(f"  plan x                      = {result.x.tolist()}")
+    print(f"  expected profit             = $ {result.profit:.2f}")
+    print(f"  Lagrangian bound            = $ {result.bound:.2f}")
+    print(f"  gap                         = {100 * result.gap:.4f}%")
+    print(f"  iterations                  = {result.iterations} ({result.seconds:.2f} s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lagrangian relaxation bounds and plans for the farmer model')
+    parser.add_argument('--dualize', choices=DUALIZE, default='land')
+    parser.add_argument('--method', choices=METHODS, default='subgradient')
+    parser.add_argument('--scenarios', type=int, default=None, help='sampled scenario count (default: book data)')
+    parser.add_argument('--crops', type=int, default=None, help='sampled crop count (default: book crops)')
+    parser.add_argument('--continuous', action='store_true', help='relax integrality of acres and tons')
+    parser.add_argument('--max-iterations', type=int, default=100)
+    parser.add_argument('--tolerance', type=float, default=1e-3)
+    parser.add_argument('--gap', type=float, default=1e-3, help='relative MIP gap of each subproblem')
+    parser.add_argument('--solve-limit', type=float, default=1.0, help='seconds per subproblem solve')
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    crops = None if args.crops is None else farmer_general.sample_crops(args.crops)
+    num_crops = 3 if args.crops is None else args.crops
+    scenarios = None
+    if args.scenarios is not None:
+        scenarios = farmer_general.sample_scenarios(args.scenarios, num_crops)
+    elif args.crops is not None:
+        scenarios = farmer_general.sample_scenarios(3, num_crops)
+    print_lagrangian(f"farmer, {args.dualize} dualized, {args.method} steps",
+                     solve_lagrangian(crops, scenarios, dualize=args.dualize, method=args.method,
+                                      integer=not args.continuous, max_iterations=args.max_iterations,
+                                      tolerance=args.tolerance, time_limit=args.time_limit,
+                                      processes=args.processes, gap=args.gap,
+                                      solve_limit=args.solve_limit, verbose=args.verbose))
@@ -0,0 +1,103 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+from ortools.linear_solver import linear_solver_pb2
+from ortools.linear_solver.python import model_builder
+
+from backends import create_solver
+
+# ============================================
+# MATRIX FORM
+# ============================================
+# An LP/MIP in array form:
+#     min/max  c @ x
+#     s.t.     row_lb <= A @ x <= row_ub
+#              col_lb <= x <= col_ub,  x[integer] integral
+MatrixForm = namedtuple(
+    'MatrixForm',
+    ['c', 'A', 'row_lb', 'row_ub', 'col_lb', 'col_ub', 'integer', 'maximize', 'names'],
+)
+
+# A two-stage stochastic program split into first stage and recourse:
+#     min  c @ x + sum_s probs[s] * Q_s(x)
+#     s.t. row_lb <= A @ x <= row_ub,  col_lb <= x <= col_ub
+#     Q_s(x) = min q[s] @ y
+#              s.t. h_lb[s] <= T[s] @ x + W @ y <= h_ub[s],  y_lb <= y <= y_ub
+# Both models minimize; profit = profit_sign * objective.
+TwoStageForm = namedtuple(
+    'TwoStageForm',
+    ['c', 'A', 'row_lb', 'row_ub', 'col_lb', 'col_ub', 'integer',
+     'q', 'W', 'T', 'h_lb', 'h_ub', 'y_lb', 'y_ub', 'probs', 'profit_sign'],
+)
+
+
+def coo_matrix(rows, cols, vals, shape):
+    """Assemble a CSR matrix from COO triplet arrays (duplicates are summed)."""
+    return sp.csr_matrix(
+        (np.asarray(vals, dtype=float), (np.asarray(rows), np.asarray(cols))),
+        shape=shape,
+    )
+
+
+def load_matrix_form(form, solver_id='auto'):
+    """Load a MatrixForm into a new pywraplp solver in one bulk call.
+
+    The arrays are handed to the C++ model builder as a whole and the
+    resulting proto is loaded into `pywraplp`, so no Python expression or
+    per-coefficient call is made for the constraint matrix.
+    """
+    model = model_builder.Model()
+    helper = model.helper
+    n = len(form.c)
+    helper.fill_model_from_sparse_data(
+        np.asarray(form.col_lb, dtype=float),
+        np.asarray(form.col_ub, dtype=float),
+        np.asarray(form.c, dtype=float),
+        np.asarray(form.row_lb, dtype=float),
+        np.asarray(form.row_ub, dtype=float),
+        sp.csr_matrix(form.A, dtype=float),
+    )
+    helper.set_maximize(bool(form.maximize))
+
+    integer = np.broadcast_to(np.asarray(form.integer, dtype=bool), (n,))
+    for i in np.flatnonzero(integer).tolist():
+        helper.set_var_integrality(i, True)
+    if form.names is not None:
+        for i, name in enumerate(form.names):
+            helper.set_var_name(i, name)
+
+    solver = create_solver(solver_id, integer.any())
+    # plain LoadModelFromProto replaces every name with auto_v_<index>
+    load = solver.LoadModelFromProto if form.names is None else solver.LoadModelFromProtoKeepNames
+    error = load(model.export_to_proto())
+    if error:
+        raise Exception(f"Failed to load model: {error}")
+    return solver
+
+
+def solver_matrix_form(solver, names=True):
+    """Read a built pywraplp model back into a MatrixForm (the inverse of load_matrix_form)."""
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+    variables, constraints = proto.variable, proto.constraint
+    lengths = [len(ct.var_index) for ct in constraints]
+    indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    indices = np.fromiter((j for ct in constraints for j in ct.var_index), dtype=np.int32, count=indptr[-1])
+    data = np.fromiter((a for ct in constraints for a in ct.coefficient), dtype=float, count=indptr[-1])
+    A = sp.csr_matrix((data, indices, indptr), shape=(len(constraints), len(variables)))
+    A.sum_duplicates()  # sorts the column indices of each row
+    return MatrixForm(
+        c=np.array([var.objective_coefficient for var in variables]),
+        A=A,
+        row_lb=np.array([ct.lower_bound for ct in constraints]),
+        row_ub=np.array([ct.upper_bound for ct in constraints]),
+        col_lb=np.array([var.lower_bound for var in variables]),
+        col_ub=np.array([var.upper_bound for var in variables]),
+        integer=np.array([var.is_integer for var in variables], dtype=bool),
+        maximize=proto.maximize,
+        names=[var.name for var in variables] if names else None,
+    )
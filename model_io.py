@@ -0,0 +1,368 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from ortools.linear_solver import pywraplp
+from ortools.linear_solver.python import model_builder
+
+from backends import create_solver
+import component_model
+import farmer_model
+from matrix_form import MatrixForm, load_matrix_form, solver_matrix_form
+
+# ============================================
+# TEXT FORMATS
+# ============================================
+# MPS (free format) and LP files for other solvers and tools. They are
+# written here from the model's arrays rather than by pywraplp's exporter,
+# which rounds coefficients to six significant digits (the farmer
+# objective comes back as -108390.0225); every number is written with
+# repr(), which round-trips exactly. Column names are kept with
+# non-word characters replaced by '_' (x<j> when that would clash).
+# A text file holds the model only: read back, it is a plain pywraplp
+# solver. Use the binary format below to get a FarmerModel /
+# ComponentModel back.
+#
+# The LP files are CPLEX LP format, which HiGHS, SCIP, Gurobi and CPLEX
+# read. OR-Tools' own LP reader takes the lp_solve dialect instead, so
+# import_text reads .lp files with lp_form, which parses only what
+# lp_lines writes (every column gets a Bounds line, in column order).
+TEXT_FORMATS = ('.mps', '.lp')
+
+
+def export_text(model, path):
+    """Write a model (or a pywraplp solver) to an .mps or .lp file, by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in TEXT_FORMATS:
+        raise ValueError(f"Unknown model file type {extension!r}; expected one of {TEXT_FORMATS}")
+    form = solver_matrix_form(_solver(model))
+    lines = mps_lines(form) if extension == '.mps' else lp_lines(form)
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def import_text(path, solver_id='auto'):
+    """Read an .mps or .lp file (as written by export_text) into a new pywraplp solver on `solver_id`."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in TEXT_FORMATS:
+        raise ValueError(f"Unknown model file type {extension!r}; expected one of {TEXT_FORMATS}")
+    if extension == '.lp':
+        with open(path) as f:
+            form = lp_form(f.read().splitlines())
+        return load_matrix_form(form, solver_id)
+    model = model_builder.Model()
+    if not model.import_from_mps_file(path):
+        raise Exception(f"Could not read {path}")
+    proto = model.export_to_proto()
+    solver = create_solver(solver_id, any(var.is_integer for var in proto.variable))
+    error = solver.LoadModelFromProto(proto)
+    if error:
+        raise Exception(f"Failed to load {path}: {error}")
+    return solver
+
+
+def column_names(form):
+    if form.names is not None:
+        names = [re.sub(r'\W', '_', name) for name in form.names]
+        if len(set(names)) == len(names) and all(name and not name[0].isdigit() for name in names):
+            return names
+    return [f'x{j}' for j in range(len(form.c))]
+
+
+def mps_lines(form):
+    """Free-format MPS for a MatrixForm, with explicit bounds on every integer column."""
+    names = column_names(form)
+    rows = [f'R{i}' for i in range(len(form.row_lb))]
+    row_lb, row_ub = np.asarray(form.row_lb), np.asarray(form.row_ub)
+    lines = ['NAME model']
+    if form.maximize:
+        lines += ['OBJSENSE', '    MAX']
+    lines += ['ROWS', ' N  COST']
+    for row, lb, ub in zip(rows, row_lb.tolist(), row_ub.tolist()):
+        kind = 'E' if lb == ub else 'L' if np.isfinite(ub) else 'G' if np.isfinite(lb) else 'N'
+        lines.append(f' {kind}  {row}')
+
+    lines.append('COLUMNS')
+    A = sp.csc_matrix(form.A)
+    integer = np.broadcast_to(np.asarray(form.integer, dtype=bool), (len(names),))
+    in_marker = False
+    for j, (name, cost) in enumerate(zip(names, np.asarray(form.c).tolist())):
+        if integer[j] != in_marker:
+            lines.append(f"    MARKER  'MARKER'  '{'INTORG' if integer[j] else 'INTEND'}'")
+            in_marker = bool(integer[j])
+        if cost:
+            lines.append(f'    {name}  COST  {cost!r}')
+        start, end = A.indptr[j], A.indptr[j + 1]
+        for i, value in zip(A.indices[start:end].tolist(), A.data[start:end].tolist()):
+            lines.append(f'    {name}  {rows[i]}  {value!r}')
+    if in_marker:
+        lines.append("    MARKER  'MARKER'  'INTEND'")
+
+    lines.append('RHS')
+    ranges = []
+    for row, lb, ub in zip(rows, row_lb.tolist(), row_ub.tolist()):
+        rhs = ub if np.isfinite(ub) else lb if np.isfinite(lb) else 0.0
+        if rhs:
+            lines.append(f'    RHS  {row}  {rhs!r}')
+        if np.isfinite(lb) and np.isfinite(ub) and lb != ub:
+            ranges.append(f'    RNG  {row}  {ub - lb!r}')
+    if ranges:
+        lines += ['RANGES', *ranges]
+
+    lines.append('BOUNDS')
+    for j, (name, lb, ub) in enumerate(zip(names, np.asarray(form.col_lb).tolist(),
+                                          np.asarray(form.col_ub).tolist())):
+        if lb == ub:
+            lines.append(f' FX BND  {name}  {lb!r}')
+            continue
+        if not np.isfinite(lb) and not np.isfinite(ub):
+            lines.append(f' FR BND  {name}')
+            continue
+        if not np.isfinite(lb):
+            lines.append(f' MI BND  {name}')
+        elif lb != 0 or integer[j]:
+            lines.append(f' LO BND  {name}  {lb!r}')
+        if np.isfinite(ub):
+            lines.append(f' UP BND  {name}  {ub!r}')
+        elif integer[j]:
+            lines.append(f' PL BND  {name}')  # integer columns may otherwise default to binary
+    lines.append('ENDATA')
+    return lines
+
+
+def lp_lines(form):
+    """CPLEX LP format for a MatrixForm; ranged rows become a pair of rows."""
+    names = column_names(form)
+
+    def expression(columns, values):
+        return ' '.join(f"{'-' if value < 0 else '+'} {abs(value)!r} {names[j]}"
+                        for j, value in zip(columns, values)) or '0 x0'
+
+    costs = np.asarray(form.c)
+    nonzero = np.flatnonzero(costs)
+    lines = ['Maximize' if form.maximize else 'Minimize',
+             f' obj: {expression(nonzero.tolist(), [float(v) for v in costs[nonzero]])}', 'Subject To']
+    A = sp.csr_matrix(form.A)
+    for i, (lb, ub) in enumerate(zip(np.asarray(form.row_lb).tolist(), np.asarray(form.row_ub).tolist())):
+        start, end = A.indptr[i], A.indptr[i + 1]
+        terms = expression(A.indices[start:end].tolist(), A.data[start:end].tolist())
+        if lb == ub:
+            lines.append(f' R{i}: {terms} = {lb!r}')
+            continue
+        if np.isfinite(ub):
+            lines.append(f' R{i}{"_ub" if np.isfinite(lb) else ""}: {terms} <= {ub!r}')
+        if np.isfinite(lb):
+            lines.append(f' R{i}{"_lb" if np.isfinite(ub) else ""}: {terms} >= {lb!r}')
+
+    lines.append('Bounds')
+    for name, lb, ub in zip(names, np.asarray(form.col_lb).tolist(), np.asarray(form.col_ub).tolist()):
+        if lb == ub:
+            lines.append(f' {name} = {lb!r}')
+        elif not np.isfinite(lb) and not np.isfinite(ub):
+            lines.append(f' {name} free')
+        elif not np.isfinite(lb):
+            lines.append(f' -inf <= {name} <= {ub!r}')
+        elif np.isfinite(ub):
+            lines.append(f' {lb!r} <= {name} <= {ub!r}')
+        else:
+            lines.append(f' {name} >= {lb!r}')
+    integer = np.flatnonzero(np.broadcast_to(np.asarray(form.integer, dtype=bool), (len(names),)))
+    if len(integer):
+        lines += ['Generals', *(f' {names[j]}' for j in integer.tolist())]
+    lines.append('End')
+    return lines
+
+
+def lp_form(lines):
+    """Parse LP lines written by lp_lines back into a MatrixForm."""
+    sections = {'minimize': 'objective', 'maximize': 'objective', 'subject to': 'rows', 'bounds': 'bounds',
+                'generals': 'generals', 'end': 'end'}
+    maximize, section = False, None
+    objective, constraints, bounds, generals = [], [], [], []
+    for line in lines:
+        key = line.strip().lower()
+        if key in sections:
+            maximize = maximize or key == 'maximize'
+            section = sections[key]
+        elif line.strip():
+            {'objective': objective, 'rows': constraints, 'bounds': bounds, 'generals': generals}[section].append(line)
+
+    names, col_lb, col_ub = [], [], []
+    for line in bounds:
+        tokens = line.split()
+        if tokens[-1] == 'free':
+            name, lb, ub = tokens[0], -np.inf, np.inf
+        elif tokens[1] == '=':
+            name, lb, ub = tokens[0], float(tokens[2]), float(tokens[2])
+        elif tokens[1] == '>=':
+            name, lb, ub = tokens[0], float(tokens[2]), np.inf
+        else:  # lb <= name <= ub
+            name, lb, ub = tokens[2], float(tokens[0]), float(tokens[4])
+        names.append(name)
+        col_lb.append(lb)
+        col_ub.append(ub)
+    index = {name: j for j, name in enumerate(names)}
+
+    def terms(text):
+        tokens = text.split()
+        if tokens[0] not in ('+', '-'):
+            tokens.insert(0, '+')
+        for sign, value, name in zip(tokens[0::3], tokens[1::3], tokens[2::3]):
+            if float(value):
+                yield index[name], float(value) if sign == '+' else -float(value)
+
+    c = np.zeros(len(names))
+    for j, value in terms(objective[0].split(':', 1)[1]):
+        c[j] = value
+    row_bounds, entries = {}, {}
+    for line in constraints:
+        label, body = line.split(':', 1)
+        i = int(re.match(r'\s*R(\d+)', label).group(1))
+        body, sense, rhs = re.match(r'(.*?)\s*(<=|>=|=)\s*(\S+)$', body).groups()
+        lb, ub = row_bounds.get(i, (-np.inf, np.inf))
+        if sense in ('=', '<='):
+            ub = float(rhs)
+        if sense in ('=', '>='):
+            lb = float(rhs)
+        row_bounds[i] = (lb, ub)
+        entries[i] = list(terms(body))
+    row_lb = np.array([row_bounds[i][0] for i in range(len(row_bounds))])
+    row_ub = np.array([row_bounds[i][1] for i in range(len(row_bounds))])
+    coo = [(i, j, value) for i in range(len(entries)) for j, value in entries[i]]
+    rows, cols, vals = (np.array(column) for column in zip(*coo)) if coo else ([], [], [])
+    A = sp.csr_matrix((vals, (rows, cols)), shape=(len(row_bounds), len(names)))
+    integer = np.zeros(len(names), dtype=bool)
+    integer[[index[line.strip()] for line in generals]] = True
+    return MatrixForm(c, A, row_lb, row_ub, np.array(col_lb), np.array(col_ub), integer, maximize, names)
+
+
+# ============================================
+# BINARY FORMAT
+# ============================================
+# A model directory holds one .npy file per array, so every array can be
+# memory-mapped and handed to the C++ model builder without a parse step:
+#
+#   c, row_lb, row_ub, col_lb, col_ub, integer   per column / row
+#   A_data, A_indices, A_indptr                  the CSR constraint matrix
+#   names                                        column names (optional)
+#   table, probs                                 scenario table (farmer / component models)
+#   model.json                                   format, kind, shape, maximize, data
+#
+# The arrays are read back from the live solver, so a model saved after
+# update() or set_scenario() reloads in its updated state. Reloading wraps
+# the solver with the model class's handles (wrap_solver), skipping the
+# Python construction loops.
+FORMAT = 'stochastic-model/1'
+KINDS = {
+    'farmer': (farmer_model, farmer_model.FarmerModel, 'multipliers'),
+    'component': (component_model, component_model.ComponentModel, 'prices'),
+}
+ARRAYS = ('c', 'row_lb', 'row_ub', 'col_lb', 'col_ub', 'integer')
+
+
+def save_model(model, path, names=True):
+    """Write a FarmerModel, ComponentModel or bare pywraplp solver to the directory `path`."""
+    form = solver_matrix_form(_solver(model), names)
+    os.makedirs(path, exist_ok=True)
+    arrays = {key: getattr(form, key) for key in ARRAYS}
+    arrays.update(A_data=form.A.data, A_indices=form.A.indices, A_indptr=form.A.indptr)
+    if names:
+        arrays['names'] = np.array(form.names)
+    meta = {'format': FORMAT, 'kind': None, 'shape': list(form.A.shape), 'maximize': bool(form.maximize),
+            'names': names}
+    for kind, (_, model_class, table) in KINDS.items():
+        if isinstance(model, model_class):
+            arrays.update(table=getattr(model, table), probs=model.probs)
+            meta.update(kind=kind, data={key: float(value) for key, value in model.data.items()})
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f'{key}.npy'), np.asarray(array))
+    with open(os.path.join(path, 'model.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_form(path, mmap=True):
+    """Read a model directory as (MatrixForm, metadata); arrays are memory-mapped by default.
+
+    The mapping is copy-on-write, so the files are never modified.
+    """
+    with open(os.path.join(path, 'model.json')) as f:
+        meta = json.load(f)
+    if meta.get('format') != FORMAT:
+        raise Exception(f"{path} is not a {FORMAT} model directory")
+    mode = 'c' if mmap else None  # copy-on-write: the model builder wants writeable arrays
+    arrays = {key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode=mode)
+              for key in (*ARRAYS, 'A_data', 'A_indices', 'A_indptr')}
+    A = sp.csr_matrix((arrays.pop('A_data'), arrays.pop('A_indices'), arrays.pop('A_indptr')),
+                      shape=tuple(meta['shape']), copy=False)
+    names = np.load(os.path.join(path, 'names.npy')).tolist() if meta['names'] else None
+    return MatrixForm(A=A, maximize=meta['maximize'], names=names, **arrays), meta
+
+
+def load_model(path, solver_id='auto', mmap=True, names=True, wrap=True):
+    """Reload a saved model on `solver_id`: a FarmerModel / ComponentModel, or a solver for other models.
+
+    names=False skips the column names, which otherwise take a call per
+    column to restore. wrap=False returns the bare solver even for farmer
+    and component models, skipping the per-variable handles the model
+    classes need (most of the reload time at 10,000 scenarios).
+    """
+    form, meta = load_form(path, mmap)
+    if not names:
+        form = form._replace(names=None)
+    solver = load_matrix_form(form, solver_id)
+    if meta['kind'] is None or not wrap:
+        return solver
+    module, _, _ = KINDS[meta['kind']]
+    table = np.array(np.load(os.path.join(path, 'table.npy')))
+    probs = np.array(np.load(os.path.join(path, 'probs.npy')))
+    return module.wrap_solver(solver, table, probs, meta['data'])
+
+
+def _solver(model):
+    return model if isinstance(model, pywraplp.Solver) else model.solver
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export farmer / component models and solve saved ones')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='build a model and write it as .mps, .lp or a model directory')
+    export.add_argument('model', choices=sorted(KINDS))
+    export.add_argument('output', help='.mps or .lp file, or a directory for the binary format')
+    export.add_argument('--scenarios', type=int, default=0, help='sampled scenarios (0: the book scenarios)')
+    export.add_argument('--method', default=None, help='build method (farmer: loop/matrix, component: '
+                                                       'expression/matrix)')
+    replay = commands.add_parser('solve', help='load a saved model and solve it')
+    replay.add_argument('path')
+    replay.add_argument('--solver-id', default='auto')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        module = KINDS[args.model][0]
+        scenarios = module.sample_scenarios(args.scenarios) if args.scenarios else module.SCENARIOS
+        options = {} if args.method is None else {'method': args.method}
+        start = time.perf_counter()
+        model = module.build_two_stage(scenarios, **options)
+        built = time.perf_counter() - start
+        if os.path.splitext(args.output)[1].lower() in TEXT_FORMATS:
+            export_text(model, args.output)
+        else:
+            save_model(model, args.output)
+        print(f"built in {built:.3f} s, written to {args.output} in {time.perf_counter() - start - built:.3f} s")
+    else:
+        start = time.perf_counter()
+        if os.path.splitext(args.path)[1].lower() in TEXT_FORMATS:
+            solver = import_text(args.path, args.solver_id)
+        else:
+            loaded = load_model(args.path, args.solver_id)
+            solver = _solver(loaded)
+        loaded_seconds = time.perf_counter() - start
+        status = solver.Solve()
+        print(f"loaded in {loaded_seconds:.3f} s, solved in {time.perf_counter() - start - loaded_seconds:.3f} s: "
+              f"status {status}, objective {solver.Objective().Value()}")
@@ -0,0 +1,43 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+from ortools.linear_solver import linear_solver_pb2
+
+from backends import solver_parameters
+
+
+# ============================================
+# WARM RE-SOLVE
+# ============================================
+# The model classes keep their pywraplp solver alive between solves, so a
+# parameter change only touches the affected coefficients and bounds. For
+# LPs, GLOP keeps its last simplex basis across incremental solves; for MIPs
+# the previous solution is passed to the solver as a hint (dropped if
+# variables have been added since). CBC ignores the hint, so build a MIP
+# that is re-solved warm with solver_id='auto-warm' (SCIP).
+def warm_parameters(gap=None):
+    return solver_parameters(gap, incremental=True)
+
+
+def solve(solver, warm=False, hint=None, gap=None):
+    """Solve `solver`; with warm=True reuse the basis (LP) or `hint` (MIP).
+
+    `gap` is an optional relative MIP gap for this solve.
+    """
+    if not warm:
+        return solver.Solve() if gap is None else solver.Solve(solver_parameters(gap))
+    if hint is not None and solver.IsMip() and len(hint) == solver.NumVariables():
+        # SCIP rejects a hint while it still holds the solved, unchanged
+        # model; re-setting the objective offset sends it back to the
+        # problem stage first.
+        objective = solver.Objective()
+        objective.SetOffset(objective.offset())
+        variables = solver.variables()
+        solver.SetHint(variables, hint)
+    return solver.Solve(warm_parameters(gap))
+
+
+def solution_values(solver):
+    response = linear_solver_pb2.MPSolutionResponse()
+    solver.FillSolutionResponseProto(response)
+    return list(response.variable_value)
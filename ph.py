@@ -0,0 +1,309 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import importlib
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+import component_model
+import farmer_model
+
+# ============================================
+# PROGRESSIVE HEDGING
+# ============================================
+# Each scenario keeps its own persistent single-scenario model (integer
+# acres and tons for the farmer) and solves, in minimization form,
+#
+#   min  c x + q_s y + w_s x + rho/2 ||x - xbar||^2
+#
+# after which xbar = sum_s p_s x_s and w_s += rho (x_s - xbar). The MIP
+# engines take no quadratic objective, so each rho/2 (x_j - xbar_j)^2 is an
+# epigraph variable t_j above the chords of the square between breakpoints
+# centre + {0, +-1, ..., +-UNIT_BREAKPOINTS, then doubling}, the centre
+# being xbar_j rounded for integer x_j and xbar_j itself otherwise. The
+# term is exact at the breakpoints, so at every integer within
+# UNIT_BREAKPOINTS of the centre for integer x; between the doubling
+# breakpoints the chords over-estimate it, and beyond the outermost ones
+# it grows linearly. Only chord coefficients and bounds change between
+# iterations.
+UNIT_BREAKPOINTS = 4
+# With a fixed rho, integer runs can cycle between scenario solutions that
+# never agree. Growing rho 10% per iteration makes the farmer agree in 40
+# iterations on the book data and in under 80 on 10 or 30 sampled
+# scenarios; at 2% the sampled runs still disagree after 200 iterations.
+INTEGER_RHO_GROWTH = 1.1
+PHResult = namedtuple(
+    'PHResult',
+    ['x', 'objective', 'profit', 'bound', 'converged', 'iterations', 'convergence', 'rho', 'history'],
+)
+
+
+def proximal_offsets(breakpoints):
+    """Breakpoint offsets from the proximal centre: `breakpoints` per side, unit-spaced first, then doubling."""
+    unit = min(UNIT_BREAKPOINTS, breakpoints)
+    side = np.concatenate([np.arange(1.0, unit + 1), unit * 2.0 ** np.arange(1, breakpoints - unit + 1)])
+    return np.concatenate([-side[::-1], [0.0], side])
+
+
+class ScenarioSubproblem:
+    """One scenario of a model module, with PH weight and proximal terms on x."""
+
+    def __init__(self, module, row, data=None, breakpoints=10):
+        self.model = module.build_two_stage([(*row, 1.0)], data)
+        solver = self.model.solver
+        inf = solver.infinity()
+        self.objective = solver.Objective()
+        self.sense = 1 if self.objective.minimization() else -1
+        self.x = self.model.x
+        self.cost = self.sense * np.array([self.objective.GetCoefficient(var) for var in self.x])
+        self.integer = [var.integer() for var in self.x]
+        self.offsets = proximal_offsets(breakpoints)
+        self.t = [solver.NumVar(0, inf, f'Proximal term {j}') for j in range(len(self.x))]
+        self.chords = []
+        for t in self.t:
+            rows = [solver.Constraint(-inf, inf) for _ in range(len(self.offsets) - 1)]
+            for ct in rows:
+                ct.SetCoefficient(t, 1)
+            self.chords.append(rows)
+        self.w = np.zeros(len(self.x))
+        self.rho = np.zeros(len(self.x))
+
+    def set_penalty(self, w, xbar, rho):
+        """Set the weights w, the proximal centre xbar and rho (per x or scalar)."""
+        inf = self.model.solver.infinity()
+        self.w = np.asarray(w, dtype=float)
+        self.rho = np.broadcast_to(np.asarray(rho, dtype=float), self.w.shape)
+        for j, var in enumerate(self.x):
+            self.objective.SetCoefficient(var, self.sense * (self.cost[j] + self.w[j]))
+            self.objective.SetCoefficient(self.t[j], self.sense * self.rho[j] / 2)
+            centre = round(xbar[j]) if self.integer[j] else xbar[j]
+            points = np.unique(np.clip(centre + self.offsets, var.lb(), var.ub()))
+            values = (points - xbar[j]) ** 2
+            slopes = np.diff(values) / np.diff(points)
+            intercepts = values[:-1] - slopes * points[:-1]
+            for k, ct in enumerate(self.chords[j]):
+                # t_j >= slope * x_j + intercept; unused rows are switched off
+                if k < len(slopes):
+                    ct.SetCoefficient(var, -slopes[k])
+                    ct.SetLb(intercepts[k])
+                else:
+                    ct.SetCoefficient(var, 0)
+                    ct.SetLb(-inf)
+
+    def solve(self):
+        """Return (x_s, scenario cost c x + q_s y without the PH terms)."""
+        status = self.model.solve(warm=True)
+        if status != pywraplp.Solver.OPTIMAL:
+            raise Exception(f"PH subproblem ended with status code: {status}")
+        x = np.array([var.solution_value() for var in self.x])
+        t = np.array([var.solution_value() for var in self.t])
+        value = self.sense * self.objective.Value() - self.w @ x - self.rho @ t / 2
+        return x, value
+
+    def evaluate(self, x):
+        """Scenario cost with the first stage fixed at x and no PH terms."""
+        bounds = [(var.lb(), var.ub()) for var in self.x]
+        w, rho = self.w, self.rho
+        self.set_penalty(np.zeros(len(self.x)), x, 0.0)
+        for var, value in zip(self.x, x):
+            var.SetBounds(value, value)
+        try:
+            return self.solve()[1]
+        finally:
+            for var, (lb, ub) in zip(self.x, bounds):
+                var.SetBounds(lb, ub)
+            self.w, self.rho = w, rho
+
+
+# ============================================
+# PARALLEL SUBPROBLEMS
+# ============================================
+# PH re-solves the same scenario models every iteration, so each worker
+# process owns a fixed, contiguous block of scenarios for the whole run and
+# keeps their models (and MIP hints) alive between iterations.
+def _worker_main(conn, module_name, rows, data, breakpoints):
+    module = importlib.import_module(module_name)
+    subproblems = [ScenarioSubproblem(module, row, data, breakpoints) for row in rows]
+    while (message := conn.recv()) is not None:
+        command, *args = message
+        try:
+            conn.send(_run(subproblems, command, *args))
+        except Exception as error:
+            conn.send(error)
+    conn.close()
+
+
+def _run(subproblems, command, *args):
+    if command == 'solve':
+        w, xbar, rho = args
+        results = []
+        for sub, w_s in zip(subproblems, w):
+            sub.set_penalty(w_s, xbar, rho)
+            results.append(sub.solve())
+        return np.array([x for x, _ in results]), np.array([value for _, value in results])
+    x, = args
+    return np.array([sub.evaluate(x) for sub in subproblems])
+
+
+class SubproblemPool:
+    """All scenario subproblems of a scenario table, in-process or on workers.
+
+    processes=1 keeps every subproblem in the calling process; otherwise the
+    scenarios are split into one block per worker process.
+    """
+
+    def __init__(self, module, scenarios, data=None, processes=1, breakpoints=10, start_method=None):
+        values, self.probs = module.scenario_table(scenarios)
+        self.processes = min(processes or os.cpu_count() or 1, len(values))
+        self.local = None
+        self.workers = []
+        if self.processes == 1:
+            self.local = [ScenarioSubproblem(module, row, data, breakpoints) for row in values.tolist()]
+            return
+        context = multiprocessing.get_context(start_method)
+        bounds = np.linspace(0, len(values), self.processes + 1).astype(int)
+        for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker_main,
+                                      args=(child, module.__name__, values[a:b].tolist(), data, breakpoints),
+                                      daemon=True)
+            process.start()
+            child.close()
+            self.workers.append((parent, process, a, b))
+
+    def solve(self, w, xbar, rho):
+        """Solve every scenario with its weights w[s]; return x (S, n) and costs (S,)."""
+        if self.local is not None:
+            return _run(self.local, 'solve', w, xbar, rho)
+        parts = self._call(lambda a, b: ('solve', w[a:b], xbar, rho))
+        return np.concatenate([x for x, _ in parts]), np.concatenate([v for _, v in parts])
+
+    def evaluate(self, x):
+        """Per-scenario costs with the first stage fixed at x."""
+        if self.local is not None:
+            return _run(self.local, 'evaluate', x)
+        return np.concatenate(self._call(lambda a, b: ('evaluate', x)))
+
+    def _call(self, message):
+        for conn, _, a, b in self.workers:
+            conn.send(message(a, b))
+        parts = [conn.recv() for conn, *_ in self.workers]
+        for part in parts:
+            if isinstance(part, Exception):
+                raise part
+        return parts
+
+    def close(self):
+        for conn, process, *_ in self.workers:
+            conn.send(None)
+            conn.close()
+            process.join()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================
+# SOLVER
+# ============================================
+def cost_proportional_rho(cost, x, rho_factor=1.0):
+    """Watson and Woodruff's rho_j = factor * |c_j| / spread of x_j over the iteration-0 solutions."""
+    spread = np.maximum(x.max(axis=0) - x.min(axis=0), 1.0)
+    return rho_factor * np.maximum(np.abs(cost), 1.0) / spread
+
+
+def solve_ph(module, scenarios=None, data=None, rho=None, rho_factor=1.0, rho_growth=None, tolerance=1e-4,
+             max_iterations=200, time_limit=None, processes=1, breakpoints=10, verbose=False):
+    """Solve a farmer_model or component_model scenario table with progressive hedging.
+
+    rho is a scalar or one value per first-stage variable; None picks
+    cost-proportional values scaled by rho_factor. rho_growth multiplies
+    rho every iteration; None keeps rho fixed for continuous first stages
+    and grows it by INTEGER_RHO_GROWTH for integer ones (where PH can
+    cycle), forcing agreement at some cost in solution quality. PH stops
+    once the convergence sum_s p_s |x_s - xbar|_1 is at most `tolerance`,
+    after `max_iterations`, or after `time_limit` seconds. The returned x is
+    xbar, or for integer x the scenario solution nearest xbar; objective
+    is its expected cost in minimization form and profit = -objective.
+    `bound` is the wait-and-see profit of iteration 0, which no first-stage
+    decision can beat.
+    """
+    scenarios = module.SCENARIOS if scenarios is None else scenarios
+    start = time.perf_counter()
+    with SubproblemPool(module, scenarios, data, processes, breakpoints) as pool:
+        probs = pool.probs
+        sample = pool.local[0] if pool.local is not None else ScenarioSubproblem(
+            module, module.scenario_table(scenarios)[0][0].tolist(), data, breakpoints)
+        cost, integer = sample.cost, np.array(sample.integer)
+        if rho_growth is None:
+            rho_growth = INTEGER_RHO_GROWTH if integer.any() else 1.0
+
+        x, values = pool.solve(np.zeros((len(probs), len(cost))), np.zeros(len(cost)), 0.0)
+        bound = probs @ values
+        rho = cost_proportional_rho(cost, x, rho_factor) if rho is None else \
+            np.broadcast_to(np.asarray(rho, dtype=float), cost.shape)
+        xbar = probs @ x
+        w = rho * (x - xbar)
+        convergence = probs @ np.abs(x - xbar).sum(axis=1)
+        history = [(0, convergence, probs @ values)]
+        iteration = 0
+        while convergence > tolerance and iteration < max_iterations:
+            if time_limit is not None and time.perf_counter() - start > time_limit:
+                break
+            iteration += 1
+            rho = rho * rho_growth
+            x, values = pool.solve(w, xbar, rho)
+            xbar = probs @ x
+            w += rho * (x - xbar)
+            convergence = probs @ np.abs(x - xbar).sum(axis=1)
+            history.append((iteration, convergence, probs @ values))
+            if verbose:
+                print(f"iter {iteration:4d}  convergence = {convergence:12.6f}  "
+                      f"expected cost = {probs @ values:14.4f}")
+
+        # xbar is feasible when x is continuous; rounding it may break the
+        # first-stage rows, so integer runs use the scenario solution nearest
+        # xbar (identical to xbar once converged).
+        x_final = x[np.argmin(np.abs(x - xbar).sum(axis=1))] if integer.any() else xbar
+        objective = probs @ pool.evaluate(x_final)
+    return PHResult(x_final, objective, -objective, -bound, convergence <= tolerance,
+                    iteration, convergence, rho, history)
+
+
+def print_ph(name, result):
+    print(name)
+    print(f"  first stage x               = {result.x.tolist()}")
+    print(f"  expected profit             = $ {result.profit:.2f}")
+    print(f"  wait-and-see bound          = $ {result.bound:.2f}")
+    print(f"  iterations                  = {result.iterations}"
+          f" ({'converged' if result.converged else 'not converged'}, convergence {result.convergence:.2e})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Progressive hedging for the two-stage models')
+    parser.add_argument('--models', nargs='+', choices=['farmer', 'component'], default=['farmer', 'component'])
+    parser.add_argument('--scenarios', type=int, default=None, help='sampled scenario count (default: book data)')
+    parser.add_argument('--rho', type=float, default=None)
+    parser.add_argument('--rho-factor', type=float, default=1.0)
+    parser.add_argument('--rho-growth', type=float, default=None, help=f'default: {INTEGER_RHO_GROWTH} for integer x, else 1')
+    parser.add_argument('--max-iterations', type=int, default=200)
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    for name in args.models:
+        module = farmer_model if name == 'farmer' else component_model
+        table = None if args.scenarios is None else module.sample_scenarios(args.scenarios)
+        print_ph(name, solve_ph(module, table, rho=args.rho, rho_factor=args.rho_factor, rho_growth=args.rho_growth,
+                                max_iterations=args.max_iterations, time_limit=args.time_limit,
+                                processes=args.processes, verbose=args.verbose))
@@ -0,0 +1,141 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import multiprocessing
+import os
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import create_solver, solver_bound
+
+
+# ============================================
+# RECOURSE SUBPROBLEM
+# ============================================
+class RecourseSolver:
+    """One reusable LP for the second stage of a TwoStageForm.
+
+    The recourse matrix W is fixed across scenarios, so the LP is built once
+    and only its objective (q[s]) and row bounds (h[s] - T[s] @ x) change
+    between scenario solves.
+    """
+
+    def __init__(self, form, solver_id='auto'):
+        self.form = form
+        self.solver = create_solver(solver_id)
+        inf = self.solver.infinity()
+        self.y = [self.solver.NumVar(solver_bound(lb, inf), solver_bound(ub, inf), f'y{k}')
+                  for k, (lb, ub) in enumerate(zip(form.y_lb.tolist(), form.y_ub.tolist()))]
+        self.rows = []
+        for r, coefficients in enumerate(np.asarray(form.W, dtype=float).tolist()):
+            ct = self.solver.Constraint(-inf, inf, f'r{r}')
+            for var, coef in zip(self.y, coefficients):
+                if coef:
+                    ct.SetCoefficient(var, coef)
+            self.rows.append(ct)
+        self.objective = self.solver.Objective()
+        self.objective.SetMinimization()
+
+    def solve(self, x, s):
+        """Return (Q_s(x), row duals, y) for scenario s at first-stage decision x."""
+        form = self.form
+        inf = self.solver.infinity()
+        tx = form.T[s] @ x
+        for ct, lb, ub in zip(self.rows, (form.h_lb[s] - tx).tolist(), (form.h_ub[s] - tx).tolist()):
+            ct.SetBounds(solver_bound(lb, inf), solver_bound(ub, inf))
+        for var, coef in zip(self.y, form.q[s].tolist()):
+            self.objective.SetCoefficient(var, coef)
+
+        status = self.solver.Solve()
+        if status != pywraplp.Solver.OPTIMAL:
+            raise Exception(f"Recourse problem for scenario {s} ended with status code: {status}")
+        duals = np.array([ct.dual_value() for ct in self.rows])
+        y = np.array([var.solution_value() for var in self.y])
+        return self.objective.Value(), duals, y
+
+    def solve_all(self, x, scenarios=None):
+        """Solve every (or the listed) scenario; return values (S,) and duals (S, m2)."""
+        indices = range(len(self.form.probs)) if scenarios is None else scenarios
+        x = np.asarray(x, dtype=float)
+        values, duals = [], []
+        for s in indices:
+            value, pi, _ = self.solve(x, s)
+            values.append(value)
+            duals.append(pi)
+        return np.array(values), np.array(duals).reshape(len(values), len(self.rows))
+
+
+# ============================================
+# PARALLEL EVALUATION
+# ============================================
+# Each worker process builds one RecourseSolver when the pool starts and
+# reuses it for every scenario it is handed; tasks are contiguous index
+# ranges so each round trip carries many scenarios.
+_worker_recourse = None
+
+
+def _init_worker(form, solver_id):
+    global _worker_recourse
+    _worker_recourse = RecourseSolver(form, solver_id)
+
+
+def _solve_range(args):
+    x, start, stop = args
+    return _worker_recourse.solve_all(x, range(start, stop))
+
+
+class ScenarioEvaluator:
+    """Evaluate all recourse subproblems of a TwoStageForm at fixed x.
+
+    processes=1 solves in the calling process; otherwise a process pool with
+    one RecourseSolver per worker is kept alive until close(), so repeated
+    evaluations (e.g. L-shaped iterations) do not pay the start-up again.
+    """
+
+    def __init__(self, form, processes=None, chunks_per_process=4, solver_id='auto', start_method=None):
+        self.form = form
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = None
+        self.local = None
+        num_s = len(form.probs)
+        if self.processes == 1:
+            self.local = RecourseSolver(form, solver_id)
+            self.ranges = [(0, num_s)]
+        else:
+            context = multiprocessing.get_context(start_method)
+            self.pool = context.Pool(self.processes, initializer=_init_worker, initargs=(form, solver_id))
+            bounds = np.linspace(0, num_s, self.processes * chunks_per_process + 1).astype(int)
+            self.ranges = [(a, b) for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()) if b > a]
+
+    def evaluate(self, x):
+        """Return per-scenario objective values (S,) and row duals (S, m2)."""
+        x = np.asarray(x, dtype=float)
+        if self.local is not None:
+            return self.local.solve_all(x)
+        parts = self.pool.map(_solve_range, [(x, a, b) for a, b in self.ranges])
+        return np.concatenate([v for v, _ in parts]), np.concatenate([d for _, d in parts])
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def evaluate_scenarios(form, x, processes=None):
+    """One-shot evaluation of every scenario at x; see ScenarioEvaluator."""
+    with ScenarioEvaluator(form, processes) as evaluator:
+        return evaluator.evaluate(x)
+
+
+def subgradients(form, duals, scenarios=None):
+    """Gradient of Q_s with respect to x from the row duals: -T[s]^T pi_s."""
+    T = form.T if scenarios is None else form.T[np.asarray(scenarios)]
+    return -np.einsum('smn,sm->sn', T, duals)
@@ -0,0 +1,47 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+from ortools.linear_solver import pywraplp
+
+from results import format_result
+
+
+# ============================================
+# RESULTS
+# ============================================
+def print_results(solver, status, sign=1):
+    """Print the objective and every variable, as the chapter scripts do.
+
+    `sign` is -1 for the farmer models, which minimize cost but report profit.
+    A FEASIBLE status (a time or gap limit hit with a solution in hand) is
+    reported with that solution and its bound.
+    """
+    if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        if status == pywraplp.Solver.FEASIBLE:
+            print(f"Best feasible solution (status FEASIBLE, bound {sign * solver.Objective().BestBound()})")
+            print()
+        print('Overall Profit = $', sign * solver.Objective().Value())
+        print()
+        for var in solver.variables():
+            print(f"{var.name()} = {var.solution_value()}")
+    else:
+        print_status(status)
+
+
+def print_solve_result(result, names=None):
+    """Print a SolveResult in the same layout as print_results()."""
+    if result.has_solution:
+        print(format_result(result, names))
+    else:
+        print_status(result.status)
+
+
+def print_status(status):
+    if status == pywraplp.Solver.INFEASIBLE:
+        print("The problem is infeasible — no solution satisfies all constraints.")
+    elif status == pywraplp.Solver.UNBOUNDED:
+        print("The problem is unbounded — the objective can increase indefinitely.")
+    elif status == pywraplp.Solver.ABNORMAL:
+        print("Solver stopped due to an abnormal error.")
+    else:
+        print("Solver ended with status code:", status)
@@ -0,0 +1,179 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import numpy as np
+from ortools.linear_solver import linear_solver_pb2, pywraplp
+
+
+# ============================================
+# SOLVE RESULTS
+# ============================================
+# A SolveResult holds one solve as flat NumPy arrays in solver column / row
+# order, copied out of the solver in a single MPSolutionResponse instead of
+# one solution_value() call per variable. Every model lays its columns out
+# as first-stage variables followed by one block of `num_recourse` columns
+# per scenario, and its rows as `row_start` leading rows followed by one
+# block of `rows_per_scenario` rows per scenario, so the per-scenario
+# accessors are reshaped views of the flat arrays, never copies.
+#
+# Duals and reduced costs are only defined for LPs; for MIPs they are NaN,
+# and `bound` holds the solver's best objective bound instead.
+STATUS_NAMES = {
+    pywraplp.Solver.OPTIMAL: 'OPTIMAL',
+    pywraplp.Solver.FEASIBLE: 'FEASIBLE',
+    pywraplp.Solver.INFEASIBLE: 'INFEASIBLE',
+    pywraplp.Solver.UNBOUNDED: 'UNBOUNDED',
+    pywraplp.Solver.ABNORMAL: 'ABNORMAL',
+    pywraplp.Solver.NOT_SOLVED: 'NOT_SOLVED',
+}
+
+
+class SolveResult:
+    """Primal values, duals, reduced costs, status and statistics of one solve.
+
+    `profit` is the objective in profit terms (sign * objective); the farmer
+    models minimize cost, so their sign is -1.
+    """
+
+    def __init__(self, status, objective, sign, values, duals, reduced_costs, num_first_stage,
+                 num_recourse, row_start, rows_per_scenario, wall_time=None, iterations=None, nodes=None,
+                 bound=None):
+        self.status = status
+        self.objective = objective
+        self.sign = sign
+        self.values = values
+        self.duals = duals
+        self.reduced_costs = reduced_costs
+        self.num_first_stage = num_first_stage
+        self.num_recourse = num_recourse
+        self.row_start = row_start
+        self.rows_per_scenario = rows_per_scenario
+        self.wall_time = wall_time
+        self.iterations = iterations
+        self.nodes = nodes
+        self.bound = bound
+
+    @classmethod
+    def from_solver(cls, solver, status, num_first_stage, num_recourse, row_start, rows_per_scenario,
+                    sign=1):
+        response = linear_solver_pb2.MPSolutionResponse()
+        solver.FillSolutionResponseProto(response)
+        num_cols, num_rows = solver.NumVariables(), solver.NumConstraints()
+        return cls(
+            status,
+            response.objective_value if response.HasField('objective_value') else np.nan,
+            sign,
+            _array(response.variable_value, num_cols),
+            _array(response.dual_value, num_rows),
+            _array(response.reduced_cost, num_cols),
+            num_first_stage, num_recourse, row_start, rows_per_scenario,
+            wall_time=solver.wall_time() / 1000,
+            iterations=solver.iterations(),
+            nodes=solver.nodes() if solver.IsMip() else None,
+            bound=response.best_objective_bound if solver.IsMip() and response.HasField('best_objective_bound')
+            else None,
+        )
+
+    @property
+    def optimal(self):
+        return self.status == pywraplp.Solver.OPTIMAL
+
+    @property
+    def has_solution(self):
+        """True when there are primal values to report: optimal, or the best found before a limit."""
+        return self.status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE) and \
+            not np.isnan(self.values).all()
+
+    @property
+    def gap(self):
+        """Relative MIP gap between the objective and the best bound (None without a bound)."""
+        if self.bound is None or np.isnan(self.objective):
+            return None
+        return abs(self.objective - self.bound) / max(abs(self.objective), 1e-9)
+
+    @property
+    def status_name(self):
+        return STATUS_NAMES.get(self.status, str(self.status))
+
+    @property
+    def profit(self):
+        return self.sign * self.objective
+
+    @property
+    def num_scenarios(self):
+        return (len(self.values) - self.num_first_stage) // self.num_recourse
+
+    # Zero-copy views, indexed [decision] or [scenario, decision].
+    @property
+    def first_stage(self):
+        return self.values[:self.num_first_stage]
+
+    @property
+    def recourse(self):
+        return self._by_scenario(self.values)
+
+    @property
+    def first_stage_reduced_costs(self):
+        return self.reduced_costs[:self.num_first_stage]
+
+    @property
+    def recourse_reduced_costs(self):
+        return self._by_scenario(self.reduced_costs)
+
+    @property
+    def scenario_duals(self):
+        end = self.row_start + self.num_scenarios * self.rows_per_scenario
+        return self.duals[self.row_start:end].reshape(self.num_scenarios, self.rows_per_scenario)
+
+    def _by_scenario(self, array):
+        return array[self.num_first_stage:].reshape(self.num_scenarios, self.num_recourse)
+
+    # ============================================
+    # BINARY EXPORT
+    # ============================================
+    def save(self, path):
+        """Write all arrays and metadata to one uncompressed .npz file."""
+        np.savez(path, **{key: np.asarray(value) for key, value in vars(self).items()
+                          if value is not None})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            fields = {key: archive[key] for key in archive.files}
+        for key, value in fields.items():
+            if value.ndim == 0:
+                fields[key] = value.item()
+        return cls(**fields)
+
+
+def _array(values, size):
+    return np.array(values, dtype=float) if len(values) == size else np.full(size, np.nan)
+
+
+# ============================================
+# FORMATTING
+# ============================================
+def format_result(result, names=None):
+    """Render a SolveResult in the chapter scripts' layout, one line per variable.
+
+    Without `names` the variables are labelled by position: x[j] for first
+    stage, y[s, j] for recourse.
+    """
+    if not result.has_solution:
+        return f"Solver ended with status: {result.status_name}"
+    if names is None:
+        names = [f'x[{j}]' for j in range(result.num_first_stage)]
+        names += [f'y[{s}, {j}]' for s in range(result.num_scenarios) for j in range(result.num_recourse)]
+    lines = [] if result.optimal else [feasible_note(result), '']
+    lines += [f'Overall Profit = $ {result.profit}', '']
+    lines += [f"{name} = {value}" for name, value in zip(names, result.values.tolist())]
+    return '\n'.join(lines)
+
+
+def feasible_note(result):
+    """One line saying a solution is the best found rather than a proven optimum."""
+    gap = result.gap
+    if gap is None:
+        return f"Best feasible solution (status {result.status_name}, optimality not proven)"
+    return f"Best feasible solution (status {result.status_name}, gap {100 * gap:.3f}% to bound " \
+           f"{result.sign * result.bound})"
@@ -0,0 +1,371 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import solver_parameters
+from benders import LShapedResult, build_master, relative_gap
+import component_model
+import farmer_model
+import persistent
+from recourse import ScenarioEvaluator, subgradients
+
+# ============================================
+# RISK MEASURES
+# ============================================
+# Both models are written in terms of the cost of each scenario, f_s =
+# model.scenario_cost(s) (the farmer's cost; the component plant's negated
+# profit). CVaR_alpha(f) is the expected cost over the worst 1 - alpha of
+# the probability mass, and is linear via Rockafellar-Uryasev:
+#     CVaR_alpha(f) = min  eta + 1 / (1 - alpha) * sum_s p_s u_s
+#                     s.t. u_s >= f_s - eta,  u_s >= 0.
+# The risk-averse objective is (1 - weight) * E[f] + weight * CVaR_alpha(f);
+# weight = 1 optimizes CVaR alone, with a TIE_BREAK share of E[f] kept so
+# the scenarios outside the tail still get their best recourse. Reported
+# "CVaR profit" is the expected profit of the worst 1 - alpha tail,
+# -CVaR_alpha(f).
+#
+# A joint chance constraint holds in at least `level` of the probability
+# mass: binary z_s marks scenario s as allowed to violate it, and
+# sum_s p_s z_s <= 1 - level.
+#   profit_floor: f_s - M z_s <= -target, with M = model.loss_bound() +
+#                 target, the tightest bound the data gives.
+#   no_purchase:  the farmer buys nothing in s exactly when the harvest
+#                 covers both requirements, i.e. x_w >= a_s and x_c >= b_s
+#                 with a_s = required_w / (yield_w m_w,s) (b_s likewise).
+#                 Sorting the thresholds, the scenarios above the
+#                 (1 - level) quantile q_w cannot all be violated, so
+#                 x_w >= q_w holds, and each row tightens to
+#                 x_w >= a_s - (a_s - q_w) z_s. Scenarios below both
+#                 quantiles drop out (z_s fixed at 0), leaving a MIP of
+#                 the tail scenarios only (Luedtke, Ahmed and Nemhauser's
+#                 strengthened formulation for random right-hand sides).
+RiskPoint = namedtuple('RiskPoint', ['parameter', 'status', 'expected_profit', 'cvar_profit', 'violation', 'x'])
+
+CHANCE_KINDS = ('no_purchase', 'profit_floor')
+TIE_BREAK = 1e-6
+
+
+def cvar(costs, probs, alpha):
+    """CVaR_alpha of a discrete cost distribution: expected cost of the worst 1 - alpha tail."""
+    if not 0 <= alpha < 1:
+        raise ValueError("alpha must be in [0, 1).")
+    order = np.argsort(costs)[::-1]
+    costs, probs = np.asarray(costs, dtype=float)[order], np.asarray(probs, dtype=float)[order]
+    tail = 1 - alpha
+    taken = np.clip(tail - (np.cumsum(probs) - probs), 0, probs)
+    return taken @ costs / tail
+
+
+def scenario_costs(model):
+    """Cost f_s of every scenario at the model's last solution."""
+    values = persistent.solution_values(model.solver)
+    return np.array([sum(coef * values[var.index()] for var, coef in model.scenario_cost(s))
+                     for s in range(model.num_scenarios)])
+
+
+def _tag(s):
+    return f' - Scenario {s + 1}'
+
+
+# ============================================
+# EXTENSIVE-FORM MODES
+# ============================================
+class CVaRObjective:
+    """Switch a built FarmerModel / ComponentModel to the mean-CVaR objective.
+
+    Adds eta, one excess variable u_s and one row per scenario. set()
+    rewrites only objective coefficients, so a re-solve after changing
+    alpha or weight starts warm. Call set() again after model.update().
+    """
+
+    def __init__(self, model, alpha=0.95, weight=1.0):
+        self.model = model
+        solver = model.solver
+        inf = solver.infinity()
+        self.sense = -1.0 if solver.Objective().maximization() else 1.0
+        self.eta = solver.NumVar(-inf, inf, 'Value at Risk')
+        self.excess = []
+        for s in range(model.num_scenarios):
+            u = solver.NumVar(0, inf, f'Cost above VaR{_tag(s)}')
+            ct = solver.Constraint(0, inf)   # u_s + eta - f_s >= 0
+            ct.SetCoefficient(u, 1)
+            ct.SetCoefficient(self.eta, 1)
+            for var, coef in model.scenario_cost(s):
+                ct.SetCoefficient(var, -coef)
+            self.excess.append(u)
+        self.set(alpha, weight)
+
+    def set(self, alpha=None, weight=None):
+        self.alpha = self.alpha if alpha is None else alpha
+        self.weight = self.weight if weight is None else weight
+        if not 0 <= self.alpha < 1 or not 0 <= self.weight <= 1:
+            raise ValueError("alpha must be in [0, 1) and weight in [0, 1].")
+        model, objective = self.model, self.model.solver.Objective()
+        expected = {}   # E[f] per variable; first-stage terms appear in every scenario
+        for s, p in enumerate(model.probs.tolist()):
+            for var, coef in model.scenario_cost(s):
+                expected[var] = expected.get(var, 0.0) + p * coef
+        share = max(1 - self.weight, TIE_BREAK)
+        for var, coef in expected.items():
+            objective.SetCoefficient(var, self.sense * share * coef)
+        objective.SetCoefficient(self.eta, self.sense * self.weight)
+        scale = self.sense * self.weight / (1 - self.alpha)
+        for u, p in zip(self.excess, model.probs.tolist()):
+            objective.SetCoefficient(u, scale * p)
+
+
+class ChanceConstraint:
+    """Add a joint chance constraint to a built FarmerModel / ComponentModel.
+
+    kind='no_purchase' (farmer): wheat and corn requirements are met from
+    the harvest, without purchases, in at least `level` of the scenarios.
+    kind='profit_floor': the scenario profit is at least `target` in at
+    least `level` of the scenarios. Needs a MIP engine (e.g. build the
+    component model with solver_id='CBC'). set_level() updates
+    coefficients and bounds in place.
+    """
+
+    def __init__(self, model, level=0.9, kind='no_purchase', target=None):
+        solver = model.solver
+        if not solver.IsMip():
+            raise Exception("Chance constraints need a MIP engine; build the model with a MIP solver_id.")
+        if kind not in CHANCE_KINDS:
+            raise ValueError(f"Unknown chance constraint: {kind}")
+        self.model = model
+        self.kind = kind
+        self.target = target
+        inf = solver.infinity()
+        self.violated = [solver.BoolVar(f'Violated{_tag(s)}') for s in range(model.num_scenarios)]
+
+        if kind == 'no_purchase':
+            if not hasattr(model, 'buy'):
+                raise Exception("kind='no_purchase' applies to the farmer model.")
+            d = model.data
+            # acres of wheat / corn whose harvest covers the requirement, per scenario
+            self.thresholds = np.column_stack([d['required_w'] / (d['yield_w'] * model.multipliers[:, 0]),
+                                               d['required_c'] / (d['yield_c'] * model.multipliers[:, 1])])
+            self.rows = [[solver.Constraint(-inf, inf) for _ in range(2)] for _ in self.violated]
+            self.quantile_rows = [solver.Constraint(-inf, inf) for _ in range(2)]
+            for k, ct in enumerate(self.quantile_rows):
+                ct.SetCoefficient(model.x[k], 1)
+                for rows in self.rows:
+                    rows[k].SetCoefficient(model.x[k], 1)
+        else:
+            if target is None:
+                raise Exception("kind='profit_floor' needs a profit target.")
+            big_m = model.loss_bound() + target
+            for s, z in enumerate(self.violated):
+                ct = solver.Constraint(-inf, -target)   # f_s - M z_s <= -target
+                for var, coef in model.scenario_cost(s):
+                    ct.SetCoefficient(var, coef)
+                ct.SetCoefficient(z, -big_m)
+
+        self.budget = solver.Constraint(-inf, inf, 'Chance budget')
+        for z, p in zip(self.violated, model.probs.tolist()):
+            self.budget.SetCoefficient(z, p)
+        self.set_level(level)
+
+    def set_level(self, level):
+        if not 0 <= level <= 1:
+            raise ValueError("level must be in [0, 1].")
+        self.level = level
+        self.budget.SetUb(1 - level)
+        if self.kind != 'no_purchase':
+            return
+        inf = self.model.solver.infinity()
+        probs = self.model.probs
+        in_tail = np.zeros(len(probs), dtype=bool)
+        for k, ct in enumerate(self.quantile_rows):
+            column = self.thresholds[:, k]
+            order = np.argsort(column)[::-1]
+            # the smallest top set with more mass than may be violated
+            beyond = np.flatnonzero(np.cumsum(probs[order]) > 1 - level + 1e-9)
+            quantile = column[order[beyond[0]]] if len(beyond) else 0.0
+            ct.SetLb(quantile)
+            tail = column > quantile
+            in_tail |= tail
+            for rows, z, a, active in zip(self.rows, self.violated, column.tolist(), tail.tolist()):
+                # x_k + (a_s - q) z_s >= a_s; below the quantile the row is implied
+                rows[k].SetCoefficient(z, a - quantile if active else 0)
+                rows[k].SetLb(a if active else -inf)
+        for z, tail in zip(self.violated, in_tail.tolist()):
+            z.SetUb(1 if tail else 0)
+
+    def violation(self):
+        """Probability mass of the scenarios that violate the constraint at the last solution."""
+        model = self.model
+        if self.kind == 'no_purchase':
+            values = persistent.solution_values(model.solver)
+            hit = np.array([max(values[var.index()] for var in bought) > 1e-6 for bought in model.buy])
+        else:
+            hit = -scenario_costs(model) < self.target - 1e-6
+        return float(model.probs @ hit)
+
+
+def _point(model, parameter, alpha, violation=None):
+    status = model.status
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        return RiskPoint(parameter, status, np.nan, np.nan, violation, None)
+    costs = scenario_costs(model)
+    x = [var.solution_value() for var in model.x]
+    return RiskPoint(parameter, status, -(model.probs @ costs), -cvar(costs, model.probs, alpha), violation, x)
+
+
+def cvar_frontier(model, alphas, weight=1.0):
+    """Solve the mean-CVaR model at every alpha, re-solving warm; returns RiskPoints."""
+    mode = CVaRObjective(model, alphas[0], weight)
+    points = []
+    for i, alpha in enumerate(alphas):
+        mode.set(alpha)
+        model.solve(warm=i > 0)
+        points.append(_point(model, alpha, alpha))
+    return points
+
+
+def chance_frontier(model, levels, kind='no_purchase', target=None, alpha=0.9):
+    """Solve the chance-constrained model at every level; `alpha` is the reported CVaR's."""
+    constraint = ChanceConstraint(model, levels[0], kind, target)
+    points = []
+    for i, level in enumerate(levels):
+        constraint.set_level(level)
+        model.solve(warm=i > 0)
+        violation = constraint.violation() if model.status in (pywraplp.Solver.OPTIMAL,
+                                                                pywraplp.Solver.FEASIBLE) else None
+        points.append(_point(model, level, alpha, violation))
+    return points
+
+
+# ============================================
+# RISK-AVERSE L-SHAPED METHOD
+# ============================================
+# For thousands of scenarios the mean-CVaR problem is decomposed: with
+# f_s = c x + Q_s(x) the master holds x, one epigraph variable theta_s per
+# scenario (multi-cut), eta and the u_s rows, and the recourse LPs are
+# solved by the ScenarioEvaluator. The cuts bound Q_s(x) and do not depend
+# on alpha or weight, so one CVaRLShaped solves a whole frontier, each
+# point starting from every cut found so far.
+class CVaRLShaped:
+    """Mean-CVaR L-shaped solver on a TwoStageForm (see benders.solve_lshaped)."""
+
+    def __init__(self, form, processes=1):
+        self.form = form
+        self.evaluator = ScenarioEvaluator(form, processes)
+        self.probs = np.asarray(form.probs, dtype=float)
+        num_s = len(self.probs)
+        self.master, self.x, self.theta = build_master(form, num_s)
+        master = self.master
+        inf = master.infinity()
+        self.eta = master.NumVar(-inf, inf, 'eta')
+        self.excess = [master.NumVar(0, inf, f'u{s}') for s in range(num_s)]
+        for theta, u in zip(self.theta, self.excess):
+            ct = master.Constraint(0, inf)   # u_s + eta - c x - theta_s >= 0
+            ct.SetCoefficient(u, 1)
+            ct.SetCoefficient(self.eta, 1)
+            ct.SetCoefficient(theta, -1)
+            for var, coef in zip(self.x, form.c.tolist()):
+                ct.SetCoefficient(var, -coef)
+        self.objective = master.Objective()
+        self.objective.SetMinimization()
+        self.num_cuts = 0
+
+        # one round of cuts at a first-stage feasible x bounds every theta_s
+        for var, coef in zip(self.x, form.c.tolist()):
+            self.objective.SetCoefficient(var, coef)
+        if master.Solve() != pywraplp.Solver.OPTIMAL:
+            raise Exception("First-stage problem is not solvable.")
+        x_hat = np.array([var.solution_value() for var in self.x])
+        values, duals = self.evaluator.evaluate(x_hat)
+        self._add_cuts(range(num_s), x_hat, values, subgradients(form, duals))
+
+    def _add_cuts(self, scenarios, x_hat, values, grads):
+        # theta_s >= Q_s(x_hat) + g_s @ (x - x_hat)
+        inf = self.master.infinity()
+        for s in scenarios:
+            ct = self.master.Constraint(values[s] - grads[s] @ x_hat, inf)
+            ct.SetCoefficient(self.theta[s], 1)
+            for var, coef in zip(self.x, grads[s].tolist()):
+                if coef:
+                    ct.SetCoefficient(var, -coef)
+        self.num_cuts += len(scenarios)
+
+    def solve(self, alpha, weight=1.0, gap=1e-6, max_iterations=200, verbose=False):
+        """Minimize (1 - weight) E[f] + weight CVaR_alpha(f); returns an LShapedResult."""
+        if not 0 <= alpha < 1 or not 0 <= weight <= 1:
+            raise ValueError("alpha must be in [0, 1) and weight in [0, 1].")
+        form, probs, objective = self.form, self.probs, self.objective
+        share = max(1 - weight, TIE_BREAK)
+        for var, coef in zip(self.x, form.c.tolist()):
+            objective.SetCoefficient(var, share * coef)
+        for theta, u, p in zip(self.theta, self.excess, probs.tolist()):
+            objective.SetCoefficient(theta, share * p)
+            objective.SetCoefficient(u, weight * p / (1 - alpha))
+        objective.SetCoefficient(self.eta, weight)
+
+        params = solver_parameters(gap / 10)  # as in benders: the MIP master's bound must beat the gap
+        best_x, upper, lower = None, np.inf, -np.inf
+        history, cuts_before = [], self.num_cuts
+        for iteration in range(1, max_iterations + 1):
+            status = self.master.Solve(params)
+            if status != pywraplp.Solver.OPTIMAL:
+                raise Exception(f"Master problem ended with status code: {status}")
+            x_hat = np.array([var.solution_value() for var in self.x])
+            theta_hat = np.array([var.solution_value() for var in self.theta])
+            lower = objective.BestBound() if self.master.IsMip() else objective.Value()
+
+            values, duals = self.evaluator.evaluate(x_hat)
+            costs = form.c @ x_hat + values
+            candidate = share * (probs @ costs) + weight * cvar(costs, probs, alpha)
+            if candidate < upper:
+                best_x, upper = x_hat, candidate
+            current_gap = relative_gap(lower, upper)
+            history.append((iteration, lower, upper, current_gap))
+            if verbose:
+                print(f"iter {iteration:4d}  lower = {lower:14.4f}  upper = {upper:14.4f}  gap = {current_gap:.2e}")
+            if current_gap <= gap:
+                break
+            violated = np.flatnonzero(theta_hat < values - 1e-9 * np.maximum(1.0, np.abs(values))).tolist()
+            self._add_cuts(violated, x_hat, values, subgradients(form, duals))
+
+        return LShapedResult(best_x, upper, form.profit_sign * upper, lower, upper, relative_gap(lower, upper),
+                             iteration, self.num_cuts - cuts_before, history)
+
+    def close(self):
+        self.evaluator.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mean-CVaR and chance-constrained farmer / component models')
+    parser.add_argument('--model', choices=['farmer', 'component'], default='farmer')
+    parser.add_argument('--scenarios', type=int, default=None, help='sampled scenario count (default: the book table)')
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.0, 0.5, 0.8, 0.9, 0.95])
+    parser.add_argument('--weight', type=float, default=1.0)
+    parser.add_argument('--levels', type=float, nargs='+', default=[0.0, 0.5, 0.8, 0.9, 1.0])
+    parser.add_argument('--target', type=float, default=None, help='profit floor (component model chance constraint)')
+    args = parser.parse_args()
+
+    module = farmer_model if args.model == 'farmer' else component_model
+    scenarios = module.SCENARIOS if args.scenarios is None else module.sample_scenarios(args.scenarios)
+    kind = 'no_purchase' if args.model == 'farmer' else 'profit_floor'
+    target = args.target if args.target is not None else 3000.0
+    for title, points in (
+            (f"CVaR frontier (weight {args.weight})",
+             cvar_frontier(module.build_two_stage(scenarios), args.alphas, args.weight)),
+            (f"Chance constraint '{kind}'" + (f" (target {target})" if kind == 'profit_floor' else ''),
+             chance_frontier(module.build_two_stage(scenarios, solver_id='CBC'), args.levels, kind, target))):
+        print(title)
+        print(f"{'parameter':>10} {'E[profit]':>12} {'CVaR profit':>12} {'violation':>10}  first stage")
+        for p in points:
+            violation = '-' if p.violation is None else f'{p.violation:.3f}'
+            x = '-' if p.x is None else np.round(p.x, 2).tolist()
+            print(f"{p.parameter:10.3f} {p.expected_profit:12.2f} {p.cvar_profit:12.2f} {violation:>10}  {x}")
@@ -0,0 +1,153 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import component_model
+
+# ============================================
+# ROLLING-HORIZON RE-PLANNING
+# ============================================
+# Each week the capacity decision (x_c1, x_c2) is re-planned against the
+# current price forecasts, and the forecast set shifts by a few entries.
+# RollingHorizon keeps one ComponentModel alive across weeks: retired
+# forecasts are deactivated in place, new ones refill retired slots (or
+# are appended when none is free), the probabilities are renormalized
+# over the active forecasts, and the model is re-solved warm from last
+# week's basis. Forecasts are keyed by any hashable id, with rows of
+# (a_price, b_price) or (a_price, b_price, weight); weights default to 1
+# and are normalized over the active set.
+#
+# Every replan() returns a Replan record, also kept in `history`, with
+# the time spent changing the model and solving it.
+Replan = namedtuple('Replan', ['week', 'added', 'retired', 'active', 'slots', 'update_seconds',
+                               'solve_seconds', 'seconds', 'iterations', 'profit', 'capacity'])
+
+
+class RollingHorizon:
+    """Weekly re-planning of the component-capacity decision on one live model.
+
+        planner = RollingHorizon(forecasts)
+        planner.replan()                      # week 0
+        record = planner.replan(add={'w1-a': (52, 61)}, retire=['w0-a'])
+        print(record.seconds, record.capacity)
+
+    reuse=False appends every new forecast instead of refilling retired
+    slots; the model then grows by two columns and two rows per forecast,
+    and GLOP reloads it after every append.
+    """
+
+    def __init__(self, forecasts, data=None, solver_id='GLOP', reuse=True):
+        keys = list(forecasts)
+        self.weights = {key: _weight(row) for key, row in forecasts.items()}
+        table = [(*forecasts[key][:2], self.weights[key]) for key in keys]
+        total = sum(self.weights.values())
+        table = [(a, b, w / total) for a, b, w in table]
+        self.model = component_model.build_two_stage(table, data, solver_id, method='matrix', names=False)
+        self.slots = {key: i for i, key in enumerate(keys)}
+        self.free = []
+        self.reuse = reuse
+        self.week = 0
+        self.history = []
+
+    @property
+    def active(self):
+        return len(self.slots)
+
+    def replan(self, add=None, retire=()):
+        """Retire forecast keys, add {key: row} forecasts, re-solve; return the week's Replan."""
+        add = add or {}
+        model = self.model
+        start = time.perf_counter()
+        for key in retire:
+            slot = self.slots.pop(key)
+            del self.weights[key]
+            model.retire_scenario(slot)
+            self.free.append(slot)
+        for key, row in add.items():
+            if key in self.slots:
+                raise KeyError(f"Forecast {key!r} is already active")
+            slot = self.free.pop() if self.reuse and self.free else None
+            self.slots[key] = model.add_scenario(row[:2], 0.0, slot)
+            self.weights[key] = _weight(row)
+        if add or retire:
+            probs = np.zeros(model.num_scenarios)
+            total = sum(self.weights.values())
+            for key, slot in self.slots.items():
+                probs[slot] = self.weights[key] / total
+            model.set_probabilities(probs)
+        update_seconds = time.perf_counter() - start
+
+        model.solve(warm=model.status is not None)
+        solve_seconds = time.perf_counter() - start - update_seconds
+        record = Replan(self.week, len(add), len(retire), self.active, model.num_scenarios, update_seconds,
+                        solve_seconds, update_seconds + solve_seconds, model.solver.iterations(), model.profit(),
+                        model.capacity())
+        self.history.append(record)
+        self.week += 1
+        return record
+
+    def rebuild(self, solver_id='GLOP'):
+        """A fresh model over the active forecasts, for checking the live one."""
+        keys = list(self.slots)
+        total = sum(self.weights[key] for key in keys)
+        table = [(*self.model.prices[self.slots[key]], self.weights[key] / total) for key in keys]
+        return component_model.build_two_stage(table, self.model.data, solver_id, method='matrix', names=False)
+
+
+def _weight(row):
+    return float(row[2]) if len(row) > 2 else 1.0
+
+
+# ============================================
+# FORECAST STREAM
+# ============================================
+def forecast_stream(num_forecasts, turnover, weeks, drift=0.02, spread=0.1, seed=0):
+    """Yield the initial forecasts, then `weeks` (add, retire) shifts of `turnover` forecasts each.
+
+    Prices follow a random walk around the book's price cases; each week
+    the `turnover` oldest forecasts are retired and as many new ones are
+    drawn around the current level.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.array(component_model.SCENARIOS, dtype=float)[:, :2]
+    level = np.ones(2)
+
+    def draw(key):
+        row = base[key % len(base)] * level * rng.uniform(1 - spread, 1 + spread, 2)
+        return tuple(row.tolist())
+
+    yield {key: draw(key) for key in range(num_forecasts)}
+    oldest = 0
+    for week in range(weeks):
+        level *= np.exp(rng.normal(0, drift, 2))
+        first = num_forecasts + week * turnover
+        retire = list(range(oldest, oldest + turnover))
+        oldest += turnover
+        yield {key: draw(key) for key in range(first, first + turnover)}, retire
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rolling-horizon re-planning of component capacity')
+    parser.add_argument('--forecasts', type=int, default=300, help='active price forecasts each week')
+    parser.add_argument('--turnover', type=int, default=5, help='forecasts replaced each week')
+    parser.add_argument('--weeks', type=int, default=52)
+    parser.add_argument('--no-reuse', action='store_true', help='append new forecasts instead of refilling slots')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stream = forecast_stream(args.forecasts, args.turnover, args.weeks, seed=args.seed)
+    planner = RollingHorizon(next(stream), reuse=not args.no_reuse)
+    print(f"{'week':>5} {'active':>7} {'slots':>6} {'update ms':>10} {'solve ms':>9} {'total ms':>9} {'iters':>6} "
+          f"{'profit':>12} {'x_c1':>8} {'x_c2':>8}")
+    for add, retire in [({}, [])] + list(stream):
+        r = planner.replan(add, retire)
+        print(f"{r.week:5d} {r.active:7d} {r.slots:6d} {1000 * r.update_seconds:10.2f} {1000 * r.solve_seconds:9.2f} "
+              f"{1000 * r.seconds:9.2f} {r.iterations:6d} {r.profit:12.2f} {r.capacity[0]:8.2f} {r.capacity[1]:8.2f}")
+    weekly = 1000 * np.array([r.seconds for r in planner.history[1:]])
+    if len(weekly):
+        print(f"\nweekly re-plan: mean {weekly.mean():.2f} ms, p50 {np.median(weekly):.2f} ms, max {weekly.max():.2f} ms")
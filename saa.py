@@ -0,0 +1,148 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import functools
+import importlib
+import multiprocessing
+import os
+from collections import namedtuple
+
+import numpy as np
+from scipy import stats
+
+import benders
+import component_model
+import farmer_model
+from recourse import ScenarioEvaluator
+
+# ============================================
+# SAMPLE AVERAGE APPROXIMATION
+# ============================================
+# A sampler is a callable sampler(rng, n) returning an (n, k) array of
+# scenario values (farmer: yield multipliers, component: prices) drawn in
+# one vectorized call. Each replication, the screening sample and the
+# evaluation sample get their own child of np.random.SeedSequence(seed), so
+# runs are reproducible regardless of the process count.
+#
+# In profit terms, the mean SAA optimum over M replications is a
+# statistical upper bound on the true optimal expected profit, and the
+# out-of-sample profit of any fixed candidate x is a lower bound.
+SAAResult = namedtuple(
+    'SAAResult',
+    ['x', 'upper', 'upper_half_width', 'lower', 'lower_half_width', 'gap',
+     'replication_profits', 'replication_x'],
+)
+
+
+# Samplers are partials of module-level functions so they pickle to workers.
+def _uniform(low, high, rng, n):
+    return rng.uniform(low, high, size=(n, len(low)))
+
+
+def _normal(mean, std, minimum, rng, n):
+    return np.maximum(rng.normal(mean, std, size=(n, len(mean))), minimum)
+
+
+def uniform_sampler(low, high):
+    """Independent uniform values per column between `low` and `high`."""
+    return functools.partial(_uniform, np.asarray(low, dtype=float), np.asarray(high, dtype=float))
+
+
+def normal_sampler(mean, std, minimum=0.0):
+    """Independent normal values per column, clipped below at `minimum`."""
+    return functools.partial(_normal, np.asarray(mean, dtype=float), np.asarray(std, dtype=float), minimum)
+
+
+def equally_likely(values):
+    """Append a 1/n probability column to sampled scenario values."""
+    return np.column_stack([values, np.full(len(values), 1 / len(values))])
+
+
+def _form(module, values, data):
+    return module.two_stage_arrays(equally_likely(values), data)
+
+
+def _solve_replication(args):
+    module_name, sampler, n, seed_seq, data, gap = args
+    module = importlib.import_module(module_name)
+    rng = np.random.default_rng(seed_seq)
+    result = benders.solve_lshaped(_form(module, sampler(rng, n), data), gap=gap)
+    return result.profit, result.x
+
+
+def _evaluate(module, xs, values, data, processes):
+    """Per-scenario out-of-sample profits of each first-stage decision in xs, one row per decision."""
+    form = _form(module, values, data)
+    with ScenarioEvaluator(form, processes) as evaluator:
+        return np.array([form.profit_sign * (form.c @ x + evaluator.evaluate(x)[0]) for x in xs])
+
+
+def _interval(samples, confidence):
+    samples = np.asarray(samples, dtype=float)
+    half = stats.t.ppf(0.5 + confidence / 2, len(samples) - 1) * samples.std(ddof=1) / np.sqrt(len(samples))
+    return samples.mean(), half
+
+
+def solve_saa(module, sampler, sample_size, replications=10, evaluation_size=100000, screen_size=1000,
+              data=None, processes=1, confidence=0.95, seed=0, gap=1e-6):
+    """Run SAA for farmer_model or component_model and return an SAAResult.
+
+    Each of the `replications` SAA problems with `sample_size` scenarios is
+    solved with the L-shaped method (in parallel when processes != 1). The
+    replication whose decision scores best on a screening sample becomes
+    the candidate x, whose profit is then estimated on `evaluation_size`
+    fresh scenarios. The upper bound's interval needs at least two
+    replications.
+    """
+    if replications < 2:
+        raise ValueError(f"replications must be at least 2, not {replications}")
+    children = np.random.SeedSequence(seed).spawn(replications + 2)
+    replication_seeds, (screen_seed, evaluation_seed) = children[:replications], children[replications:]
+    tasks = [(module.__name__, sampler, sample_size, s, data, gap) for s in replication_seeds]
+    if processes == 1:
+        results = list(map(_solve_replication, tasks))
+    else:
+        with multiprocessing.Pool(processes or os.cpu_count()) as pool:
+            results = pool.map(_solve_replication, tasks)
+    replication_profits = np.array([profit for profit, _ in results])
+    replication_x = np.array([x for _, x in results])
+
+    screen_values = sampler(np.random.default_rng(screen_seed), screen_size)
+    screen = _evaluate(module, replication_x, screen_values, data, processes).mean(axis=1)
+    x = replication_x[int(np.argmax(screen))]
+
+    evaluation = _evaluate(module, [x], sampler(np.random.default_rng(evaluation_seed), evaluation_size),
+                           data, processes)[0]
+    upper, upper_half = _interval(replication_profits, confidence)
+    lower, lower_half = _interval(evaluation, confidence)
+    return SAAResult(x, upper, upper_half, lower, lower_half, upper - lower, replication_profits, replication_x)
+
+
+def print_saa(name, result):
+    print(name)
+    print(f"  candidate x                 = {np.round(result.x, 4).tolist()}")
+    print(f"  upper bound (SAA mean)      = $ {result.upper:.2f} +/- {result.upper_half_width:.2f}")
+    print(f"  lower bound (out-of-sample) = $ {result.lower:.2f} +/- {result.lower_half_width:.2f}")
+    print(f"  optimality gap estimate     = $ {result.gap:.2f}")
+
+
+SAMPLERS = {
+    'farmer': (farmer_model, uniform_sampler([0.8, 0.8, 0.8], [1.2, 1.2, 1.2])),
+    'component': (component_model, uniform_sampler([30, 50], [70, 70])),
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sample average approximation with statistical bounds')
+    parser.add_argument('--models', nargs='+', choices=sorted(SAMPLERS), default=sorted(SAMPLERS))
+    parser.add_argument('--sample-size', type=int, default=100)
+    parser.add_argument('--replications', type=int, default=10)
+    parser.add_argument('--evaluation-size', type=int, default=20000)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for name in args.models:
+        module, sampler = SAMPLERS[name]
+        print_saa(name, solve_saa(module, sampler, args.sample_size, args.replications, args.evaluation_size,
+                                  processes=args.processes, seed=args.seed))
@@ -0,0 +1,123 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import numpy as np
+
+
+# ============================================
+# SCENARIO TREE
+# ============================================
+# Nodes are stored breadth-first in flat arrays, node 0 being the root at
+# stage 0. Every stage, and the children of every node, are therefore
+# contiguous index ranges:
+#   parent[n]       parent node (-1 for the root)
+#   stage[n]        stage of the node
+#   cond_prob[n]    probability of n given its parent
+#   prob[n]         unconditional probability of reaching n
+#   values[n]       outcome observed at n (e.g. yield multipliers; unused at the root)
+#   first_child[n], num_children[n]
+class ScenarioTree:
+    """Array-backed scenario tree (no per-node Python objects)."""
+
+    def __init__(self, parent, cond_prob, values):
+        self.parent = np.asarray(parent, dtype=np.int64)
+        self.cond_prob = np.asarray(cond_prob, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        n = len(self.parent)
+        if self.parent[0] != -1 or (self.parent[1:] >= np.arange(1, n)).any() or (np.diff(self.parent) < 0).any():
+            raise ValueError("Nodes must be in breadth-first order with the root first.")
+
+        # parents precede children, so depths settle after one pass per stage
+        self.stage = np.zeros(n, dtype=np.int64)
+        while not np.array_equal(depth := np.concatenate([[0], self.stage[self.parent[1:]] + 1]), self.stage):
+            self.stage = depth
+        self.prob = np.ones(n)
+        for t in range(1, self.num_stages):
+            nodes = self.nodes_at(t)
+            self.prob[nodes] = self.prob[self.parent[nodes]] * self.cond_prob[nodes]
+
+        self.num_children = np.bincount(self.parent[1:], minlength=n)
+        self.first_child = np.searchsorted(self.parent, np.arange(n))
+        # key[n] = parent + cumulative sibling probability up to n, used to
+        # sample children with one searchsorted over all nodes
+        cumulative = np.cumsum(self.cond_prob)
+        cumulative -= (cumulative - self.cond_prob)[self.first_child[np.maximum(self.parent, 0)]]
+        self._key = self.parent + cumulative
+        self._key[0] = -1.0
+        last = self.first_child + self.num_children - 1
+        self._key[last[self.num_children > 0]] = np.flatnonzero(self.num_children > 0) + 1.0
+
+    @classmethod
+    def from_branching(cls, outcomes, probs, num_stages):
+        """Stagewise-independent tree: every node below the root branches into `outcomes`.
+
+        `outcomes` is (K, d) and `probs` (K,); the tree has num_stages + 1
+        stages (the root plus one per branching) and sum_t K^t nodes.
+        """
+        outcomes = np.asarray(outcomes, dtype=float).reshape(len(probs), -1)
+        probs = np.asarray(probs, dtype=float)
+        k = len(probs)
+        parents, conds, values = [np.array([-1])], [np.array([1.0])], [np.full((1, outcomes.shape[1]), np.nan)]
+        start, width = 0, 1
+        for _ in range(num_stages):
+            parents.append(np.repeat(np.arange(start, start + width), k))
+            conds.append(np.tile(probs, width))
+            values.append(np.tile(outcomes, (width, 1)))
+            start, width = start + width, width * k
+        return cls(np.concatenate(parents), np.concatenate(conds), np.concatenate(values))
+
+    @classmethod
+    def from_scenario_table(cls, scenarios, num_stages):
+        """Branch on the rows of a scenario table, e.g. farmer (m_w, m_c, m_s, p), every stage."""
+        table = np.asarray(scenarios, dtype=float)
+        return cls.from_branching(table[:, :-1], table[:, -1], num_stages)
+
+    @property
+    def num_nodes(self):
+        return len(self.parent)
+
+    @property
+    def num_stages(self):
+        return int(self.stage[-1]) + 1
+
+    def nodes_at(self, t):
+        """Index range of the nodes at stage t."""
+        start, stop = np.searchsorted(self.stage, [t, t + 1])
+        return np.arange(start, stop)
+
+    def children(self, node):
+        return np.arange(self.first_child[node], self.first_child[node] + self.num_children[node])
+
+    @property
+    def leaves(self):
+        return np.flatnonzero(self.num_children == 0)
+
+    def path(self, node):
+        """Nodes from the root down to `node`."""
+        nodes = [node]
+        while self.parent[nodes[-1]] >= 0:
+            nodes.append(self.parent[nodes[-1]])
+        return np.array(nodes[::-1])
+
+    def stage_outcomes(self, t):
+        """(values, conditional probabilities) shared by every sibling group at stage t.
+
+        Raises ValueError unless the tree is stagewise independent at t.
+        """
+        nodes = self.nodes_at(t)
+        k = self.num_children[self.parent[nodes[0]]]
+        if len(nodes) % k or (self.num_children[self.nodes_at(t - 1)] != k).any():
+            raise ValueError(f"Stage {t} is not stagewise independent.")
+        values = self.values[nodes].reshape(-1, k, self.values.shape[1])
+        probs = self.cond_prob[nodes].reshape(-1, k)
+        if not (np.allclose(values, values[0]) and np.allclose(probs, probs[0])):
+            raise ValueError(f"Stage {t} is not stagewise independent.")
+        return values[0], probs[0]
+
+    def sample_paths(self, rng, n):
+        """Sample `n` root-to-leaf paths; returns an (n, num_stages) array of nodes."""
+        paths = np.zeros((n, self.num_stages), dtype=np.int64)
+        for t in range(1, self.num_stages):
+            u = 1.0 - rng.random(n)
+            paths[:, t] = np.searchsorted(self._key, paths[:, t - 1] + u)
+        return paths
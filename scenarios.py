@@ -0,0 +1,95 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+from collections import namedtuple
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+
+# ============================================
+# SCENARIO TABLES
+# ============================================
+# Scenario tables are 2-D arrays whose last column is the probability, e.g.
+# farmer rows (m_w, m_c, m_s, p) or component rows (a_price, b_price, p).
+def replicate_scenarios(scenarios, n):
+    """Tile the rows of `scenarios` up to `n` rows, rescaling probabilities.
+
+    Every copy of a row carries an equal share of that row's probability, so
+    the replicated table has exactly the same optimum as the original.
+    """
+    table = np.asarray(scenarios, dtype=float)
+    index = np.arange(n) % len(table)
+    copies = np.bincount(index, minlength=len(table))
+    if (copies == 0).any():
+        raise ValueError(f"Need at least {len(table)} rows to replicate every scenario.")
+    replicated = table[index].copy()
+    replicated[:, -1] /= copies[index]
+    return replicated
+
+
+# ============================================
+# SCENARIO REDUCTION
+# ============================================
+ReducedScenarios = namedtuple('ReducedScenarios', ['table', 'indices', 'distance'])
+
+
+def reduce_scenarios(scenarios, n_keep, metric='euclidean', chunk_size=2048):
+    """Fast forward selection of `n_keep` scenarios (Heitsch and Roemisch).
+
+    Scenarios are selected one at a time, each time picking the one that
+    most reduces the Kantorovich distance sum_i p_i * min_{j in J} c(i, j)
+    between the full and the selected set J. The probability of every
+    dropped scenario is moved to its nearest selected one. Returns the
+    reduced table (same layout as the input), the selected row indices and
+    the final Kantorovich distance.
+
+    Distances are computed in row chunks on the fly rather than stored as an
+    n x n matrix. After each selection only the rows whose nearest selected
+    distance improved are revisited, which keeps the total work close to
+    n^2 * log(n_keep).
+    """
+    table = np.asarray(scenarios, dtype=float)
+    values, probs = table[:, :-1], table[:, -1]
+    n = len(table)
+    if not 0 < n_keep <= n:
+        raise ValueError(f"n_keep must be between 1 and {n}.")
+
+    def rows(index):
+        for start in range(0, len(index), chunk_size):
+            chunk = index[start:start + chunk_size]
+            yield chunk, cdist(values[chunk], values, metric)
+
+    # First pick: the scenario with the smallest expected distance to all others.
+    expected = np.zeros(n)
+    for chunk, dist in rows(np.arange(n)):
+        expected += probs[chunk] @ dist
+    selected = [int(np.argmin(expected))]
+    nearest = cdist(values, values[selected], metric)[:, 0]
+
+    # gain[u]: reduction of the distance if u were selected next.
+    gain = np.zeros(n)
+    for chunk, dist in rows(np.arange(n)):
+        np.subtract(nearest[chunk, None], dist, out=dist)
+        gain += probs[chunk] @ np.maximum(dist, 0, out=dist)
+
+    is_selected = np.zeros(n, dtype=bool)
+    is_selected[selected[0]] = True
+    while len(selected) < n_keep:
+        u = int(np.argmax(np.where(is_selected, -np.inf, gain)))
+        selected.append(u)
+        is_selected[u] = True
+        to_u = cdist(values, values[[u]], metric)[:, 0]
+        improved = np.flatnonzero(to_u < nearest)
+        for chunk, dist in rows(improved):
+            # max(old - d, 0) - max(new - d, 0) == clip(old - d, 0, old - new) for new <= old
+            old, new = nearest[chunk, None], to_u[chunk, None]
+            np.subtract(old, dist, out=dist)
+            gain -= probs[chunk] @ np.clip(dist, 0, old - new, out=dist)
+        nearest[improved] = to_u[improved]
+
+    selected = np.array(selected)
+    owner = np.argmin(cdist(values, values[selected], metric), axis=1)
+    reduced = table[selected].copy()
+    reduced[:, -1] = np.bincount(owner, weights=probs, minlength=len(selected))
+    return ReducedScenarios(reduced, selected, float(probs @ nearest))
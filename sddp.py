@@ -0,0 +1,119 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+from scipy import stats
+
+import farmer_model
+import farmer_multistage
+
+# ============================================
+# STOCHASTIC DUAL DYNAMIC PROGRAMMING
+# ============================================
+# For a stagewise-independent scenario tree every node of a stage has the
+# same future, so one LP per stage with one shared set of cuts on its
+# future cost stands in for all of that stage's nodes. Memory grows with
+# stages x cuts, never with the number of tree nodes. Each iteration:
+#   forward:  sample paths through the tree, solve the stages along each
+#             path and record the outgoing states (and the path cost);
+#   backward: from the last stage up, solve every outcome of stage t at
+#             each recorded state of stage t-1 and add the expected cut
+#             theta_{t-1} >= E[V_t(s)] + E[dV_t/ds] @ (s_out - s).
+# The root objective is a lower bound on the expected cost; the mean
+# sampled path cost estimates the cost of the current policy.
+SDDPResult = namedtuple(
+    'SDDPResult',
+    ['x', 'profit', 'lower_bound', 'upper_bound', 'upper_half_width', 'iterations', 'num_cuts', 'history'],
+)
+
+
+def solve_sddp(tree, stages, forward_paths=10, max_iterations=100, tolerance=1e-4, confidence=0.95,
+               time_limit=None, seed=0, verbose=False):
+    """Run SDDP on `tree` with one StageProblem per stage (see farmer_multistage.stage_problems).
+
+    Stops after `max_iterations`, after `time_limit` seconds, or once the
+    lower bound has moved by less than `tolerance` (relative) over the last
+    five iterations and lies inside the confidence interval of the sampled
+    policy cost. Costs are in minimization form; profit is -lower_bound.
+    """
+    outcomes = [tree.stage_outcomes(t) for t in range(1, tree.num_stages)]
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    history, num_cuts = [], 0
+    lower = upper = half = np.nan
+
+    for iteration in range(1, max_iterations + 1):
+        # forward pass
+        paths = tree.sample_paths(rng, forward_paths)
+        states = np.zeros((forward_paths, tree.num_stages, farmer_multistage.NUM_STATE))
+        costs = np.zeros(forward_paths)
+        for i, path in enumerate(paths):
+            state = np.zeros(farmer_multistage.NUM_STATE)
+            for t, node in enumerate(path.tolist()):
+                stage = stages[t]
+                if t:
+                    stage.set_outcome(tree.values[node])
+                stage.set_state(state)
+                _, state, _ = stage.solve()
+                costs[i] += stage.stage_cost()
+                states[i, t] = state
+
+        # backward pass
+        for t in range(tree.num_stages - 1, 0, -1):
+            values, probs = outcomes[t - 1]
+            for state in np.unique(states[:, t - 1], axis=0):
+                stages[t].set_state(state)
+                expected_value, expected_gradient = 0.0, np.zeros(len(state))
+                for multipliers, p in zip(values, probs.tolist()):
+                    stages[t].set_outcome(multipliers)
+                    value, _, gradient = stages[t].solve()
+                    expected_value += p * value
+                    expected_gradient += p * gradient
+                stages[t - 1].add_cut(expected_value - expected_gradient @ state, expected_gradient)
+                num_cuts += 1
+
+        stages[0].set_state(np.zeros(farmer_multistage.NUM_STATE))
+        lower, x, _ = stages[0].solve()
+        upper = costs.mean()
+        half = stats.t.ppf(0.5 + confidence / 2, forward_paths - 1) * costs.std(ddof=1) / np.sqrt(forward_paths) \
+            if forward_paths > 1 else np.inf
+        history.append((iteration, lower, upper, half))
+        if verbose:
+            print(f"iter {iteration:4d}  lower = {lower:14.4f}  policy = {upper:14.4f} +/- {half:.4f}  "
+                  f"cuts = {num_cuts}")
+        if len(history) > 5:
+            previous = history[-6][1]
+            stable = abs(lower - previous) <= tolerance * max(1.0, abs(lower))
+            if stable and abs(upper - lower) <= half:
+                break
+        if time_limit is not None and time.perf_counter() - start > time_limit:
+            break
+
+    return SDDPResult(x[:3], -lower, lower, upper, half, iteration, num_cuts, history)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Multi-season farmer planning with SDDP')
+    parser.add_argument('--seasons', type=int, default=3)
+    parser.add_argument('--outcomes', type=int, default=None, help='sampled yield outcomes per season '
+                                                                   '(default: the three book scenarios)')
+    parser.add_argument('--forward-paths', type=int, default=10)
+    parser.add_argument('--max-iterations', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    scenarios = farmer_model.SCENARIOS if args.outcomes is None else \
+        farmer_model.sample_scenarios(args.outcomes, seed=args.seed)
+    tree = farmer_multistage.farmer_tree(args.seasons, scenarios)
+    result = solve_sddp(tree, farmer_multistage.stage_problems(tree), args.forward_paths, args.max_iterations,
+                        seed=args.seed, verbose=args.verbose)
+    print(f"Scenario tree: {tree.num_nodes} nodes over {args.seasons} seasons")
+    print(f"First-season acres             = {np.round(result.x, 4).tolist()}")
+    print(f"Expected profit (upper bound)  = $ {result.profit:.2f}")
+    print(f"Sampled policy profit          = $ {-result.upper_bound:.2f} +/- {result.upper_half_width:.2f}")
+    print(f"Iterations                     = {result.iterations} ({result.num_cuts} cuts)")
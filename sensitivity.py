@@ -0,0 +1,313 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import math
+from collections import namedtuple
+
+import numpy as np
+from ortools.linear_solver import linear_solver_pb2, pywraplp
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+import component_model
+import farmer_model
+
+# ============================================
+# BASIS SENSITIVITY
+# ============================================
+# An LP solved by a simplex engine (GLOP) ends on an optimal basis. With
+# one activity variable s_i = a_i x per row, every row and column is a
+# bounded variable z = (x, s) of [A, -I] z = 0, and the basis is the m
+# columns GLOP reports as BASIC. Everything below is read off that basis
+# with one sparse LU of B and no re-solve, in minimization form (a
+# maximized objective is negated and the results turned back):
+#   y = B^-T c_B,  r = c - [A, -I]^T y       duals and reduced costs
+#   c + t d:  r(t) = r + t (d - [A, -I]^T B^-T d_B) keeps the sign each
+#             nonbasic variable needs, for t in the cost range;
+#   bounds + t e:  the nonbasic variables at a moving bound carry it,
+#             z_B(t) = z_B - t B^-1 N e_N must stay within z_B's bounds.
+# Inside a range the optimal value is linear in t, so a parametric sweep
+# only needs one (warm) solve per basis change.
+BasisRange = namedtuple('BasisRange', ['lower', 'upper', 'slope'])
+ParametricCurve = namedtuple('ParametricCurve', ['parameter', 'breakpoints', 'values', 'slopes', 'solves'])
+
+STATUS_LABELS = {
+    pywraplp.Solver.FREE: 'free',
+    pywraplp.Solver.AT_LOWER_BOUND: 'at lower',
+    pywraplp.Solver.AT_UPPER_BOUND: 'at upper',
+    pywraplp.Solver.FIXED_VALUE: 'fixed',
+    pywraplp.Solver.BASIC: 'basic',
+}
+TOLERANCE = 1e-9
+
+
+def model_arrays(solver):
+    """(c, A, column lb, column ub, row lb, row ub, maximize) of a pywraplp model."""
+    proto = linear_solver_pb2.MPModelProto()
+    solver.ExportModelToProto(proto)
+    n, m = len(proto.variable), len(proto.constraint)
+    c = np.array([var.objective_coefficient for var in proto.variable])
+    col_lb = np.array([var.lower_bound for var in proto.variable])
+    col_ub = np.array([var.upper_bound for var in proto.variable])
+    row_lb = np.array([ct.lower_bound for ct in proto.constraint])
+    row_ub = np.array([ct.upper_bound for ct in proto.constraint])
+    rows = np.repeat(np.arange(m), [len(ct.var_index) for ct in proto.constraint])
+    cols = np.array([j for ct in proto.constraint for j in ct.var_index], dtype=np.int64)
+    vals = np.array([a for ct in proto.constraint for a in ct.coefficient])
+    A = sparse.csr_matrix((vals, (rows, cols)), shape=(m, n))
+    return c, A, col_lb, col_ub, row_lb, row_ub, proto.maximize
+
+
+class LPBasis:
+    """Optimal basis of a solved pywraplp LP, for ranging without re-solving."""
+
+    def __init__(self, solver):
+        c, A, col_lb, col_ub, row_lb, row_ub, maximize = model_arrays(solver)
+        self.num_rows, self.num_cols = A.shape
+        self.sense = -1.0 if maximize else 1.0
+        self.M = sparse.hstack([A, -sparse.identity(self.num_rows)]).tocsc()
+        self.lb = np.concatenate([col_lb, row_lb])
+        self.ub = np.concatenate([col_ub, row_ub])
+        self.cost = np.concatenate([self.sense * c, np.zeros(self.num_rows)])
+        self.status = np.array([var.basis_status() for var in solver.variables()] +
+                               [ct.basis_status() for ct in solver.constraints()])
+        x = np.array([var.solution_value() for var in solver.variables()])
+        self.z = np.concatenate([x, A @ x])
+        self.objective = solver.Objective().Value()
+
+        self.basic = np.flatnonzero(self.status == pywraplp.Solver.BASIC)
+        if len(self.basic) != self.num_rows:
+            raise Exception(f"No optimal basis available ({len(self.basic)} basic variables for "
+                            f"{self.num_rows} rows); solve the LP with GLOP.")
+        self.nonbasic = np.flatnonzero(self.status != pywraplp.Solver.BASIC)
+        self.lu = splu(self.M[:, self.basic].tocsc())
+        y = self.lu.solve(self.cost[self.basic], trans='T')
+        self.reduced = self.cost - self.M.T @ y
+        self.reduced[self.basic] = 0.0
+
+    @property
+    def duals(self):
+        """Row duals in minimization form (the reduced costs of the row activities)."""
+        return self.reduced[self.num_cols:]
+
+    def cost_range(self, direction):
+        """Range of t over which the basis stays optimal for objective c + t * direction.
+
+        `direction` is per column in the model's own sense; the slope is
+        the change in the optimal objective per unit t.
+        """
+        d = np.concatenate([self.sense * np.asarray(direction, dtype=float), np.zeros(self.num_rows)])
+        w = self.lu.solve(d[self.basic], trans='T')
+        rd = d - self.M.T @ w
+        lower, upper = -np.inf, np.inf
+        for j in self.nonbasic.tolist():
+            r, step, status = self.reduced[j], rd[j], self.status[j]
+            if abs(step) <= TOLERANCE or status == pywraplp.Solver.FIXED_VALUE:
+                continue
+            # AT_LOWER needs r + t step >= 0, AT_UPPER <= 0, FREE == 0
+            if status in (pywraplp.Solver.AT_LOWER_BOUND, pywraplp.Solver.FREE):
+                lower, upper = _clip(lower, upper, -r / step, step > 0)
+            if status in (pywraplp.Solver.AT_UPPER_BOUND, pywraplp.Solver.FREE):
+                lower, upper = _clip(lower, upper, -r / step, step < 0)
+        slope = float(np.asarray(direction, dtype=float) @ self.z[:self.num_cols])
+        return BasisRange(lower, upper, slope)
+
+    def bound_range(self, lower_direction, upper_direction):
+        """Range of t over which the basis stays optimal (and feasible) for bounds + t * direction.
+
+        Directions are per column followed by per row (row bounds are the
+        bounds of the row activities). The slope is in the model's sense.
+        """
+        dl = np.asarray(lower_direction, dtype=float)
+        du = np.asarray(upper_direction, dtype=float)
+        delta = np.zeros(len(self.z))
+        at_upper = self.status == pywraplp.Solver.AT_UPPER_BOUND
+        at_lower = np.isin(self.status, (pywraplp.Solver.AT_LOWER_BOUND, pywraplp.Solver.FIXED_VALUE))
+        delta[at_upper] = du[at_upper]
+        delta[at_lower] = dl[at_lower]
+        dz = -self.lu.solve(np.asarray(self.M[:, self.nonbasic] @ delta[self.nonbasic]).ravel())
+        lower, upper = -np.inf, np.inf
+        for k, j in enumerate(self.basic.tolist()):
+            # lb + t dl <= z + t dz <= ub + t du
+            for bound, moves, above in ((self.lb[j], dl[j], True), (self.ub[j], du[j], False)):
+                if not math.isfinite(bound):
+                    continue
+                step = dz[k] - moves
+                if abs(step) > TOLERANCE:
+                    lower, upper = _clip(lower, upper, (bound - self.z[j]) / step, (step > 0) == above)
+        slope = self.sense * float(self.reduced[self.nonbasic] @ delta[self.nonbasic])
+        return BasisRange(lower, upper, slope)
+
+    def column_cost_range(self, j):
+        """Allowable (lowest, highest) objective coefficient of column j."""
+        direction = np.zeros(self.num_cols)
+        direction[j] = 1.0
+        r = self.cost_range(direction)
+        coefficient = self.sense * self.cost[j]
+        return coefficient + r.lower, coefficient + r.upper
+
+    def row_bound_range(self, i):
+        """Allowable range of row i's binding bound (the finite bound(s) for a slack row)."""
+        j = self.num_cols + i
+        status = self.status[j]
+        if status == pywraplp.Solver.BASIC:
+            # a slack row's upper bound may fall to its activity (a lower bound rise to it)
+            if math.isfinite(self.ub[j]):
+                return self.z[j], np.inf
+            return (-np.inf, self.z[j]) if math.isfinite(self.lb[j]) else (-np.inf, np.inf)
+        direction = np.zeros(len(self.z))
+        direction[j] = 1.0
+        bound = self.ub[j] if status == pywraplp.Solver.AT_UPPER_BOUND else self.lb[j]
+        r = self.bound_range(direction, direction)
+        return bound + r.lower, bound + r.upper
+
+
+def _clip(lower, upper, t, is_lower):
+    # t is a lower limit when is_lower, otherwise an upper limit
+    return (max(lower, t), upper) if is_lower else (lower, min(upper, t))
+
+
+# ============================================
+# SENSITIVITY REPORT
+# ============================================
+SensitivityReport = namedtuple('SensitivityReport', ['objective', 'columns', 'rows'])
+ColumnSensitivity = namedtuple('ColumnSensitivity', ['name', 'value', 'reduced_cost', 'status', 'cost_low',
+                                                     'cost_high'])
+RowSensitivity = namedtuple('RowSensitivity', ['name', 'activity', 'dual', 'status', 'bound_low', 'bound_high'])
+
+
+def sensitivity_report(solver):
+    """Values, duals, reduced costs and allowable ranges of a solved LP, from its basis alone."""
+    basis = LPBasis(solver)
+    columns = [ColumnSensitivity(var.name(), basis.z[j], var.reduced_cost(), STATUS_LABELS[basis.status[j]],
+                                 *basis.column_cost_range(j))
+               for j, var in enumerate(solver.variables())]
+    rows = [RowSensitivity(ct.name() or f'row {i}', basis.z[basis.num_cols + i], ct.dual_value(),
+                           STATUS_LABELS[basis.status[basis.num_cols + i]], *basis.row_bound_range(i))
+            for i, ct in enumerate(solver.constraints())]
+    return SensitivityReport(basis.objective, columns, rows)
+
+
+def print_sensitivity(report):
+    print(f"Objective = {report.objective:.4f}")
+    print(f"{'column':>40} {'value':>12} {'reduced':>12} {'status':>9} {'cost low':>12} {'cost high':>12}")
+    for col in report.columns:
+        print(f"{col.name:>40} {col.value:12.4f} {col.reduced_cost:12.4f} {col.status:>9} "
+              f"{col.cost_low:12.4f} {col.cost_high:12.4f}")
+    print(f"{'row':>40} {'activity':>12} {'dual':>12} {'status':>9} {'bound low':>12} {'bound high':>12}")
+    for row in report.rows:
+        print(f"{row.name:>40} {row.activity:12.4f} {row.dual:12.4f} {row.status:>9} "
+              f"{row.bound_low:12.4f} {row.bound_high:12.4f}")
+
+
+# ============================================
+# PARAMETRIC LP
+# ============================================
+# A parameter is anything model.update() accepts (plus 'a_price' /
+# 'b_price' on the component model, which move every price case in
+# parallel, the first case taking the given value) as long as it only
+# enters costs or bounds. Its direction is found by exporting the model
+# before and after a unit step.
+def parameter_setter(model, parameter):
+    """(current value, set(value)) for `parameter` of a built model."""
+    if parameter in ('a_price', 'b_price') and hasattr(model, 'set_prices'):
+        k = 0 if parameter == 'a_price' else 1
+        base = model.prices[:, k].copy()
+
+        def set_price(value):
+            for i, price in enumerate((base + value - base[0]).tolist()):
+                model.set_prices(i, **{parameter: price})
+        return float(base[0]), set_price
+    if parameter not in model.data:
+        raise KeyError(f"Unknown parameter: {parameter}")
+    return float(model.data[parameter]), lambda value: model.update(**{parameter: value})
+
+
+def parameter_direction(model, parameter):
+    """Per-unit change of (costs, lower bounds, upper bounds) caused by `parameter`."""
+    value, set_value = parameter_setter(model, parameter)
+    before = model_arrays(model.solver)
+    set_value(value + 1.0)
+    after = model_arrays(model.solver)
+    set_value(value)
+    if (before[1] != after[1]).nnz:
+        raise Exception(f"{parameter} enters the constraint matrix; parametric analysis covers costs and bounds.")
+    with np.errstate(invalid='ignore'):
+        steps = [np.nan_to_num(b - a, nan=0.0) for a, b in zip(before[:1] + before[2:6], after[:1] + after[2:6])]
+    cost, col_lb, col_ub, row_lb, row_ub = steps
+    return cost, np.concatenate([col_lb, row_lb]), np.concatenate([col_ub, row_ub])
+
+
+def parametric(model, parameter, start, stop, max_pieces=1000):
+    """Trace the optimal value of an LP model over parameter in [start, stop].
+
+    Returns a ParametricCurve: the optimal value is linear between
+    consecutive breakpoints (np.interp(t, curve.breakpoints, curve.values)
+    evaluates it anywhere in the range), and slopes[k] holds on piece k.
+    One warm re-solve per basis change; the parameter is restored after.
+    """
+    if model.solver.IsMip():
+        raise Exception("Parametric analysis needs an LP; build the model with integer=False.")
+    original, set_value = parameter_setter(model, parameter)
+    cost, dl, du = parameter_direction(model, parameter)
+    moves_cost, moves_bounds = bool(cost.any()), bool(dl.any() or du.any())
+    if moves_cost and moves_bounds:
+        raise Exception(f"{parameter} moves both costs and bounds; the optimal value is not piecewise linear.")
+
+    theta = start
+    set_value(theta)
+    status = model.solve()
+    solves = 1
+    breakpoints, values, slopes = [theta], [], []
+    while True:
+        if status != pywraplp.Solver.OPTIMAL:
+            raise Exception(f"Parametric solve at {parameter} = {theta} ended with status code: {status}")
+        basis = LPBasis(model.solver)
+        r = basis.cost_range(cost) if moves_cost else basis.bound_range(dl, du)
+        value = basis.objective
+        if not values:
+            values.append(value)
+        end = min(stop, theta + max(r.upper, 0.0))
+        if end > breakpoints[-1] + TOLERANCE * max(1.0, abs(end)):
+            # a basis change that keeps the slope (degeneracy) extends the last piece
+            if slopes and abs(r.slope - slopes[-1]) <= 1e-9 * max(1.0, abs(r.slope)):
+                breakpoints.pop()
+                values.pop()
+                slopes.pop()
+            values.append(value + r.slope * (end - theta))
+            breakpoints.append(end)
+            slopes.append(r.slope)
+        if end >= stop or len(slopes) >= max_pieces:
+            break
+        theta = end + 1e-7 * max(1.0, abs(end))
+        set_value(theta)
+        status = model.solve(warm=True)
+        solves += 1
+
+    set_value(original)
+    return ParametricCurve(parameter, np.array(breakpoints), np.array(values), np.array(slopes), solves)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sensitivity ranges and parametric optimal-value curves')
+    parser.add_argument('--model', choices=['component', 'farmer'], default='component')
+    parser.add_argument('--two-stage', action='store_true', help='use the scenario table (default: one price case / '
+                                                                 'average yields, as in the chapter scripts)')
+    parser.add_argument('--parameter', default='capacity_limit')
+    parser.add_argument('--range', type=float, nargs=2, default=[60.0, 200.0])
+    args = parser.parse_args()
+
+    if args.model == 'component':
+        model = component_model.build_two_stage() if args.two_stage else component_model.build_deterministic()
+    else:
+        model = farmer_model.build_two_stage(integer=False) if args.two_stage else \
+            farmer_model.build_two_stage([(1.0, 1.0, 1.0, 1.0)], integer=False)
+    model.solve()
+    print_sensitivity(sensitivity_report(model.solver))
+    curve = parametric(model, args.parameter, *args.range)
+    print(f"\nOptimal objective over {curve.parameter} in [{args.range[0]}, {args.range[1]}] ({curve.solves} solves)")
+    print(f"{'from':>12} {'to':>12} {'objective from':>16} {'objective to':>16} {'slope':>12}")
+    for k, slope in enumerate(curve.slopes.tolist()):
+        print(f"{curve.breakpoints[k]:12.4f} {curve.breakpoints[k + 1]:12.4f} {curve.values[k]:16.4f} "
+              f"{curve.values[k + 1]:16.4f} {slope:12.4f}")
@@ -0,0 +1,288 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+# The event loop only parses requests and routes them; the solver runs in
+# a worker pool, and the server process itself never imports OR-Tools
+# under the default process executor (batch.py is standard library only).
+# Each worker keeps the models it has built, so a what-if query is an
+# in-place update plus a warm re-solve instead of an interpreter start,
+# an ortools import and a model build.
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import signal
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from batch import MODELS, make_case, validate_case
+
+# ============================================
+# DECLARE CONSTANTS
+# ============================================
+# pywraplp holds the GIL inside Solve(), so a thread pool only overlaps
+# request handling with one solve at a time; processes run solves in
+# parallel at the price of pickling each batch. Threads share one model
+# cache and skip the pickling, which can win on very small models.
+EXECUTORS = ('process', 'thread')
+BATCH_WINDOW = 0.002  # seconds a new batch waits for compatible requests
+MAX_BATCH = 32
+SOLVED = ('OPTIMAL', 'FEASIBLE')
+
+# A batch collects requests with the same group key (model, scenarios and
+# build options) so they run back to back on one warm model.
+Batch = namedtuple('Batch', ['case', 'items'])
+
+
+def group_key(case):
+    """Requests with equal group keys can share a built model."""
+    return json.dumps([case.model, case.scenarios, case.options], sort_keys=True)
+
+
+def request_key(case):
+    """Requests with equal request keys have the same answer."""
+    data = {key: float(value) for key, value in case.data.items()}
+    return json.dumps([case.model, case.scenarios, case.options, data], sort_keys=True)
+
+
+# ============================================
+# WORKER SIDE
+# ============================================
+# One cache per worker process (shared by the threads of a thread pool,
+# hence the locks). Entries are [module, model, lock].
+_models = {}
+_models_lock = threading.Lock()
+
+
+def import_models():
+    """Import the model modules (and OR-Tools) ahead of the first request."""
+    for spec in MODELS.values():
+        importlib.import_module(spec.module)
+    return os.getpid()
+
+
+def _warm_model(model_name, scenarios, options):
+    key = json.dumps([model_name, scenarios, options], sort_keys=True)
+    with _models_lock:
+        if key not in _models:
+            module = importlib.import_module(MODELS[model_name].module)
+            model = module.build_two_stage(module.SCENARIOS if scenarios is None else scenarios, **options)
+            _models[key] = [module, model, threading.Lock()]
+        return _models[key]
+
+
+def solve_batch(model_name, scenarios, options, requests):
+    """Solve each `data` override in `requests` on the warm model for (model_name, scenarios, options).
+
+    Every request states its overrides relative to the model's constants,
+    so only the parameters that differ from the previous solve are
+    updated. Returns one response dict per request, in order.
+    """
+    module, model, lock = _warm_model(model_name, scenarios, options)
+    constants = getattr(module, MODELS[model_name].data_constant)
+    with lock:
+        return [_solve_one(model, constants, data) for data in requests]
+
+
+def _solve_one(model, constants, data):
+    target = {**constants, **data}
+    changed = {key: value for key, value in target.items() if model.data[key] != value}
+    if changed:
+        model.update(**changed)
+    warm = model.status is not None
+    start = time.perf_counter()
+    model.solve(warm=warm)
+    seconds = time.perf_counter() - start
+    result = model.result()
+    response = {'status': result.status_name, 'profit': None, 'first_stage': None, 'solve_seconds': seconds,
+                'warm': warm, 'worker': os.getpid()}
+    if result.status_name in SOLVED:
+        names = [var.name() for var in model.solver.variables()[:result.num_first_stage]]
+        response.update(profit=result.profit, first_stage=dict(zip(names, result.first_stage.tolist())))
+    return response
+
+
+# ============================================
+# SOLVE SERVICE
+# ============================================
+class SolveService:
+    """Coalescing, micro-batching front end to a pool of warm solver workers.
+
+    Identical requests in flight share one solve. A request with a new
+    group key opens a batch that waits `batch_window` seconds (or until
+    `max_batch` requests) for compatible requests, then goes to the pool
+    as a single task. batch_window=0 and max_batch=1 turn batching off.
+    """
+
+    def __init__(self, executor='process', workers=None, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH,
+                 coalesce=True):
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}, not {executor!r}")
+        workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(workers) if executor == 'process' else ThreadPoolExecutor(workers)
+        self.workers = workers
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self.coalesce = coalesce
+        self.inflight = {}
+        self.pending = {}
+        self.stats = {'requests': 0, 'coalesced': 0, 'batches': 0, 'solves': 0, 'errors': 0}
+
+    async def start(self):
+        """Start the workers and import the models in them."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, import_models) for _ in range(self.workers)))
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def solve(self, request):
+        """Answer one case table (as accepted by batch.py); raise ValueError when it is invalid."""
+        if not isinstance(request, dict):
+            raise ValueError("a request must be a JSON object")
+        problems = validate_case(request)
+        if problems:
+            raise ValueError('; '.join(problems))
+        case = make_case(request)
+        self.stats['requests'] += 1
+
+        key = request_key(case)
+        if self.coalesce and key in self.inflight:
+            self.stats['coalesced'] += 1
+            return {**await asyncio.shield(self.inflight[key]), 'coalesced': True}
+        future = asyncio.get_running_loop().create_future()
+        if self.coalesce:
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        self._enqueue(case, future)
+        return {**await asyncio.shield(future), 'coalesced': False}
+
+    def _enqueue(self, case, future):
+        group = group_key(case)
+        batch = self.pending.get(group)
+        if batch is None:
+            batch = self.pending[group] = Batch(case, [])
+            loop = asyncio.get_running_loop()
+            if self.batch_window > 0 and self.max_batch > 1:
+                loop.call_later(self.batch_window, self._dispatch, group, batch)
+            else:
+                loop.call_soon(self._dispatch, group, batch)
+        batch.items.append((case.data, future))
+        if len(batch.items) >= self.max_batch:
+            self._dispatch(group, batch)
+
+    def _dispatch(self, group, batch):
+        if self.pending.get(group) is not batch:
+            return  # already sent when it filled up
+        del self.pending[group]
+        self.stats['batches'] += 1
+        self.stats['solves'] += len(batch.items)
+        case = batch.case
+        task = asyncio.get_running_loop().run_in_executor(
+            self.pool, solve_batch, case.model, case.scenarios, case.options, [data for data, _ in batch.items])
+        task.add_done_callback(lambda done: self._deliver(batch, done))
+
+    def _deliver(self, batch, done):
+        futures = [future for _, future in batch.items]
+        if done.exception() is not None:
+            self.stats['errors'] += len(futures)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(done.exception())
+            return
+        for future, response in zip(futures, done.result()):
+            if not future.done():
+                future.set_result({**response, 'batch_size': len(futures)})
+
+    def summary(self):
+        batches = self.stats['batches']
+        return {**self.stats, 'mean_batch_size': self.stats['solves'] / batches if batches else 0.0,
+                'pending_batches': len(self.pending), 'inflight': len(self.inflight)}
+
+    # ============================================
+    # HTTP
+    # ============================================
+    # Just enough HTTP/1.1 for a dashboard or a load generator: JSON bodies
+    # with a Content-Length, keep-alive unless the client sends
+    # "Connection: close".
+    #   POST /solve   body: a case table, e.g. {"model": "component", "data": {"capacity_limit": 100}}
+    #   GET  /stats   request, coalescing and batching counters
+    async def route(self, method, path, body):
+        if method == 'POST' and path == '/solve':
+            try:
+                request = json.loads(body or b'null')
+            except ValueError as error:
+                return '400 Bad Request', {'error': f"invalid JSON: {error}"}
+            try:
+                return '200 OK', await self.solve(request)
+            except ValueError as error:
+                return '400 Bad Request', {'error': str(error)}
+            except Exception as error:
+                return '500 Internal Server Error', {'error': str(error)}
+        if method == 'GET' and path == '/stats':
+            return '200 OK', self.summary()
+        return '404 Not Found', {'error': f"no route for {method} {path}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self.route(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8080, **options):
+    """Run a SolveService on host:port until cancelled."""
+    service = SolveService(**options)
+    # a plain SIGTERM would leave the pool's worker processes behind
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        await service.start()
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"serving on http://{host}:{port} ({options.get('executor', 'process')} pool, "
+              f"{service.workers} worker(s))", flush=True)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve service for farmer / component what-if queries')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--executor', choices=EXECUTORS, default='process')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000, help='milliseconds')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--no-coalesce', action='store_true', help='solve identical concurrent requests separately')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, executor=args.executor, workers=args.workers,
+                          batch_window=args.batch_window / 1000, max_batch=args.max_batch,
+                          coalesce=not args.no_coalesce))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -0,0 +1,167 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import hashlib
+import inspect
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from backends import resolve_solver_id
+import component_model
+import farmer_model
+from results import SolveResult
+
+# ============================================
+# SOLVE CACHE
+# ============================================
+# A solve is identified by a SHA-256 of its canonical inputs: the model
+# module, every model constant after defaults and derived values are filled
+# in, the scenario table as little-endian float64 bytes, and the build
+# options that can change the answer (solver, integrality). Results are kept
+# as SolveResults in a size-bounded in-memory LRU, backed by an optional
+# SQLite file shared by every process that opens it. SQLite runs in WAL
+# mode with a busy timeout, so concurrent writers queue instead of failing,
+# and a key is only ever written with the same value, so a lost race is
+# harmless.
+DATA_HELPERS = {'farmer_model': farmer_model.farmer_data, 'component_model': component_model.component_data}
+KEY_OPTIONS = ('solver_id', 'integer')
+
+
+def model_key(module, scenarios=None, data=None, **options):
+    """Stable hash of the inputs that determine a solve of `module`."""
+    scenarios = module.SCENARIOS if scenarios is None else scenarios
+    values, probs = module.scenario_table(scenarios)
+    table = np.ascontiguousarray(np.column_stack([values, probs]) + 0.0, dtype='<f8')   # + 0.0 folds -0.0
+    constants = {key: float(value) for key, value in DATA_HELPERS[module.__name__](data).items()}
+    defaults = inspect.signature(module.build_two_stage).parameters
+    options = {key: options.get(key, defaults[key].default) for key in KEY_OPTIONS if key in defaults}
+    options['solver_id'] = resolve_solver_id(options['solver_id'], options.get('integer', False))
+    canonical = json.dumps({
+        'module': module.__name__,
+        'data': constants,
+        'options': options,
+        'shape': table.shape,
+        'scenarios': hashlib.sha256(table.tobytes()).hexdigest(),
+    }, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SolveCache:
+    """In-memory LRU of SolveResults, optionally backed by a SQLite file.
+
+    Metrics: `hits` (memory), `disk_hits`, `misses`, and `saved_seconds`,
+    the solve time recorded with every entry served from the cache, minus
+    the time the lookup itself took. Cached results are shared between
+    callers, so their arrays are made read-only.
+    """
+
+    def __init__(self, path=None, max_entries=1024, timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.memory = OrderedDict()
+        self.hits = self.disk_hits = self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _connection(self):
+        # one connection per process: a forked child must not reuse its parent's
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, result BLOB NOT NULL, solve_seconds REAL NOT NULL)')
+            self._pid = os.getpid()
+        return self._db
+
+    def get(self, key):
+        """Return the cached SolveResult for `key`, or None."""
+        start = time.perf_counter()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+            elif self.path is not None:
+                row = self._connection().execute(
+                    'SELECT result, solve_seconds FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    entry = (SolveResult.load(io.BytesIO(row[0])), row[1])
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.saved_seconds += entry[1] - (time.perf_counter() - start)
+            return entry[0]
+
+    def put(self, key, result, solve_seconds):
+        with self._lock:
+            self._remember(key, (result, solve_seconds))
+            if self.path is not None:
+                buffer = io.BytesIO()
+                result.save(buffer)
+                with self._connection() as db:
+                    db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                               (key, buffer.getvalue(), solve_seconds))
+
+    def _remember(self, key, entry):
+        for array in (entry[0].values, entry[0].duals, entry[0].reduced_costs):
+            array.setflags(write=False)
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def metrics(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'saved_seconds': self.saved_seconds,
+            'entries': len(self.memory),
+        }
+
+    def close(self):
+        if self._db is not None and self._pid == os.getpid():
+            self._db.close()
+        self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def cached_solve(cache, module, scenarios=None, data=None, **options):
+    """Solve `module` (farmer_model or component_model) through `cache`; return a SolveResult.
+
+    `options` are passed to module.build_two_stage (e.g. solver_id,
+    integer, method); only those that can change the answer enter the key.
+    Only optimal results are cached: any other status is returned but
+    solved again on the next call.
+    """
+    scenarios = module.SCENARIOS if scenarios is None else scenarios
+    key = model_key(module, scenarios, data, **options)
+    result = cache.get(key)
+    if result is None:
+        start = time.perf_counter()
+        model = module.build_two_stage(scenarios, data, **options)
+        model.solve()
+        result = model.result()
+        if result.status == pywraplp.Solver.OPTIMAL:
+            cache.put(key, result, time.perf_counter() - start)
+    return result
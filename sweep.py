@@ -0,0 +1,153 @@
+# ============================================
+# PACKAGE MANAGEMENT
+# ============================================
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+from functools import partial
+
+from ortools.linear_solver import pywraplp
+
+from backends import resolve_solver_id
+import farmer_model
+from solve_cache import SolveCache
+
+# ============================================
+# PARAMETER SWEEP
+# ============================================
+# A sweep point is a dict of FARMER_DATA overrides plus the yield multipliers
+# m_w, m_c, m_s of the single-season model. Results are streamed to CSV as
+# workers finish (in completion order) and stored in a SolveCache (see
+# solve_cache.py): a SQLite file looked up one key at a time, behind a
+# bounded in-memory LRU. The key is a hash of everything a point's solve
+# depends on: its yield multipliers, the full farmer data after its
+# overrides (so a change to FARMER_DATA misses the old entries) and the
+# resolved solver id. Only optimal results are cached, so re-running a
+# sweep solves the points that were not seen before or did not solve.
+YIELD_KEYS = ('m_w', 'm_c', 'm_s')
+RESULT_KEYS = ('status', 'profit', 'acres_w', 'acres_c', 'acres_s',
+               'sold_w', 'sold_c', 'sold_s_high', 'sold_s_low', 'bought_w', 'bought_c')
+
+
+def parameter_grid(yield_multiplier=(1.0,), **axes):
+    """Yield the cartesian product of the axes as sweep points.
+
+    `yield_multiplier` scales all three crops together; pass m_w/m_c/m_s
+    axes instead to vary crops independently. Other axes are FARMER_DATA
+    keys, e.g. purchase_markup=[1.2, 1.4], quota_s=[5000, 6000].
+    """
+    per_crop = {key: axes.pop(key) for key in YIELD_KEYS if key in axes}
+    if per_crop:
+        yield_axes = {key: per_crop.get(key, (1.0,)) for key in YIELD_KEYS}
+    else:
+        yield_axes = {'yield_multiplier': yield_multiplier}
+    for key in axes:
+        if key not in farmer_model.FARMER_DATA:
+            raise KeyError(f"Unknown farmer parameter: {key}")
+    names = list(yield_axes) + sorted(axes)
+    for values in itertools.product(*yield_axes.values(), *(axes[key] for key in sorted(axes))):
+        point = dict(zip(names, values))
+        if 'yield_multiplier' in point:
+            m = point.pop('yield_multiplier')
+            point.update(m_w=m, m_c=m, m_s=m)
+        yield point
+
+
+def point_key(point, solver_id='auto'):
+    """Stable hash of a sweep point, the farmer data it is solved with and the solver: canonical JSON."""
+    payload = {
+        'yields': {key: float(point[key]) for key in YIELD_KEYS},
+        'data': {key: float(value) for key, value in farmer_model.farmer_data(_point_data(point)).items()},
+        'solver': resolve_solver_id(solver_id, integer=True),
+    }
+    canonical = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _point_data(point):
+    return {key: value for key, value in point.items() if key not in YIELD_KEYS}
+
+
+def solve_point(point, solver_id='auto'):
+    """Solve the single-season farmer model at one sweep point; return (point, SolveResult)."""
+    model = farmer_model.build_deterministic(tuple(point[key] for key in YIELD_KEYS), _point_data(point),
+                                             solver_id)
+    model.solve()
+    return point, model.result()
+
+
+def result_row(result):
+    """The CSV columns of a sweep point's SolveResult (None beyond the status unless optimal)."""
+    row = dict.fromkeys(RESULT_KEYS)
+    row['status'] = result.status
+    if result.status == pywraplp.Solver.OPTIMAL:
+        row.update(zip(RESULT_KEYS[2:], result.values.tolist()))
+        row['profit'] = result.profit
+    return row
+
+
+def run_sweep(points, output, cache_path=None, processes=None, batch_size=1024, chunksize=16, solver_id='auto'):
+    """Solve every point and stream one CSV row per point to `output`.
+
+    Points are consumed `batch_size` at a time and looked up in the cache
+    one by one, so neither the grid, the results nor the cache file are
+    held in memory. Cached points are written straight away; the rest of
+    each batch is solved on a process pool. Returns (solved, cached).
+    """
+    solved = cached = 0
+    points = iter(points)
+    writer = pool = None
+    with open(output, 'w', newline='') as out, SolveCache(cache_path) as cache:
+
+        def write(point, result):
+            nonlocal writer
+            row = {**point, **result_row(result)}
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+
+        try:
+            while batch := list(itertools.islice(points, batch_size)):
+                todo = []
+                for point in batch:
+                    result = cache.get(point_key(point, solver_id)) if cache_path else None
+                    if result is None:
+                        todo.append(point)
+                    else:
+                        write(point, result)
+                        cached += 1
+                if not todo:
+                    continue
+                if pool is None:
+                    pool = multiprocessing.Pool(processes)
+                for point, result in pool.imap_unordered(partial(solve_point, solver_id=solver_id), todo, chunksize):
+                    write(point, result)
+                    if cache_path and result.status == pywraplp.Solver.OPTIMAL:
+                        cache.put(point_key(point, solver_id), result, result.wall_time)
+                    solved += 1
+                out.flush()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    return solved, cached
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Single-season farmer parameter sweep')
+    parser.add_argument('--yield-multiplier', type=float, nargs='+', default=[0.8, 1.0, 1.2])
+    parser.add_argument('--purchase-markup', type=float, nargs='+', default=[1.4])
+    parser.add_argument('--quota', type=float, nargs='+', default=[6000])
+    parser.add_argument('--output', default='sweep.csv')
+    parser.add_argument('--cache', default='sweep_cache.sqlite', help='SQLite result cache')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--solver-id', default='auto', help='MIP engine (see backends.py)')
+    args = parser.parse_args()
+
+    grid = parameter_grid(args.yield_multiplier, purchase_markup=args.purchase_markup, quota_s=args.quota)
+    solved, cached = run_sweep(grid, args.output, args.cache, args.processes, solver_id=args.solver_id)
+    print(f"Wrote {args.output}: {solved} solved, {cached} from cache")